@@ -12,13 +12,17 @@ from aiogram.fsm.storage.memory import MemoryStorage
 from config import BOT_TOKEN
 
 # Импорт роутеров
-from handlers import start, main_menu, profile, support, search, hotels, excursions, packages, transfers, order
+from handlers import start, main_menu, profile, support, search, inline_search, hotels, excursions, packages, transfers, order
 
 # Инициализация Pelagos API и data_loader
 from services.pelagos_api import PelagosAPI
 from services.message_logger import MessageLogger
 from utils.data_loader import set_data_loader, get_data_loader
 from utils.preloader import init_preloader
+from utils.price_preloader import init_price_preloader
+from utils.exchange_rates import get_exchange_rates_service
+from utils.search_index import init_search_index
+from utils.cache_manager import get_cache_manager
 
 # Импорт middleware
 from middlewares import MessageLoggingMiddleware, setup_message_logging
@@ -39,9 +43,17 @@ async def main():
         logger.error("❌ BOT_TOKEN не найден в переменных окружения!")
         return
 
+    # Проверка подключения к Redis (асинхронный пул соединений)
+    cache = get_cache_manager()
+    await cache.connect()
+
     # Инициализация Pelagos API
     api_key = os.getenv("PELAGOS_API_KEY")
-    pelagos_api = PelagosAPI(api_key=api_key)
+    pelagos_api = PelagosAPI(
+        api_key=api_key,
+        max_concurrency=int(os.getenv("PELAGOS_MAX_CONCURRENCY", "20")),
+        max_per_endpoint=int(os.getenv("PELAGOS_MAX_PER_ENDPOINT", "8"))
+    )
 
     # Инициализация DataLoader с API
     set_data_loader(pelagos_api)
@@ -51,6 +63,27 @@ async def main():
     init_preloader(get_data_loader())
     logger.info("✅ Preloader инициализирован")
 
+    # Фоновое обновление индекса каталога отелей (get_hotel_by_id без запросов к API)
+    hotel_catalog = get_data_loader().hotels_loader.catalog
+    hotel_catalog.start()
+    logger.info("✅ Каталог отелей: фоновое обновление запущено")
+
+    # Поисковый индекс по отелям, экскурсиям, трансферам и турам (фоновое обновление)
+    search_index = init_search_index(get_data_loader())
+    search_index.start()
+    logger.info("✅ Поисковый индекс: фоновое обновление запущено")
+
+    # Цены трансферов и туров проставляются в закэшированные списки в фоне
+    price_preloader = init_price_preloader(get_data_loader())
+    price_preloader.start()
+    logger.info("✅ Предзагрузка цен трансферов и туров запущена")
+
+    # Курсы валют: первое обновление до старта, дальше - в фоне (чтение из памяти)
+    exchange_rates = get_exchange_rates_service()
+    await exchange_rates.refresh()
+    exchange_rates.start()
+    logger.info("✅ Курсы валют: фоновое обновление запущено")
+
     # Инициализация MessageLogger для логирования действий пользователей
     message_logger = MessageLogger()
     logger.info("✅ MessageLogger инициализирован")
@@ -80,6 +113,7 @@ async def main():
     dp.include_router(packages.router)  # Флоу пакетных туров
     dp.include_router(transfers.router)  # Флоу трансферов
     dp.include_router(support.router)
+    dp.include_router(inline_search.router)  # Inline-режим (@bot запрос) по поисковому индексу
     dp.include_router(search.router)  # Должен быть последним для перехвата текста
 
     # Настраиваем логирование исходящих сообщений
@@ -95,8 +129,13 @@ async def main():
         # Запуск polling
         await dp.start_polling(bot, allowed_updates=dp.resolve_used_update_types())
     finally:
+        await exchange_rates.stop()
+        await price_preloader.stop()
+        await search_index.stop()
+        await hotel_catalog.stop()
         await bot.session.close()
         await pelagos_api.close()
+        await cache.close()
         logger.info("🛑 Бот остановлен")
 
 
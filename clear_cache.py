@@ -4,9 +4,12 @@
 
 Использование:
     python clear_cache.py              # Очистить весь кэш
-    python clear_cache.py --pattern room:price:*  # Очистить только кэш цен
+    python clear_cache.py --pattern room:schedule:*  # Очистить только кэш цен
     python clear_cache.py --pattern transfers:*   # Очистить только кэш трансферов
     python clear_cache.py --stats      # Показать статистику кэша
+
+Локальный L1 кэш запущенного бота не очищается - он истекает сам
+(TTL см. LOCAL_CACHE_RULES в utils/cache_manager.py).
 """
 
 import argparse
@@ -101,7 +104,7 @@ def main():
     parser.add_argument(
         '--pattern',
         type=str,
-        help='Паттерн для удаления ключей (например: room:price:*)'
+        help='Паттерн для удаления ключей (например: room:schedule:*)'
     )
     parser.add_argument(
         '--stats',
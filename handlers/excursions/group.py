@@ -88,22 +88,8 @@ async def select_group_date(callback: CallbackQuery, state: FSMContext):
     # Показываем сообщение о загрузке
     loading_msg = await callback.message.edit_text("⏳ Загружаю экскурсии на выбранную дату...")
 
-    # Получаем экскурсии на эту дату
-    all_excursions = await get_data_loader().get_excursions_by_filters(
-        island=None,
-        excursion_type="group",
-        date=date
-    )
-
-    # ИСПРАВЛЕНИЕ: Фильтруем только экскурсии на выбранную дату
-    # (API возвращает весь месяц, нужна дополнительная фильтрация)
-    excursions = []
-    for exc in all_excursions:
-        exc_date = exc.get("date")  # "YYYY-MM-DD"
-        if exc_date == date:
-            excursions.append(exc)
-
-    logger.info(f"🔍 Фильтрация по дате {date}: {len(all_excursions)} → {len(excursions)} экскурсий")
+    # Экскурсии на эту дату с ценами (из закэшированного календаря месяца)
+    excursions = await get_data_loader().get_group_excursions_by_date(date)
 
     if not excursions:
         await loading_msg.edit_text(
@@ -113,17 +99,6 @@ async def select_group_date(callback: CallbackQuery, state: FSMContext):
         await state.update_data(current_date=date)
         return
 
-    # Дозагружаем цены для всех экскурсий (фиксированная цена за человека)
-    logger.info(f"📊 Дозагрузка цен для {len(excursions)} групповых экскурсий...")
-    for excursion in excursions:
-        if not excursion.get('price_usd') or excursion.get('price_usd') == 0:
-            # Загружаем полные данные экскурсии
-            full_excursion = await get_data_loader().get_excursion_by_id(excursion['id'])
-            if full_excursion and full_excursion.get('price_usd'):
-                logger.info(f"   ✓ {excursion['name']}: ${full_excursion['price_usd']} за чел")
-                excursion['price'] = full_excursion['price_usd']
-                excursion['price_usd'] = full_excursion['price_usd']
-
     # Сохраняем экскурсии и дату
     await state.update_data(
         excursions=excursions,
@@ -363,27 +338,8 @@ async def show_group_month_excursions(callback: CallbackQuery, state: FSMContext
     # Показываем сообщение о загрузке
     loading_msg = await callback.message.answer(f"⏳ Загружаю экскурсии за {MONTH_NAMES[month-1]} {year}...")
 
-    # Формируем дату первого дня месяца для запроса
-    first_day_of_month = f"{year:04d}-{month:02d}-01"
-
-    # Загружаем экскурсии, указав первый день месяца в запросе
-    all_excursions = await get_data_loader().get_excursions_by_filters(
-        island=None,  # Без фильтра по острову
-        excursion_type="group",
-        date=first_day_of_month  # Первый день месяца
-    )
-
-    # Фильтруем только экскурсии за нужный месяц/год
-    excursions = []
-    for exc in all_excursions:
-        exc_date = exc.get("date")  # "YYYY-MM-DD"
-        if exc_date:
-            try:
-                exc_dt = datetime.strptime(exc_date, "%Y-%m-%d")
-                if exc_dt.year == year and exc_dt.month == month:
-                    excursions.append(exc)
-            except:
-                pass
+    # Экскурсии за месяц с ценами (без фильтра по острову) из закэшированного календаря месяца
+    excursions = await get_data_loader().get_group_excursions_by_month(year, month)
 
     if not excursions:
         try:
@@ -393,16 +349,6 @@ async def show_group_month_excursions(callback: CallbackQuery, state: FSMContext
         await callback.answer(f"На {MONTH_NAMES_GENITIVE[month-1]} экскурсий не найдено", show_alert=True)
         return
 
-    # ИСПРАВЛЕНИЕ: Дозагружаем цены для всех экскурсий за месяц
-    logger.info(f"📊 Дозагрузка цен для {len(excursions)} экскурсий за месяц...")
-    for excursion in excursions:
-        if not excursion.get('price_usd') or excursion.get('price_usd') == 0:
-            # Загружаем полные данные экскурсии с ценой
-            full_excursion = await get_data_loader().get_excursion_by_id(excursion['id'])
-            if full_excursion and full_excursion.get('price_usd'):
-                excursion['price'] = full_excursion['price_usd']
-                excursion['price_usd'] = full_excursion['price_usd']
-
     # Сохраняем данные
     await state.update_data(
         group_month_excursions=excursions,
@@ -43,7 +43,8 @@ from utils.texts import (
     CONTACT_RECEIVED,
     get_hotels_list_text,
     get_hotel_list_item_text,
-    get_hotel_rooms_text
+    get_hotel_rooms_text,
+    UPSTREAM_UNAVAILABLE_TEXT
 )
 
 from utils.preloader import get_preloader
@@ -569,6 +570,10 @@ async def show_hotels_results(message: Message, state: FSMContext):
     # Удаляем сообщение о загрузке
     await delete_loading_message(loading_msg)
 
+    if result.get('unavailable'):
+        await message.edit_text(UPSTREAM_UNAVAILABLE_TEXT, reply_markup=get_back_to_main_keyboard())
+        return
+
     if not hotels:
         logger.warning("❌ Отели не найдены по заданным критериям")
         await message.edit_text(
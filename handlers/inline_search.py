@@ -0,0 +1,169 @@
+"""Inline-режим: поиск по каталогу из любого чата (@bot запрос)
+
+Ответ строится только из резидентного поискового индекса - без запросов
+к API, чтобы укладываться в бюджет задержки inline-запросов Telegram.
+Сущности, которые индекс ещё не собрал, в выдачу не попадают.
+"""
+import asyncio
+import html
+import logging
+from typing import List, Optional, Tuple
+
+from aiogram import Router
+from aiogram.types import (
+    InlineKeyboardButton,
+    InlineKeyboardMarkup,
+    InlineQuery,
+    InlineQueryResultArticle,
+    InlineQueryResultsButton,
+    InputTextMessageContent
+)
+
+from utils.loaders.excursions.transformers import ServiceTransformer
+from utils.search_index import get_search_index
+
+logger = logging.getLogger(__name__)
+
+router = Router()
+
+# Результатов в одном ответе (Telegram допускает до 50)
+PAGE_SIZE = 20
+# Максимум результатов каждой сущности во всей выдаче
+MAX_PER_ENTITY = 50
+# Минимальная длина запроса
+MIN_QUERY_LENGTH = 2
+# Сколько Telegram кэширует ответ на одинаковый запрос (секунды)
+CACHE_TIME = 300
+
+# Сущности индекса в выдаче: (сущность, порог совпадения, эмодзи, подпись)
+INLINE_ENTITIES = (
+    ("hotels", 40, "🏨", "Отель"),
+    ("private", 40, "🗺", "Индивидуальная экскурсия"),
+    ("group", 40, "👥", "Групповая экскурсия"),
+    ("companions", 40, "🤝", "Поиск попутчиков"),
+    ("transfers", 50, "🚗", "Трансфер"),
+    ("packages", 40, "🌴", "Пакетный тур"),
+)
+
+# Локации трансферов (как в выдаче поиска трансферов)
+TRANSFER_LOCATION_NAMES = {9: "Себу", 10: "Бохол", 8: "Боракай", 0: "Общие"}
+
+
+@router.inline_query()
+async def inline_search(inline_query: InlineQuery):
+    """Поиск по отелям, экскурсиям, трансферам и турам с постраничной выдачей (next_offset)"""
+    query = inline_query.query.strip()
+    button = InlineQueryResultsButton(text="🔍 Открыть поиск в боте", start_parameter="search")
+
+    if len(query) < MIN_QUERY_LENGTH:
+        await inline_query.answer([], cache_time=CACHE_TIME, button=button)
+        return
+
+    try:
+        offset = int(inline_query.offset or 0)
+    except ValueError:
+        offset = 0
+
+    try:
+        ranked = await _search_all(query)
+    except Exception as e:
+        logger.error(f"❌ Ошибка inline-поиска '{query}': {e}", exc_info=True)
+        ranked = []
+
+    page = ranked[offset:offset + PAGE_SIZE]
+    next_offset = str(offset + PAGE_SIZE) if offset + PAGE_SIZE < len(ranked) else ""
+
+    results = []
+    for entity, item, score in page:
+        article = _build_article(entity, item)
+        if article:
+            results.append(article)
+
+    await inline_query.answer(
+        results,
+        cache_time=CACHE_TIME,
+        next_offset=next_offset,
+        button=button
+    )
+
+
+async def _search_all(query: str) -> List[Tuple[str, dict, float]]:
+    """
+    Поиск по всем собранным сущностям индекса
+
+    Returns:
+        список (сущность, документ, процент_совпадения) по убыванию совпадения;
+        при равенстве - в порядке INLINE_ENTITIES
+    """
+    index = get_search_index()
+    entities = [(entity, threshold) for entity, threshold, _, _ in INLINE_ENTITIES if index.is_built(entity)]
+
+    found = await asyncio.gather(*[
+        index.search(entity, query, limit=MAX_PER_ENTITY, threshold=threshold)
+        for entity, threshold in entities
+    ])
+
+    ranked = []
+    seen = set()
+    for (entity, _), results in zip(entities, found):
+        for item, score in results:
+            # ID результатов inline-ответа должны быть уникальны
+            key = (entity, str(item.get('id')))
+            if key not in seen:
+                seen.add(key)
+                ranked.append((entity, item, score))
+    ranked.sort(key=lambda row: row[2], reverse=True)
+    return ranked
+
+
+def _build_article(entity: str, item: dict) -> Optional[InlineQueryResultArticle]:
+    """Карточка результата inline-выдачи из документа индекса"""
+    # Индивидуальные экскурсии хранятся в индексе сырыми услугами API
+    if entity == "private":
+        item = ServiceTransformer.transform(item, "private")
+        if not item:
+            return None
+
+    item_id = item.get('id')
+    name = item.get('name')
+    if not item_id or not name:
+        return None
+
+    _, _, emoji, label = next(row for row in INLINE_ENTITIES if row[0] == entity)
+
+    details = []
+    if entity == "hotels":
+        if item.get('stars'):
+            details.append("⭐" * int(item['stars']))
+        if item.get('island_name'):
+            details.append(f"📍 {item['island_name']}")
+    elif entity == "transfers":
+        details.append(f"📍 {TRANSFER_LOCATION_NAMES.get(item.get('location') or 0, 'Неизвестно')}")
+    elif item.get('island_name'):
+        details.append(f"📍 {item['island_name']}")
+
+    price = item.get('price_usd')
+    if price:
+        details.append(f"💵 от ${price}")
+
+    text = f"{emoji} <b>{html.escape(name)}</b>\n<i>{label}</i>"
+    if details:
+        text += "\n\n" + "\n".join(details)
+    if entity == "hotels" and item.get('address'):
+        text += f"\n🏠 {html.escape(item['address'])}"
+
+    url = item.get('url') or item.get('inhttp')
+    reply_markup = None
+    if url:
+        reply_markup = InlineKeyboardMarkup(inline_keyboard=[
+            [InlineKeyboardButton(text="🌐 Подробнее", url=url)]
+        ])
+
+    return InlineQueryResultArticle(
+        id=f"{entity}:{item_id}"[:64],
+        title=f"{emoji} {name}",
+        description=" · ".join([label] + details),
+        thumbnail_url=item.get('photo') or None,
+        input_message_content=InputTextMessageContent(message_text=text),
+        reply_markup=reply_markup
+    )
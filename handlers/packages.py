@@ -15,6 +15,7 @@ from utils.data_loader import get_data_loader
 from utils.media_manager import media_manager
 from utils.contact_handler import contact_handler
 from utils.order_manager import order_manager
+from utils.price_table import prices_for_records
 
 router = Router()
 
@@ -172,17 +173,25 @@ async def send_packages_cards_page(message: Message, state: FSMContext, page: in
     start_idx = page * per_page
     end_idx = min(start_idx + per_page, len(packages))
 
-    for i in range(start_idx, end_idx):
-        if not packages[i].get('prices_loaded'):
-            loaded = await get_data_loader().get_package_with_prices(packages[i]['id'])
-            if loaded:
-                packages[i] = loaded
+    unpriced = [i for i in range(start_idx, end_idx) if not packages[i].get('prices_loaded')]
+    if unpriced:
+        loaded = await get_data_loader().get_packages_with_prices([packages[i]['id'] for i in unpriced])
+        for i, package in zip(unpriced, loaded):
+            if package:
+                packages[i] = package
 
-    await state.update_data(packages=packages)
+        await state.update_data(packages=packages)
+
+    # Цены страницы для выбранного количества людей - одним проходом
+    page_packages = packages[start_idx:end_idx]
+    page_prices = dict(zip(
+        (package['id'] for package in page_packages),
+        prices_for_records(page_packages, people_count)
+    ))
 
     # Функция форматирования карточки
     def format_card(package):
-        return get_package_card_text(package, people_count)
+        return get_package_card_text(package, people_count, page_prices.get(package['id']))
 
     # Функция создания клавиатуры
     def get_keyboard(package):
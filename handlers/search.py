@@ -1,6 +1,5 @@
 """Обработчики поиска"""
 import logging
-import os
 from aiogram import Router, F
 from aiogram.types import Message, CallbackQuery
 from aiogram.fsm.context import FSMContext
@@ -12,10 +11,8 @@ from keyboards import (
     get_transfer_card_simple_keyboard
 )
 from states.user_states import UserStates
-from utils.search_utils import hybrid_search
 from utils.data_loader import get_data_loader
-from utils.helpers import get_island_name_ru
-from services.pelagos_api import PelagosAPI
+from utils.search_index import get_search_index
 
 logger = logging.getLogger(__name__)
 
@@ -214,55 +211,13 @@ async def process_search_query(message: Message, state: FSMContext):
 async def search_hotels(query: str) -> list:
     """Поиск отелей"""
     try:
-        # Используем API напрямую для поиска отелей
-        api = PelagosAPI(api_key=os.getenv("PELAGOS_API_KEY"))
-
-        # Собираем отели со всех островов
-        all_hotels = []
-        locations = ["cebu", "boracay", "bohol", "palawan", "manila-luson"]
-
-        for location in locations:
-            # Получаем все отели локации
-            hotels = await api.get_all_hotels(location)
-
-            # Конвертируем объекты Hotel в словари и добавляем location_code
-            for hotel in hotels:
-                hotel_dict = {
-                    'id': str(hotel.id),
-                    'name': hotel.name,
-                    'stars': hotel.stars if hasattr(hotel, 'stars') else 0,
-                    'address': hotel.address if hasattr(hotel, 'address') else '',
-                    'location': hotel.location if hasattr(hotel, 'location') else 0,
-                    'location_code': location,
-                    'island_name': get_island_name_ru(location),  # Добавляем имя острова на русском
-                    'room_type': 'Все типы номеров',  # Для поиска показываем общий текст
-                    'photo': None,  # Будет заполнено позже если нужно
-                    'pics': hotel.pics if hasattr(hotel, 'pics') else []
-                }
-
-                # Получаем URL первого фото если есть
-                if hotel_dict['pics'] and len(hotel_dict['pics']) > 0:
-                    pic = hotel_dict['pics'][0]
-                    if isinstance(pic, dict):
-                        md5 = pic.get('md5', '')
-                        filename = pic.get('filename', '')
-                        if md5 and filename:
-                            hotel_dict['photo'] = f"https://app.pelagos.ru/pic/{md5}/{filename}"
-
-                all_hotels.append(hotel_dict)
-
-        await api.close()
-
-        # Выполняем умный поиск с синонимами
-        results = hybrid_search(
-            query=query,
-            items=all_hotels,
-            field_name="name",
+        # Ищем по резидентному индексу (каталоги отелей обновляются в фоне)
+        return await get_search_index().search(
+            "hotels",
+            query,
             limit=15,  # Увеличили лимит
             threshold=40  # Снизили порог для большей гибкости
         )
-
-        return results
     except Exception as e:
         logger.error(f"Ошибка при поиске отелей: {e}", exc_info=True)
         return []
@@ -275,48 +230,17 @@ async def search_excursions(query: str, excursion_type: str = "private") -> list
         query: поисковый запрос
         excursion_type: тип экскурсии (group, private, companions)
     """
-    try:
-        # Используем DataLoader для получения экскурсий
-        loader = get_data_loader()
-
-        # Для индивидуальных экскурсий используем get_private_excursions
-        if excursion_type == "private":
-            api = PelagosAPI(api_key=os.getenv("PELAGOS_API_KEY"))
-
-            # Получаем индивидуальные экскурсии со ВСЕХ островов одним запросом
-            from datetime import datetime, timedelta
-            tomorrow = datetime.now() + timedelta(days=1)
-            api_date = tomorrow.strftime("%d.%m.%Y")
-
-            # location_id=0 означает ВСЕ острова (включая Манилу, Корон, Минданао и др.)
-            all_services = await api.get_private_excursions(
-                location_id=0,
-                date=api_date
-            )
-
-            excursions = all_services
-            await api.close()
-
-        # Для групповых и попутчиков - получаем через загрузчик
-        elif excursion_type in ["group", "companions"]:
-            # Получаем экскурсии island=None означает загрузку всех доступных островов
-            excursions = await loader.get_excursions_by_filters(
-                island=None,
-                excursion_type=excursion_type
-            )
-        else:
-            return []
+    if excursion_type not in ["private", "group", "companions"]:
+        return []
 
-        # Выполняем умный поиск с синонимами
-        results = hybrid_search(
-            query=query,
-            items=excursions,
-            field_name="name",
+    try:
+        # Индивидуальные - сырые услуги API со всех островов, групповые и попутчики - словари загрузчика
+        return await get_search_index().search(
+            excursion_type,
+            query,
             limit=15,  # Увеличили лимит
             threshold=40  # Снизили порог для большей гибкости
         )
-
-        return results
     except Exception as e:
         logger.error(f"Ошибка при поиске экскурсий: {e}", exc_info=True)
         return []
@@ -325,23 +249,12 @@ async def search_excursions(query: str, excursion_type: str = "private") -> list
 async def search_transfers(query: str) -> list:
     """Поиск трансферов"""
     try:
-        # Используем API для поиска трансферов
-        api = PelagosAPI(api_key=os.getenv("PELAGOS_API_KEY"))
-
-        # Получаем все трансферы
-        all_transfers = await api.get_all_transfers()
-
-        # Выполняем нечеткий поиск
-        results = hybrid_search(
-            query=query,
-            items=all_transfers,
-            field_name="name",
+        return await get_search_index().search(
+            "transfers",
+            query,
             limit=10,
             threshold=50
         )
-
-        await api.close()
-        return results
     except Exception as e:
         logger.error(f"Ошибка при поиске трансферов: {e}", exc_info=True)
         return []
@@ -461,15 +374,7 @@ async def display_excursion_results(message: Message, query: str, results: list,
     elif excursion_type in ["group", "companions"]:
         # ИСПРАВЛЕНИЕ: Дозагружаем цены для групповых экскурсий
         if excursion_type == "group":
-            logger.info(f"📊 Дозагрузка цен для {len(excursions)} найденных групповых экскурсий...")
-            loader = get_data_loader()
-            for excursion in excursions:
-                if not excursion.get('price_usd') or excursion.get('price_usd') == 0:
-                    full_excursion = await loader.get_excursion_by_id(excursion['id'])
-                    if full_excursion and full_excursion.get('price_usd'):
-                        excursion['price'] = full_excursion['price_usd']
-                        excursion['price_usd'] = full_excursion['price_usd']
-                        logger.info(f"   ✓ {excursion['name']}: ${full_excursion['price_usd']} за чел")
+            excursions = await get_data_loader().fill_missing_prices(excursions)
 
         # Сохраняем найденные экскурсии
         await state.update_data(
@@ -524,11 +429,11 @@ async def display_transfer_results(message: Message, query: str, results: list,
 
     for i, (transfer, score) in enumerate(results[:5], 1):
         # Получаем локацию
-        location_id = transfer.location if hasattr(transfer, 'location') else 0
+        location_id = transfer.get('location') or 0
         location_names = {9: "Себу", 10: "Бохол", 8: "Боракай", 0: "Общие"}
         location_name = location_names.get(location_id, "Неизвестно")
 
-        text += f"{i}. <b>{transfer.name}</b>\n"
+        text += f"{i}. <b>{transfer['name']}</b>\n"
         text += f"   📍 {location_name}\n"
 
         # Показываем процент совпадения
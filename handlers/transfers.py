@@ -23,6 +23,7 @@ from utils.contact_handler import contact_handler
 from utils.order_manager import order_manager
 from utils.helpers import send_items_page
 from utils.media_manager import get_transfer_photo
+from utils.price_table import prices_for_records
 
 router = Router()
 
@@ -206,20 +207,25 @@ async def send_transfers_cards_page(message: Message, state: FSMContext, page: i
     end_idx = min(start_idx + per_page, len(transfers))
     loader = get_data_loader()
 
-    updated = False
-    for i in range(start_idx, end_idx):
-        if not transfers[i].get('prices_loaded'):
-            transfer_with_prices = await loader.transfers_loader.get_transfer_with_prices(transfers[i]['id'])
+    unpriced = [i for i in range(start_idx, end_idx) if not transfers[i].get('prices_loaded')]
+    if unpriced:
+        loaded = await loader.transfers_loader.get_transfers_with_prices([transfers[i]['id'] for i in unpriced])
+        for i, transfer_with_prices in zip(unpriced, loaded):
             if transfer_with_prices:
                 transfers[i] = transfer_with_prices
-                updated = True
 
-    if updated:
         await state.update_data(transfers=transfers)
 
+    # Цены страницы для выбранного количества людей - одним проходом
+    page_transfers = transfers[start_idx:end_idx]
+    page_prices = dict(zip(
+        (transfer['id'] for transfer in page_transfers),
+        prices_for_records(page_transfers, people_count)
+    ))
+
     # Функция форматирования карточки
     def format_card(transfer):
-        return get_transfer_card_text(transfer, people_count)
+        return get_transfer_card_text(transfer, people_count, page_prices.get(transfer['id']))
 
     # Функция создания клавиатуры
     def get_keyboard(transfer):
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк нечеткого поиска на синтетических данных
+
+Использование:
+    python search_benchmark.py                     # 1k / 10k / 50k документов
+    python search_benchmark.py --sizes 1000 5000   # свои размеры
+    python search_benchmark.py --queries 200       # больше запросов на размер
+
+Сравнивает:
+    fuzzy_search  - старый поиск (process.extract, тексты собираются на каждый запрос)
+    hybrid_search - FuzzyMatcher из кэша hybrid_search (строится первым запросом)
+    FuzzyMatcher  - матчер, подготовленный заранее (как в SearchIndex)
+"""
+
+import argparse
+import random
+import statistics
+import time
+
+from utils.search_utils import FuzzyMatcher, fuzzy_search, hybrid_search
+
+WORDS = [
+    "beach", "resort", "island", "hotel", "villa", "garden", "ocean", "view",
+    "diving", "waterfall", "tour", "private", "sunset", "paradise", "palm",
+    "boracay", "cebu", "bohol", "palawan", "manila", "coral", "bay", "lagoon",
+    "пляж", "остров", "водопад", "дайвинг", "экскурсия", "закат", "бухта",
+]
+QUERIES = ["beach resort", "водопад", "boracay", "дайвинг тур", "ocean viw", "пальма", "lagoon bay", "private"]
+
+
+def make_items(count, seed=42):
+    """Сгенерировать документы с name/description"""
+    rnd = random.Random(seed)
+    return [
+        {
+            'id': str(i),
+            'name': " ".join(rnd.choices(WORDS, k=rnd.randint(2, 5))).title(),
+            'description': " ".join(rnd.choices(WORDS, k=rnd.randint(6, 15))),
+        }
+        for i in range(count)
+    ]
+
+
+def measure(func, queries):
+    """Время каждого вызова в миллисекундах"""
+    timings = []
+    for query in queries:
+        started = time.perf_counter()
+        func(query)
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def report(name, timings):
+    timings = sorted(timings)
+    p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+    print(f"   {name:<14} median {statistics.median(timings):8.2f} ms   p95 {p95:8.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Бенчмарк нечеткого поиска'
+    )
+    parser.add_argument(
+        '--sizes',
+        type=int,
+        nargs='+',
+        default=[1000, 10000, 50000],
+        help='Количество документов (по умолчанию: 1000 10000 50000)'
+    )
+    parser.add_argument(
+        '--queries',
+        type=int,
+        default=40,
+        help='Запросов на каждый размер'
+    )
+
+    args = parser.parse_args()
+    queries = [QUERIES[i % len(QUERIES)] for i in range(args.queries)]
+
+    for size in args.sizes:
+        items = make_items(size)
+
+        started = time.perf_counter()
+        matcher = FuzzyMatcher(items)
+        build_ms = (time.perf_counter() - started) * 1000
+
+        print(f"\n📊 {size} документов (подготовка FuzzyMatcher: {build_ms:.1f} ms)")
+        report("fuzzy_search", measure(lambda q: fuzzy_search(q, items, limit=10, threshold=60), queries))
+        report("hybrid_search", measure(lambda q: hybrid_search(q, items, limit=10, threshold=60), queries))
+        report("FuzzyMatcher", measure(lambda q: matcher.search(q, limit=10, threshold=60), queries))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,32 +1,235 @@
 import aiohttp
 import asyncio
-from typing import Any, Dict, Optional
+import random
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, Optional, Tuple
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Текущий счётчик сбоев загрузки (см. track_failures)
+_failure_scope: ContextVar[Optional["FailureScope"]] = ContextVar("api_failure_scope", default=None)
+
+
+class UpstreamUnavailableError(Exception):
+    """
+    API недоступен: таймауты/5xx/сетевые ошибки после всех повторов
+    или открыт circuit breaker endpoint'а.
+
+    Отличает "API лежит" от "пустого результата" (None/пустой список).
+    """
+
+    def __init__(self, endpoint: str, message: str):
+        super().__init__(f"{endpoint}: {message}")
+        self.endpoint = endpoint
+
+
+class FailureScope:
+    """
+    Счётчик сбоев API в рамках одной загрузки
+
+    Учитываются только запросы, которые сделала сама загрузка (включая
+    задачи, запущенные внутри неё), - сбои чужих запросов и других
+    endpoint'ов на результат не влияют. Области могут быть вложенными:
+    сбой засчитывается всем объемлющим.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self._parent: Optional["FailureScope"] = None
+        self._token = None
+
+    @property
+    def failed(self) -> bool:
+        """Был ли хотя бы один сбой - результат мог быть неполным"""
+        return self.count > 0
+
+    def __enter__(self) -> "FailureScope":
+        self._parent = _failure_scope.get()
+        self._token = _failure_scope.set(self)
+        return self
+
+    def __exit__(self, *exc_info) -> bool:
+        _failure_scope.reset(self._token)
+        return False
+
+
+def track_failures() -> FailureScope:
+    """
+    Отслеживать сбои API внутри блока
+
+    Пример:
+        with track_failures() as failures:
+            data = await build()
+        if failures.failed:
+            return Uncached(data)
+    """
+    return FailureScope()
+
+
+def record_upstream_failure():
+    """Засчитать сбой текущей загрузке (и всем объемлющим)"""
+    scope = _failure_scope.get()
+    while scope is not None:
+        scope.count += 1
+        scope = scope._parent
+
+
+class _TransientError(Exception):
+    """Временная ошибка запроса (таймаут, 5xx, 429, сетевая) - можно повторить"""
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker для одного endpoint
+
+    closed → (failure_threshold ошибок подряд) → open → (reset_timeout) → half-open
+    В half-open пропускается один пробный запрос: успех закрывает breaker,
+    ошибка снова открывает.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+
+    def allow_request(self) -> bool:
+        """Можно ли отправить запрос сейчас"""
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN:
+            if time.monotonic() - self._opened_at < self.reset_timeout:
+                return False
+            self.state = self.HALF_OPEN
+            self._probe_in_flight = False
+        # HALF_OPEN: только один пробный запрос
+        if self._probe_in_flight:
+            return False
+        self._probe_in_flight = True
+        return True
+
+    def release_probe(self):
+        """Пробный запрос прерван без результата (отмена) - следующий запрос станет пробным"""
+        self._probe_in_flight = False
+
+    def record_success(self):
+        """Запрос прошёл (включая 4xx - API отвечает)"""
+        self.state = self.CLOSED
+        self._failures = 0
+        self._probe_in_flight = False
+
+    def record_failure(self):
+        """Запрос завершился временной ошибкой"""
+        self._failures += 1
+        self._probe_in_flight = False
+        if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+            self.state = self.OPEN
+            self._opened_at = time.monotonic()
+
+
 class APIClient:
     """Базовый класс для работы с HTTP API"""
-    
-    def __init__(self, base_url: str, api_key: str = None, timeout: int = 10):
+
+    def __init__(
+        self,
+        base_url: str,
+        api_key: str = None,
+        timeout: int = 10,
+        max_concurrency: int = 20,
+        max_per_endpoint: int = 8,
+        max_retries: int = 2,
+        backoff_base: float = 0.5,
+        backoff_max: float = 5.0,
+        breaker_threshold: int = 5,
+        breaker_reset_timeout: float = 30.0
+    ):
+        """
+        Args:
+            base_url: базовый URL API
+            api_key: ключ API (заголовок X-Key)
+            timeout: таймаут одного запроса в секундах
+            max_concurrency: максимум одновременных запросов ко всему API
+            max_per_endpoint: максимум одновременных запросов к одному endpoint
+                (export-hotels, export-hotels-rooms-prices, ...)
+            max_retries: количество повторов GET при временных ошибках
+            backoff_base: базовая задержка экспоненциального backoff (секунды)
+            backoff_max: максимальная задержка между повторами (секунды)
+            breaker_threshold: ошибок подряд до открытия circuit breaker
+            breaker_reset_timeout: сколько секунд breaker открыт до пробного запроса
+        """
         self.base_url = base_url.rstrip('/')
         self.api_key = api_key
         self.timeout = timeout
+        self.max_concurrency = max_concurrency
+        self.max_per_endpoint = max_per_endpoint
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker_threshold = breaker_threshold
+        self.breaker_reset_timeout = breaker_reset_timeout
         self._session: Optional[aiohttp.ClientSession] = None
-    
+        # Ограничители параллельности: общий и по endpoint
+        self._global_semaphore = asyncio.Semaphore(max_concurrency)
+        self._endpoint_semaphores: Dict[str, asyncio.Semaphore] = {}
+        # Circuit breaker'ы по endpoint
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        # Выполняющиеся GET запросы: {(method, url, params): Task}
+        self._inflight: Dict[Tuple, asyncio.Task] = {}
+
     async def get_session(self) -> aiohttp.ClientSession:
         """Ленивое создание сессии"""
         if self._session is None or self._session.closed:
             headers = {}
             if self.api_key:
                 headers['X-Key'] = f'{self.api_key}'
-            
+
+            # Пул соединений не больше лимита параллельных запросов
+            connector = aiohttp.TCPConnector(
+                limit=self.max_concurrency,
+                limit_per_host=self.max_concurrency,
+                ttl_dns_cache=300
+            )
             self._session = aiohttp.ClientSession(
                 headers=headers,
+                connector=connector,
                 timeout=aiohttp.ClientTimeout(total=self.timeout)
             )
         return self._session
-    
+
+    def _endpoint_name(self, url: str) -> str:
+        """Имя endpoint - первый сегмент пути: export-hotels-rooms-prices/123/ → export-hotels-rooms-prices"""
+        path = url[len(self.base_url):].lstrip('/')
+        return path.split('/', 1)[0]
+
+    def _get_endpoint_semaphore(self, url: str) -> asyncio.Semaphore:
+        """Семафор для endpoint"""
+        endpoint = self._endpoint_name(url)
+        semaphore = self._endpoint_semaphores.get(endpoint)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.max_per_endpoint)
+            self._endpoint_semaphores[endpoint] = semaphore
+        return semaphore
+
+    def _get_breaker(self, endpoint: str) -> CircuitBreaker:
+        """Circuit breaker для endpoint"""
+        breaker = self._breakers.get(endpoint)
+        if breaker is None:
+            breaker = CircuitBreaker(self.breaker_threshold, self.breaker_reset_timeout)
+            self._breakers[endpoint] = breaker
+        return breaker
+
+    def get_breaker_states(self) -> Dict[str, str]:
+        """Состояния circuit breaker'ов по endpoint (для логов/диагностики)"""
+        return {endpoint: breaker.state for endpoint, breaker in self._breakers.items()}
+
     async def request(
         self,
         method: str,
@@ -35,10 +238,136 @@ class APIClient:
         json: Optional[Dict] = None,
         **kwargs
     ) -> Optional[Dict[str, Any]]:
-        """Общий метод для запросов"""
-        session = await self.get_session()
+        """
+        Общий метод для запросов
+
+        Одинаковые GET запросы (method + URL + params), выполняющиеся
+        одновременно, объединяются: в API уходит один запрос,
+        все вызывающие получают его результат.
+
+        GET запросы повторяются с backoff при временных ошибках и проходят
+        через circuit breaker endpoint'а. Остальные методы не повторяются.
+        UpstreamUnavailableError засчитывается области track_failures()
+        каждого вызывающего (и при объединённом запросе).
+
+        Returns:
+            JSON ответа или None (4xx, для не-GET - любая ошибка)
+
+        Raises:
+            UpstreamUnavailableError: GET не удался после всех повторов
+                или breaker открыт
+        """
         url = f"{self.base_url}/{endpoint.lstrip('/')}"
 
+        if method.upper() != 'GET':
+            try:
+                return await self._send_request(method, url, params=params, json=json, **kwargs)
+            except _TransientError:
+                return None
+
+        try:
+            if json is not None or kwargs:
+                return await self._get_with_retries(method, url, params=params, json=json, **kwargs)
+
+            key = self._make_inflight_key(method, url, params)
+            task = self._inflight.get(key)
+            if task is None:
+                task = asyncio.ensure_future(self._get_with_retries(method, url, params=params))
+                self._inflight[key] = task
+                task.add_done_callback(lambda t: self._on_inflight_done(key, t))
+            else:
+                logger.debug(f"Coalesced: {method} {url} {params or ''}")
+
+            # shield: отмена одного ожидающего не отменяет общий запрос для остальных
+            return await asyncio.shield(task)
+        except UpstreamUnavailableError:
+            record_upstream_failure()
+            raise
+
+    def _on_inflight_done(self, key: Tuple, task: asyncio.Task):
+        """Убрать завершённый запрос из списка выполняющихся"""
+        self._inflight.pop(key, None)
+        if not task.cancelled():
+            # Помечаем исключение полученным, даже если все ожидающие отменились
+            task.exception()
+
+    @staticmethod
+    def _make_inflight_key(method: str, url: str, params: Optional[Dict]) -> Tuple:
+        """Ключ для объединения одинаковых запросов"""
+        params_key = tuple(sorted((str(k), str(v)) for k, v in (params or {}).items()))
+        return (method.upper(), url, params_key)
+
+    def _backoff_delay(self, attempt: int) -> float:
+        """Экспоненциальный backoff с full jitter"""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    async def _get_with_retries(
+        self,
+        method: str,
+        url: str,
+        params: Optional[Dict] = None,
+        **kwargs
+    ) -> Optional[Dict[str, Any]]:
+        """Идемпотентный запрос с повторами и circuit breaker"""
+        endpoint = self._endpoint_name(url)
+        breaker = self._get_breaker(endpoint)
+        started = time.monotonic()
+
+        for attempt in range(self.max_retries + 1):
+            if not breaker.allow_request():
+                logger.warning(f"⚡ Circuit breaker открыт для {endpoint}, запрос {url} отклонён")
+                raise UpstreamUnavailableError(endpoint, "circuit breaker open")
+
+            try:
+                data = await self._send_request(method, url, params=params, **kwargs)
+            except _TransientError as e:
+                breaker.record_failure()
+                delay = self._backoff_delay(attempt)
+                # Повторяем только пока укладываемся в бюджет одного таймаута
+                out_of_budget = time.monotonic() - started + delay > self.timeout
+                if attempt >= self.max_retries or out_of_budget or breaker.state == CircuitBreaker.OPEN:
+                    raise UpstreamUnavailableError(endpoint, str(e)) from e
+                logger.warning(f"🔁 Повтор {attempt + 1}/{self.max_retries} для {url} через {delay:.2f}s: {e}")
+                await asyncio.sleep(delay)
+                continue
+            except BaseException:
+                # Отмена или неожиданная ошибка: пробный запрос half-open не должен
+                # остаться "в полёте" навсегда, иначе endpoint отклоняется до рестарта
+                breaker.release_probe()
+                raise
+
+            breaker.record_success()
+            return data
+
+    async def _send_request(
+        self,
+        method: str,
+        url: str,
+        params: Optional[Dict] = None,
+        json: Optional[Dict] = None,
+        **kwargs
+    ) -> Optional[Dict[str, Any]]:
+        """Выполнить HTTP запрос (с учётом лимитов параллельности)"""
+        # Сначала слот endpoint, потом общий - чтобы не держать общий слот в очереди к endpoint
+        async with self._get_endpoint_semaphore(url), self._global_semaphore:
+            return await self._send_limited(method, url, params=params, json=json, **kwargs)
+
+    async def _send_limited(
+        self,
+        method: str,
+        url: str,
+        params: Optional[Dict] = None,
+        json: Optional[Dict] = None,
+        **kwargs
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Выполнить HTTP запрос (слот в семафорах уже занят)
+
+        Raises:
+            _TransientError: таймаут, 5xx, 429 или сетевая ошибка
+        """
+        session = await self.get_session()
+
         params_str = f"?{params}" if params else ""
         logger.debug(f"Request: {method} {url}{params_str}")
 
@@ -57,25 +386,29 @@ class APIClient:
                     error_text = await response.text()
                     logger.error(f"API error: {response.status} for {url}")
                     logger.error(f"Response: {error_text[:500]}")
+                    if response.status >= 500 or response.status == 429:
+                        raise _TransientError(f"HTTP {response.status}")
                     return None
-                    
+
         except asyncio.TimeoutError:
             logger.error(f"Timeout for {url}")
-            return None
+            raise _TransientError("timeout")
         except aiohttp.ClientError as e:
             logger.error(f"Client error for {url}: {e}")
-            return None
+            raise _TransientError(str(e))
+        except _TransientError:
+            raise
         except Exception as e:
             logger.error(f"Unexpected error for {url}: {e}")
             return None
-    
+
     async def get(self, endpoint: str, params: Optional[Dict] = None, **kwargs):
         return await self.request('GET', endpoint, params=params, **kwargs)
-    
+
     async def post(self, endpoint: str, json: Optional[Dict] = None, **kwargs):
         return await self.request('POST', endpoint, json=json, **kwargs)
-    
+
     async def close(self):
         """Закрытие сессии (вызывать при завершении)"""
         if self._session and not self._session.closed:
-            await self._session.close()
\ No newline at end of file
+            await self._session.close()
@@ -1,7 +1,9 @@
+import asyncio
 import logging
-from typing import Any, Dict, List, Optional
+from contextlib import aclosing
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
 
-from .api_client import APIClient
+from .api_client import APIClient, FailureScope, UpstreamUnavailableError, track_failures
 from .schemas import Hotel, HotelRoom, Pagination, Region, RoomPrices, Service, ExcursionMonth, ExcursionEvent, Transfer
 
 logger = logging.getLogger(__name__)
@@ -10,11 +12,34 @@ logger = logging.getLogger(__name__)
 class PelagosAPI:
     """Сервис для работы с API Pelagos"""
 
-    def __init__(self, api_key: str = None):
+    # Сколько страниц одного списка загружается параллельно
+    PAGE_CONCURRENCY = 4
+
+    def __init__(self, api_key: str = None, max_concurrency: int = 20, max_per_endpoint: int = 8):
+        """
+        Args:
+            api_key: ключ Pelagos API
+            max_concurrency: максимум одновременных запросов к app.pelagos.ru
+            max_per_endpoint: максимум одновременных запросов к одному endpoint
+        """
         self.client = APIClient(
-            base_url="https://app.pelagos.ru", api_key=api_key, timeout=30
+            base_url="https://app.pelagos.ru",
+            api_key=api_key,
+            timeout=30,
+            max_concurrency=max_concurrency,
+            max_per_endpoint=max_per_endpoint
         )
 
+    @staticmethod
+    def track_failures() -> FailureScope:
+        """
+        Отслеживать сбои запросов, сделанных внутри блока
+
+        Если за время сборки данных был сбой - результат мог быть неполным
+        и кэшировать его не стоит. Сбои параллельных чужих загрузок не учитываются.
+        """
+        return track_failures()
+
     # === РЕГИОНЫ ===
 
     async def get_regions(self) -> List[Region]:
@@ -76,28 +101,29 @@ class PelagosAPI:
         return {"hotels": hotels, "pagination": pagination, "raw_data": data}
 
     async def get_all_hotels(self, location_code: str) -> List[Hotel]:
-        """Получить ВСЕ отели региона (автоматическая пагинация)"""
-        all_hotels = []
-        perpage = 50
-        start = 0
-
-        while True:
-            result = await self.get_hotels(location_code, perpage, start)
-            hotels = result["hotels"]
-
-            if not hotels:
-                break
-
-            all_hotels.extend(hotels)
-
-            # Проверяем, есть ли еще отели
-            pagination = result["pagination"]
-            if pagination and (start + perpage >= pagination.total):
-                break
-
-            start += perpage
+        """Получить ВСЕ отели региона (автоматическая пагинация, страницы параллельно)"""
+        return await self._collect_pages(self._iter_pages(
+            lambda start, perpage: self.get_hotels(location_code, perpage, start),
+            "hotels",
+            perpage=50
+        ))
+
+    async def iter_hotels(self, location_code: str) -> AsyncIterator[Hotel]:
+        """
+        Отели региона по мере загрузки страниц (async for)
 
-        return all_hotels
+        Порядок страниц не гарантирован - для сортированного списка используйте get_all_hotels.
+        Недогруженные страницы отменяются при закрытии генератора: при выходе
+        из цикла раньше времени оборачивайте его в contextlib.aclosing().
+        """
+        async with aclosing(self._iter_pages(
+            lambda start, perpage: self.get_hotels(location_code, perpage, start),
+            "hotels",
+            perpage=50
+        )) as pages:
+            async for _, hotels in pages:
+                for hotel in hotels:
+                    yield hotel
 
 
     # === НОМЕРА В ОТЕЛЕ ===
@@ -235,68 +261,27 @@ class PelagosAPI:
     # === УТИЛИТЫ ===
 
     async def get_all_rooms(self, hotel_id: int) -> List[HotelRoom]:
-        """Получить ВСЕ номера отеля (автоматическая пагинация)"""
-        all_rooms = []
-        perpage = 50
-        start = 0
-        max_iterations = 10  # Защита: максимум 500 номеров (10 * 50)
-
-        iteration = 0
-        while iteration < max_iterations:
-            iteration += 1
-
-            result = await self.get_rooms(hotel_id, perpage, start)
-            rooms = result["rooms"]
-
-            if not rooms:
-                break
-
-            all_rooms.extend(rooms)
-
-            # Проверяем, есть ли еще номера
-            pagination = result["pagination"]
-            if not pagination:
-                break
-
-            if start + perpage >= pagination.total:
-                break
-
-            start += perpage
-
-        if iteration >= max_iterations:
-            logger.warning(
-                f"⚠️ get_all_rooms({hotel_id}): достигнут лимит итераций ({max_iterations}), загружено {len(all_rooms)} номеров"
-            )
-
-        return all_rooms
+        """Получить ВСЕ номера отеля (автоматическая пагинация, страницы параллельно)"""
+        return await self._collect_pages(self._iter_rooms_pages(hotel_id))
+
+    def _iter_rooms_pages(self, hotel_id: int) -> AsyncIterator[Tuple[int, list]]:
+        """Страницы номеров: максимум 500 номеров (10 * 50), без pages - только первая страница"""
+        return self._iter_pages(
+            lambda start, perpage: self.get_rooms(hotel_id, perpage, start),
+            "rooms",
+            perpage=50,
+            max_pages=10,
+            follow_without_total=False,
+            name=f"get_all_rooms({hotel_id})"
+        )
 
     async def get_all_services(self, search: Optional[str] = None) -> List[Service]:
-        """Получить ВСЕ услуги (автоматическая пагинация)"""
-        all_services = []
-        perpage = 50
-        start = 0
-
-        while True:
-            params = {"perpage": perpage, "start": start}
-            if search:
-                params["search"] = search
-
-            result = await self.get_services(**params)
-            services = result["services"]
-
-            if not services:
-                break
-
-            all_services.extend(services)
-
-            # Проверяем, есть ли еще услуги
-            pagination = result["pagination"]
-            if pagination and (start + perpage >= pagination.total):
-                break
-
-            start += perpage
-
-        return all_services
+        """Получить ВСЕ услуги (автоматическая пагинация, страницы параллельно)"""
+        return await self._collect_pages(self._iter_pages(
+            lambda start, perpage: self.get_services(perpage=perpage, start=start, search=search),
+            "services",
+            perpage=50
+        ))
 
     # === ЭКСКУРСИИ ===
 
@@ -688,7 +673,7 @@ class PelagosAPI:
         location_id: int = None
     ) -> List[Transfer]:
         """
-        Получить ВСЕ трансферы (автоматическая пагинация)
+        Получить ВСЕ трансферы (автоматическая пагинация, страницы параллельно)
 
         Args:
             location_id: ID локации для фильтрации (опционально)
@@ -696,27 +681,100 @@ class PelagosAPI:
         Returns:
             список Transfer
         """
-        all_transfers = []
-        perpage = 200
-        start = 0
-
-        while True:
-            result = await self.get_transfers(location_id=location_id, perpage=perpage, start=start)
-            transfers = result["transfers"]
+        return await self._collect_pages(self._iter_pages(
+            lambda start, perpage: self.get_transfers(location_id=location_id, perpage=perpage, start=start),
+            "transfers",
+            perpage=200
+        ))
 
-            if not transfers:
-                break
+    # === ПАГИНАЦИЯ ===
 
-            all_transfers.extend(transfers)
-
-            # Проверяем, есть ли еще трансферы
-            pagination = result["pagination"]
-            if pagination and (start + perpage >= pagination.total):
-                break
+    async def _iter_pages(
+        self,
+        fetch_page: Callable[[int, int], Awaitable[Dict[str, Any]]],
+        items_key: str,
+        perpage: int,
+        max_pages: Optional[int] = None,
+        follow_without_total: bool = True,
+        name: Optional[str] = None
+    ) -> AsyncIterator[Tuple[int, list]]:
+        """
+        Общий пагинатор: страницы (start, items) по мере прихода
 
-            start += perpage
+        Запрашивает первую страницу, по pages.total определяет остальные и
+        загружает их параллельно (не более PAGE_CONCURRENCY одновременно).
+        Оставшиеся запросы отменяются в finally - то есть при закрытии
+        генератора (aclose/aclosing), а не в момент выхода из async for.
 
-        return all_transfers
+        Args:
+            fetch_page: корутина (start, perpage) → dict с items_key и pagination
+            items_key: ключ списка элементов в ответе fetch_page
+            perpage: размер страницы
+            max_pages: максимум страниц (защита от огромных ответов)
+            follow_without_total: если в ответе нет pages - идти по страницам
+                последовательно до пустой (False - только первая страница)
+            name: имя для логов при достижении max_pages
+        """
+        first = await fetch_page(0, perpage)
+        items = first[items_key]
+        if not items:
+            return
+        yield 0, items
+
+        pagination = first["pagination"]
+        if not pagination:
+            if not follow_without_total:
+                return
+            # Без total параллелить нечего - последовательно до пустой страницы
+            start = perpage
+            while max_pages is None or start // perpage < max_pages:
+                result = await fetch_page(start, perpage)
+                items = result[items_key]
+                if not items:
+                    return
+                yield start, items
+                start += perpage
+            return
+
+        starts = list(range(perpage, pagination.total, perpage))
+        if max_pages is not None and len(starts) >= max_pages:
+            starts = starts[:max_pages - 1]
+            logger.warning(
+                f"⚠️ {name or items_key}: достигнут лимит страниц ({max_pages}), загружено не больше {max_pages * perpage} из {pagination.total}"
+            )
+        if not starts:
+            return
+
+        semaphore = asyncio.Semaphore(self.PAGE_CONCURRENCY)
+
+        async def fetch(start: int) -> Tuple[int, list]:
+            async with semaphore:
+                result = await fetch_page(start, perpage)
+            return start, result[items_key]
+
+        tasks = [asyncio.ensure_future(fetch(start)) for start in starts]
+        try:
+            for next_page in asyncio.as_completed(tasks):
+                start, items = await next_page
+                if items:
+                    yield start, items
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+                elif not task.cancelled():
+                    # Ошибки остальных страниц уже не нужны - помечаем полученными
+                    task.exception()
+
+    @staticmethod
+    async def _collect_pages(pages: AsyncIterator[Tuple[int, list]]) -> list:
+        """Собрать все страницы пагинатора в один список в порядке страниц"""
+        chunks = {}
+        # aclosing: при ошибке страницы остальные запросы отменяются сразу, а не при сборке мусора
+        async with aclosing(pages):
+            async for start, items in pages:
+                chunks[start] = items
+        return [item for start in sorted(chunks) for item in chunks[start]]
 
     async def close(self):
         """Закрыть соединение"""
@@ -1,52 +1,199 @@
 """Менеджер кэширования с использованием Redis
     python clear_cache.py
-    python clear_cache.py --pattern "room:price:*" Очистит только цены
+    python clear_cache.py --pattern "room:schedule:*" Очистит только цены номеров
     python clear_cache.py --pattern "hotel:rooms:*" Очистит только номера отелей
     python clear_cache.py --stats Посмотреть статистику кэша
 
+Все операции асинхронные (redis.asyncio) и не блокируют event loop:
+медленный ответ Redis задерживает только тот хэндлер, который его ждёт.
 
+Перед Redis стоит L1 кэш в памяти процесса (utils/local_cache.py) для горячих
+ключей из LOCAL_CACHE_RULES.
+
+Списки записей из ID_INDEX_RULES при каждой записи в кэш дополнительно
+раскладываются в индекс ID → запись (Redis hash idx:{ключ списка} + L1),
+поэтому поиск записи по ID - одно чтение get_indexed() / get_list_record()
+вместо перебора списков. Индекс пересобирается вместе со списком и истекает
+вместе с ним: удалённые из API записи из индекса пропадают.
+
+get_or_load() реализует stale-while-revalidate: ключ живёт в Redis
+ttl + stale_ttl секунд; после ttl устаревшее значение отдаётся сразу,
+а обновление выполняет одна фоновая задача. Дорогие ключи дополнительно
+защищены от cache stampede: lock пересборки в Redis (один процесс собирает,
+остальные ждут) и вероятностное раннее обновление до истечения ttl.
 """
+import asyncio
 import json
 import logging
+import math
 import os
-from typing import Optional, Any
-import redis
+import random
+import time
+import uuid
+from typing import Optional, Any, List, Callable, Awaitable, Dict
 from datetime import timedelta
 
+import redis.asyncio as aioredis
+from redis.exceptions import ConnectionError as RedisConnectionError, TimeoutError as RedisTimeoutError, WatchError
+
+from services.api_client import record_upstream_failure
+from utils.local_cache import LocalCache, MISSING
+
 logger = logging.getLogger(__name__)
 
+# Правила L1 кэша: {префикс: (максимум записей, TTL в секундах)}
+# TTL L1 дополнительно ограничивается оставшимся TTL ключа в Redis
+LOCAL_CACHE_RULES = {
+    "locations:all": (1, 3600),
+    "packages:all": (1, 300),
+    "all_private_excursions": (1, 300),
+    "private_excursions_island_": (32, 300),
+    "islands_with_count": (1, 300),
+    "transfers:": (16, 300),
+    "hotel:rooms:": (2000, 600),
+    "service:prices:": (5000, 600),
+    # Записи индексов ID: idx:{ключ списка}:{id} и результаты get_indexed() idx:{индекс}:{id}
+    "idx:transfers:": (5000, 300),
+    "idx:packages:": (2000, 300),
+    "idx:private_excursions:": (5000, 300),
+    "idx:private_excursions_island_": (5000, 300),
+    "idx:all_private_excursions:": (5000, 300),
+    "idx:hotel:rooms:": (20000, 600),
+    "idx:excursions:": (10000, 300),
+    "idx:daily_excursions_island_": (5000, 300),
+}
+
+# Списки, записи которых индексируются по ID:
+# {префикс_ключа_списка: индекс для get_indexed() или None}
+# Индекс списка - hash idx:{ключ списка} {id: запись} с TTL списка. Списки с
+# именем индекса дополнительно перечисляются в idx:lists:{индекс} - get_indexed()
+# ищет ID во всех закэшированных списках индекса; без имени запись доступна
+# только по ключу списка (get_list_record), как номера конкретного отеля.
+ID_INDEX_RULES = {
+    "transfers:": "transfers",
+    "packages:all": "packages",
+    "private_excursions_island_": "private_excursions",
+    "all_private_excursions": "private_excursions",
+    "hotel:rooms:": None,
+    # Источники реестра экскурсий: списки и календари месяца {дата: [...]}
+    "excursions:": None,
+    "daily_excursions_island_": None,
+}
+
+
+class Uncached:
+    """
+    Результат loader'а для get_or_load(), который нужно вернуть, но не кэшировать
+
+    Например, данные собраны во время сбоя API и могут быть неполными.
+    """
+
+    def __init__(self, value: Any):
+        self.value = value
 
-class CacheManager:
-    """Менеджер для кэширования данных в Redis"""
 
-    def __init__(self, host: str = 'localhost', port: int = 6379, db: int = 0):
+class CacheManager:
+    """Менеджер для асинхронного кэширования данных в Redis"""
+
+    # Префикс lock'ов пересборки ключей (get_or_load с lock_timeout)
+    LOCK_PREFIX = "lock:rebuild:"
+    # Как часто ожидающие процессы проверяют, появилось ли значение
+    LOCK_POLL_INTERVAL = 0.2
+    # Длительность сборки по умолчанию для раннего обновления (пока не измерена)
+    DEFAULT_LOAD_DURATION = 1.0
+    # Сколько раз update() повторяет запись, если ключ перезаписали параллельно
+    UPDATE_RETRIES = 3
+    # Снять lock, только если значение совпадает с токеном владельца
+    _RELEASE_LOCK_SCRIPT = """
+        if redis.call('get', KEYS[1]) == ARGV[1] then
+            return redis.call('del', KEYS[1])
+        end
+        return 0
+    """
+    # Префикс индексов ID списков и перечней списков индекса (см. ID_INDEX_RULES)
+    INDEX_PREFIX = "idx:"
+    INDEX_LISTS_PREFIX = "idx:lists:"
+    # Найти ID в индексах всех списков из перечня; истёкшие списки убрать из перечня
+    _INDEX_LOOKUP_SCRIPT = """
+        local found = false
+        for _, list_key in ipairs(redis.call('smembers', KEYS[1])) do
+            local index_key = ARGV[1] .. list_key
+            if not found then
+                found = redis.call('hget', index_key, ARGV[2])
+            end
+            if redis.call('exists', index_key) == 0 then
+                redis.call('srem', KEYS[1], list_key)
+            end
+        end
+        return found
+    """
+    # Обновить поля (ARGV[2], ARGV[3], ...: id, запись) в индексах списков, где они уже есть
+    _INDEX_UPDATE_SCRIPT = """
+        local updated = 0
+        for _, list_key in ipairs(redis.call('smembers', KEYS[1])) do
+            local index_key = ARGV[1] .. list_key
+            for i = 2, #ARGV, 2 do
+                if redis.call('hexists', index_key, ARGV[i]) == 1 then
+                    redis.call('hset', index_key, ARGV[i], ARGV[i + 1])
+                    updated = updated + 1
+                end
+            end
+        end
+        return updated
+    """
+
+    def __init__(self, host: str = 'localhost', port: int = 6379, db: int = 0, max_connections: int = 50):
         """
-        Инициализация Redis клиента
+        Инициализация Redis клиента с пулом соединений
+
+        Соединение устанавливается лениво, проверка доступности - в connect()
 
         Args:
             host: хост Redis сервера
             port: порт Redis сервера
             db: номер базы данных
+            max_connections: максимальный размер пула соединений
+        """
+        self.host = host
+        self.port = port
+        # BlockingConnectionPool ждёт свободное соединение вместо ошибки "Too many connections"
+        self.pool = aioredis.BlockingConnectionPool(
+            host=host,
+            port=port,
+            db=db,
+            decode_responses=True,
+            socket_connect_timeout=2,
+            socket_timeout=2,
+            max_connections=max_connections,
+            timeout=2
+        )
+        self.redis_client = aioredis.Redis(connection_pool=self.pool)
+        self.enabled = True
+        self.local = LocalCache(LOCAL_CACHE_RULES)
+        # Фоновые обновления устаревших ключей: {key: Task}
+        self._refresh_tasks: Dict[str, asyncio.Task] = {}
+        # Загрузки отсутствующих ключей (одна на ключ в процессе): {key: Task}
+        self._load_tasks: Dict[str, asyncio.Task] = {}
+        # Длительность последней сборки ключа (секунды) - для раннего обновления
+        self._load_durations: Dict[str, float] = {}
+
+    async def connect(self) -> bool:
+        """
+        Проверить соединение с Redis (вызывать при старте бота)
+
+        Returns:
+            True если Redis доступен, False иначе (кэширование отключается)
         """
         try:
-            self.redis_client = redis.Redis(
-                host=host,
-                port=port,
-                db=db,
-                decode_responses=True,
-                socket_connect_timeout=2,
-                socket_timeout=2
-            )
-            # Проверяем соединение
-            self.redis_client.ping()
+            await self.redis_client.ping()
             self.enabled = True
-            logger.info(f"✅ Redis подключен: {host}:{port}")
-        except (redis.ConnectionError, redis.TimeoutError) as e:
+            logger.info(f"✅ Redis подключен: {self.host}:{self.port}")
+        except (RedisConnectionError, RedisTimeoutError, OSError) as e:
             logger.warning(f"⚠️ Redis недоступен, кэширование отключено: {e}")
-            self.redis_client = None
             self.enabled = False
+        return self.enabled
 
-    def get(self, key: str) -> Optional[Any]:
+    async def get(self, key: str) -> Optional[Any]:
         """
         Получить значение из кэша
 
@@ -56,21 +203,70 @@ class CacheManager:
         Returns:
             Значение или None если не найдено
         """
+        value = self.local.get(key)
+        if value is not MISSING:
+            return value
+
         if not self.enabled:
             return None
 
         try:
-            value = self.redis_client.get(key)
+            if self.local.match(key):
+                # Для L1 нужен оставшийся TTL - берём его тем же round-trip
+                async with self.redis_client.pipeline(transaction=False) as pipe:
+                    pipe.get(key)
+                    pipe.pttl(key)
+                    value, pttl = await pipe.execute()
+            else:
+                value, pttl = await self.redis_client.get(key), None
+
             if value:
                 logger.debug(f"✓ Кэш HIT: {key}")
-                return json.loads(value)
+                decoded = json.loads(value)
+                self._store_local(key, decoded, pttl)
+                return decoded
             logger.debug(f"✗ Кэш MISS: {key}")
             return None
         except Exception as e:
             logger.error(f"Ошибка чтения из кэша: {e}")
             return None
 
-    def set(self, key: str, value: Any, ttl: int = 300) -> bool:
+    async def mget(self, keys: List[str]) -> List[Optional[Any]]:
+        """
+        Получить несколько значений из кэша за один запрос
+
+        Args:
+            keys: список ключей
+
+        Returns:
+            Список значений в порядке ключей (None для отсутствующих)
+        """
+        results = [self.local.get(key) for key in keys]
+        missing = [i for i, value in enumerate(results) if value is MISSING]
+        for i in missing:
+            results[i] = None
+
+        if not self.enabled or not missing:
+            return results
+
+        try:
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                pipe.mget([keys[i] for i in missing])
+                for i in missing:
+                    pipe.pttl(keys[i])
+                values, *pttls = await pipe.execute()
+
+            for i, value, pttl in zip(missing, values, pttls):
+                if value:
+                    decoded = json.loads(value)
+                    self._store_local(keys[i], decoded, pttl)
+                    results[i] = decoded
+            return results
+        except Exception as e:
+            logger.error(f"Ошибка пакетного чтения из кэша: {e}")
+            return results
+
+    async def set(self, key: str, value: Any, ttl: int = 300, local_ttl: Optional[int] = None) -> bool:
         """
         Сохранить значение в кэш
 
@@ -78,23 +274,533 @@ class CacheManager:
             key: ключ для сохранения
             value: значение (будет сериализовано в JSON)
             ttl: время жизни в секундах (по умолчанию 5 минут)
+            local_ttl: время жизни в L1, если должно быть меньше ttl
 
         Returns:
             True если успешно, False иначе
         """
+        self.local.set(key, value, ttl=ttl if local_ttl is None else min(ttl, local_ttl))
+        index = self._index_records(key, value, ttl)
+
         if not self.enabled:
             return False
 
         try:
             json_value = json.dumps(value, ensure_ascii=False)
-            self.redis_client.setex(key, timedelta(seconds=ttl), json_value)
+            # MULTI: список и его индекс меняются атомарно
+            async with self.redis_client.pipeline(transaction=index is not None) as pipe:
+                pipe.setex(key, timedelta(seconds=ttl), json_value)
+                if index:
+                    self._queue_index(pipe, key, *index, ttl)
+                await pipe.execute()
             logger.debug(f"✓ Кэш SET: {key} (TTL: {ttl}s)")
             return True
         except Exception as e:
             logger.error(f"Ошибка записи в кэш: {e}")
             return False
 
-    def delete(self, key: str) -> bool:
+    async def replace(self, key: str, value: Any) -> bool:
+        """
+        Перезаписать значение существующего ключа, сохранив оставшийся TTL
+
+        Для дополнения уже закэшированных данных (например, дозагруженными
+        ценами) без продления их жизни. Отсутствующий ключ не создаётся.
+
+        Returns:
+            True если значение перезаписано, False иначе
+        """
+        # Значение в L1 устарело - следующий get возьмёт новое из Redis вместе с TTL
+        self.local.delete(key)
+
+        if not self.enabled:
+            return False
+
+        try:
+            json_value = json.dumps(value, ensure_ascii=False)
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                pipe.set(key, json_value, xx=True, keepttl=True)
+                pipe.ttl(key)
+                replaced, ttl = await pipe.execute()
+
+            # Индекс пересобираем только вместе с существующим списком, с его оставшимся TTL
+            index = self._index_records(key, value, ttl) if replaced and ttl > 0 else None
+            if index:
+                async with self.redis_client.pipeline(transaction=True) as pipe:
+                    self._queue_index(pipe, key, *index, ttl)
+                    await pipe.execute()
+            logger.debug(f"✓ Кэш REPLACE: {key}")
+            return bool(replaced)
+        except Exception as e:
+            logger.error(f"Ошибка записи в кэш: {e}")
+            return False
+
+    async def update(self, key: str, transform: Callable[[Any], Any]) -> bool:
+        """
+        Изменить значение существующего ключа, сохранив оставшийся TTL
+
+        В отличие от replace, transform применяется к актуальному значению из
+        Redis (WATCH/MULTI): если ключ перезаписали между чтением и записью
+        (например, фоновое обновление SWR), transform повторяется на новой
+        версии - более свежий список не затирается дополненным старым.
+
+        Args:
+            key: ключ кэша
+            transform: функция (текущее значение) -> новое значение или None (менять нечего)
+
+        Returns:
+            True если значение перезаписано, False иначе
+        """
+        if not self.enabled:
+            return False
+
+        try:
+            for _ in range(self.UPDATE_RETRIES):
+                async with self.redis_client.pipeline(transaction=True) as pipe:
+                    try:
+                        await pipe.watch(key)
+                        raw = await pipe.get(key)
+                        ttl = await pipe.ttl(key)
+                        if not raw or ttl <= 0:
+                            return False
+                        value = transform(json.loads(raw))
+                        if value is None:
+                            return False
+
+                        pipe.multi()
+                        pipe.set(key, json.dumps(value, ensure_ascii=False), xx=True, keepttl=True)
+                        index = self._index_records(key, value, ttl)
+                        if index:
+                            self._queue_index(pipe, key, *index, ttl)
+                        await pipe.execute()
+                    except WatchError:
+                        logger.debug(f"🔁 Кэш UPDATE: {key} изменён параллельно, повторяем")
+                        continue
+
+                # Значение в L1 устарело - следующий get возьмёт новое из Redis вместе с TTL
+                self.local.delete(key)
+                logger.debug(f"✓ Кэш UPDATE: {key}")
+                return True
+
+            logger.warning(f"⚠️ Не удалось обновить {key}: ключ постоянно перезаписывается")
+            return False
+        except Exception as e:
+            logger.error(f"Ошибка записи в кэш: {e}")
+            return False
+
+    async def wait_loading(self, key: str):
+        """Дождаться загрузки или фонового обновления ключа, если они выполняются в этом процессе"""
+        tasks = [task for task in (self._load_tasks.get(key), self._refresh_tasks.get(key)) if task is not None]
+        if tasks:
+            await asyncio.wait(tasks)
+
+    async def get_or_load(
+        self,
+        key: str,
+        loader: Callable[[], Awaitable[Any]],
+        ttl: int,
+        stale_ttl: int = 0,
+        lock_timeout: int = 0,
+        early_beta: float = 0.0
+    ) -> Any:
+        """
+        Получить значение с stale-while-revalidate и защитой от cache stampede
+
+        - свежее значение (младше ttl) - отдаётся как есть
+        - устаревшее (ttl истёк, но ещё живо stale_ttl) - отдаётся сразу,
+          в фоне запускается одно обновление на ключ
+        - отсутствующее - загружается loader'ом и кэшируется
+
+        Одновременные промахи по ключу внутри процесса объединяются в одну загрузку.
+        Если loader вернул Uncached, сбой засчитывается области track_failures()
+        каждого ожидающего - собранные из такого значения данные тоже неполные.
+        С lock_timeout загрузку между процессами защищает lock в Redis: ключ
+        пересобирает только владелец lock'а, остальные ждут появления значения.
+
+        Args:
+            key: ключ кэша
+            loader: корутина-фабрика, строящая значение (может вернуть Uncached)
+            ttl: "мягкий" TTL - сколько значение считается свежим
+            stale_ttl: сколько ещё после ttl можно отдавать устаревшее значение
+            lock_timeout: время жизни lock'а пересборки в секундах (0 - без lock'а);
+                должно быть больше времени работы loader'а
+            early_beta: коэффициент вероятностного раннего обновления (0 - выключено,
+                1.0 - стандартный); чем дольше строится значение, тем раньше
+                до истечения ttl запускается фоновое обновление
+
+        Returns:
+            Значение из кэша или результат loader'а
+        """
+        value = self.local.get(key)
+        if value is not MISSING:
+            return value
+
+        if self.enabled:
+            try:
+                async with self.redis_client.pipeline(transaction=False) as pipe:
+                    pipe.get(key)
+                    pipe.pttl(key)
+                    raw, pttl = await pipe.execute()
+
+                if raw:
+                    value = json.loads(raw)
+                    # -1 - ключ без TTL, считаем свежим
+                    fresh_left = (pttl / 1000 - stale_ttl) if pttl >= 0 else None
+                    if fresh_left is None or fresh_left > 0:
+                        self.local.set(key, value, ttl=fresh_left)
+                        logger.debug(f"✓ Кэш HIT: {key}")
+                        if early_beta and fresh_left is not None and self._should_refresh_early(key, fresh_left, early_beta):
+                            logger.debug(f"⏳ Раннее обновление: {key} (осталось {fresh_left:.1f}s)")
+                            self._schedule_refresh(key, loader, ttl, stale_ttl, lock_timeout)
+                    else:
+                        logger.debug(f"⌛ Кэш STALE: {key}, обновляем в фоне")
+                        self._schedule_refresh(key, loader, ttl, stale_ttl, lock_timeout)
+                    return value
+            except Exception as e:
+                logger.error(f"Ошибка чтения из кэша: {e}")
+
+        task = self._load_tasks.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._load_locked(key, loader, ttl, stale_ttl, lock_timeout))
+            self._load_tasks[key] = task
+            task.add_done_callback(lambda t: self._on_load_done(key, t))
+        # shield: отмена одного ожидающего не отменяет загрузку для остальных
+        value = await asyncio.shield(task)
+        if isinstance(value, Uncached):
+            record_upstream_failure()
+            return value.value
+        return value
+
+    def _on_load_done(self, key: str, task: asyncio.Task):
+        """Убрать завершённую загрузку из списка выполняющихся"""
+        self._load_tasks.pop(key, None)
+        if not task.cancelled():
+            # Помечаем исключение полученным, даже если все ожидающие отменились
+            task.exception()
+
+    def _should_refresh_early(self, key: str, fresh_left: float, beta: float) -> bool:
+        """
+        Вероятностное раннее истечение (XFetch)
+
+        Обновляем, если -delta * beta * ln(rand) >= оставшегося времени,
+        где delta - длительность последней сборки ключа. Вероятность растёт
+        к концу ttl, поэтому обновление запускает один из запросов, а не все сразу.
+        """
+        delta = self._load_durations.get(key, self.DEFAULT_LOAD_DURATION)
+        return -delta * beta * math.log(1.0 - random.random()) >= fresh_left
+
+    async def _load_locked(
+        self,
+        key: str,
+        loader: Callable[[], Awaitable[Any]],
+        ttl: int,
+        stale_ttl: int,
+        lock_timeout: int,
+        wait: bool = True
+    ) -> Any:
+        """
+        Загрузить значение под lock'ом пересборки в Redis
+
+        Args:
+            wait: ждать значения, если ключ пересобирает другой процесс
+                (False - сразу вернуть MISSING, для фоновых обновлений)
+        """
+        if not lock_timeout or not self.enabled:
+            return await self._load_and_store(key, loader, ttl, stale_ttl)
+
+        token = await self._acquire_lock(key, lock_timeout)
+        if token is None:
+            if not wait:
+                logger.debug(f"🔒 {key} уже пересобирается другим процессом")
+                return MISSING
+            value = await self._wait_for_value(key, lock_timeout)
+            if value is not MISSING:
+                return value
+            # Владелец lock'а не успел или не сохранил результат - собираем сами
+            logger.warning(f"⚠️ Не дождались пересборки {key}, загружаем сами")
+            return await self._load_and_store(key, loader, ttl, stale_ttl)
+
+        try:
+            return await self._load_and_store(key, loader, ttl, stale_ttl)
+        finally:
+            await self._release_lock(key, token)
+
+    async def _acquire_lock(self, key: str, lock_timeout: int) -> Optional[str]:
+        """
+        Взять lock пересборки ключа (SET NX PX)
+
+        Returns:
+            Токен владельца или None, если lock держит другой процесс.
+            При ошибке Redis возвращается токен - загрузка идёт без lock'а.
+        """
+        token = uuid.uuid4().hex
+        try:
+            acquired = await self.redis_client.set(
+                f"{self.LOCK_PREFIX}{key}", token, nx=True, px=int(lock_timeout * 1000)
+            )
+            return token if acquired else None
+        except Exception as e:
+            logger.error(f"Ошибка захвата lock'а {key}: {e}")
+            return token
+
+    async def _release_lock(self, key: str, token: str):
+        """Снять lock, только если он всё ещё наш (мог истечь и достаться другому)"""
+        try:
+            await self.redis_client.eval(self._RELEASE_LOCK_SCRIPT, 1, f"{self.LOCK_PREFIX}{key}", token)
+        except Exception as e:
+            logger.error(f"Ошибка снятия lock'а {key}: {e}")
+
+    async def _wait_for_value(self, key: str, lock_timeout: int) -> Any:
+        """
+        Дождаться, пока другой процесс сохранит ключ
+
+        Returns:
+            Значение или MISSING, если lock снят/истёк, а значения нет
+        """
+        lock_key = f"{self.LOCK_PREFIX}{key}"
+        deadline = time.monotonic() + lock_timeout
+        while time.monotonic() < deadline:
+            await asyncio.sleep(self.LOCK_POLL_INTERVAL)
+            try:
+                async with self.redis_client.pipeline(transaction=False) as pipe:
+                    pipe.get(key)
+                    pipe.exists(lock_key)
+                    raw, locked = await pipe.execute()
+            except Exception as e:
+                logger.error(f"Ошибка ожидания пересборки {key}: {e}")
+                return MISSING
+            if raw:
+                logger.debug(f"✓ Дождались пересборки: {key}")
+                return json.loads(raw)
+            if not locked:
+                return MISSING
+        return MISSING
+
+    async def _load_and_store(
+        self,
+        key: str,
+        loader: Callable[[], Awaitable[Any]],
+        ttl: int,
+        stale_ttl: int
+    ) -> Any:
+        """
+        Выполнить loader и сохранить результат (ttl + stale_ttl в Redis, ttl в L1)
+
+        Returns:
+            Значение или Uncached как есть (разворачивает get_or_load)
+        """
+        started = time.monotonic()
+        value = await loader()
+        if isinstance(value, Uncached):
+            return value
+        self._load_durations[key] = time.monotonic() - started
+        if value:
+            await self.set(key, value, ttl=ttl + stale_ttl, local_ttl=ttl)
+        return value
+
+    def _schedule_refresh(
+        self,
+        key: str,
+        loader: Callable[[], Awaitable[Any]],
+        ttl: int,
+        stale_ttl: int,
+        lock_timeout: int = 0
+    ):
+        """Запустить фоновое обновление ключа (не более одного на ключ)"""
+        task = self._refresh_tasks.get(key)
+        if task is not None and not task.done():
+            return
+
+        async def refresh():
+            try:
+                value = await self._load_locked(key, loader, ttl, stale_ttl, lock_timeout, wait=False)
+                if value is not MISSING and not isinstance(value, Uncached):
+                    logger.info(f"🔄 Кэш обновлён в фоне: {key}")
+            except Exception as e:
+                logger.error(f"❌ Ошибка фонового обновления {key}: {e}")
+            finally:
+                self._refresh_tasks.pop(key, None)
+
+        self._refresh_tasks[key] = asyncio.create_task(refresh())
+
+    async def hget(self, key: str, field: str) -> Optional[Any]:
+        """
+        Получить поле Redis hash (значения хранятся в JSON, в L1 не попадают)
+
+        Returns:
+            Значение или None если поля/ключа нет
+        """
+        if not self.enabled:
+            return None
+
+        try:
+            value = await self.redis_client.hget(key, field)
+            return json.loads(value) if value else None
+        except Exception as e:
+            logger.error(f"Ошибка чтения из кэша: {e}")
+            return None
+
+    async def hset_many(self, key: str, mapping: Dict[str, Any], ttl: int) -> bool:
+        """
+        Записать поля Redis hash одним запросом и обновить TTL всего hash
+
+        Args:
+            key: ключ hash
+            mapping: {поле: значение} (значения сериализуются в JSON)
+            ttl: время жизни hash в секундах
+
+        Returns:
+            True если успешно, False иначе
+        """
+        if not self.enabled or not mapping:
+            return False
+
+        try:
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                pipe.hset(key, mapping={field: json.dumps(value, ensure_ascii=False) for field, value in mapping.items()})
+                pipe.expire(key, ttl)
+                await pipe.execute()
+            logger.debug(f"✓ Кэш HSET: {key} ({len(mapping)} полей, TTL: {ttl}s)")
+            return True
+        except Exception as e:
+            logger.error(f"Ошибка записи в кэш: {e}")
+            return False
+
+    async def get_indexed(self, index: str, record_id: Any) -> Optional[Any]:
+        """
+        Найти запись по ID во всех закэшированных списках индекса (см. ID_INDEX_RULES)
+
+        Один EVAL: скрипт перебирает списки из idx:lists:{index} и попутно
+        убирает из перечня истёкшие.
+
+        Args:
+            index: имя индекса ("transfers", "packages", "private_excursions")
+            record_id: ID записи
+
+        Returns:
+            Запись или None, если ни один закэшированный список её не содержит.
+            Словарь может быть общим (L1) - перед изменением его нужно скопировать.
+        """
+        local_key = f"idx:{index}:{record_id}"
+        value = self.local.get(local_key)
+        if value is not MISSING:
+            return value
+
+        if not self.enabled:
+            return None
+
+        try:
+            raw = await self.redis_client.eval(
+                self._INDEX_LOOKUP_SCRIPT, 1, f"{self.INDEX_LISTS_PREFIX}{index}", self.INDEX_PREFIX, str(record_id)
+            )
+        except Exception as e:
+            logger.error(f"Ошибка чтения из кэша: {e}")
+            return None
+
+        value = json.loads(raw) if raw else None
+        if value is not None:
+            self.local.set(local_key, value)
+        return value
+
+    async def get_list_record(self, key: str, record_id: Any) -> Optional[Any]:
+        """
+        Найти запись по ID в индексе конкретного закэшированного списка
+
+        Args:
+            key: ключ списка (например, hotel:rooms:{hotel_id})
+            record_id: ID записи
+
+        Returns:
+            Запись или None, если список истёк или записи в нём нет
+        """
+        local_key = f"{self.INDEX_PREFIX}{key}:{record_id}"
+        value = self.local.get(local_key)
+        if value is not MISSING:
+            return value
+
+        value = await self.hget(f"{self.INDEX_PREFIX}{key}", str(record_id))
+        if value is not None:
+            self.local.set(local_key, value)
+        return value
+
+    async def set_indexed(self, index: str, records: List[dict]) -> int:
+        """
+        Обновить записи в индексах списков, где они уже есть, без перезаписи самих списков
+
+        Например, записи с дозагруженными ценами: следующий get_indexed()
+        в любом процессе вернёт уже дополненную запись. TTL индексов не
+        меняется, записей, которых в списках нет, индекс не получает.
+
+        Args:
+            index: имя индекса
+            records: записи с полем id
+
+        Returns:
+            Количество обновлённых полей индексов
+        """
+        mapping = {str(record['id']): record for record in records}
+        for field, record in mapping.items():
+            self.local.set(f"idx:{index}:{field}", record)
+
+        if not self.enabled or not mapping:
+            return 0
+
+        args = []
+        for field, record in mapping.items():
+            args.extend((field, json.dumps(record, ensure_ascii=False)))
+        try:
+            return await self.redis_client.eval(
+                self._INDEX_UPDATE_SCRIPT, 1, f"{self.INDEX_LISTS_PREFIX}{index}", self.INDEX_PREFIX, *args
+            )
+        except Exception as e:
+            logger.error(f"Ошибка записи в кэш: {e}")
+            return 0
+
+    def _index_records(self, key: str, value: Any, ttl: int) -> Optional[tuple]:
+        """
+        Разложить записи списка (или календаря {дата: [...]}) по ID
+        (L1 сразу, Redis - через _queue_index)
+
+        Returns:
+            (индекс или None, {id: запись}) или None, если ключ не индексируется
+        """
+        prefix = next((prefix for prefix in ID_INDEX_RULES if key.startswith(prefix)), None)
+        if prefix is None:
+            return None
+        if isinstance(value, dict):
+            records = [record for group in value.values() if isinstance(group, list) for record in group]
+        elif isinstance(value, list):
+            records = value
+        else:
+            return None
+
+        mapping = {}
+        for record in records:
+            if isinstance(record, dict) and record.get('id') is not None:
+                field = str(record['id'])
+                mapping[field] = record
+                self.local.set(f"{self.INDEX_PREFIX}{key}:{field}", record, ttl=ttl)
+        return ID_INDEX_RULES[prefix], mapping
+
+    def _queue_index(self, pipe, key: str, index: Optional[str], mapping: Dict[str, Any], ttl: int):
+        """
+        Добавить в pipeline пересборку индекса списка: новый hash заменяет
+        старый целиком (удалённые записи пропадают) и живёт столько же, сколько список
+        """
+        index_key = f"{self.INDEX_PREFIX}{key}"
+        pipe.delete(index_key)
+        if not mapping:
+            return
+        pipe.hset(index_key, mapping={field: json.dumps(value, ensure_ascii=False) for field, value in mapping.items()})
+        pipe.expire(index_key, ttl)
+        if index:
+            # Перечень списков индекса ограничен числом ключей списков (острова и т.п.),
+            # истёкшие списки из него убирает get_indexed()
+            lists_key = f"{self.INDEX_LISTS_PREFIX}{index}"
+            pipe.sadd(lists_key, key)
+            pipe.expire(lists_key, ttl, nx=True)
+            pipe.expire(lists_key, ttl, gt=True)
+
+    async def delete(self, key: str) -> bool:
         """
         Удалить значение из кэша
 
@@ -104,36 +810,41 @@ class CacheManager:
         Returns:
             True если успешно, False иначе
         """
+        self.local.delete(key)
+
         if not self.enabled:
             return False
 
         try:
-            self.redis_client.delete(key)
+            # Индекс списка удаляется вместе с ним
+            await self.redis_client.delete(key, f"{self.INDEX_PREFIX}{key}")
             logger.debug(f"✓ Кэш DELETE: {key}")
             return True
         except Exception as e:
             logger.error(f"Ошибка удаления из кэша: {e}")
             return False
 
-    def flush_all(self) -> bool:
+    async def flush_all(self) -> bool:
         """
         Очистить весь кэш
 
         Returns:
             True если успешно, False иначе
         """
+        self.local.clear()
+
         if not self.enabled:
             return False
 
         try:
-            self.redis_client.flushdb()
+            await self.redis_client.flushdb()
             logger.info("✓ Кэш полностью очищен")
             return True
         except Exception as e:
             logger.error(f"Ошибка очистки кэша: {e}")
             return False
 
-    def get_stats(self) -> dict:
+    async def get_stats(self) -> dict:
         """
         Получить статистику кэша
 
@@ -141,13 +852,14 @@ class CacheManager:
             Словарь со статистикой или пустой словарь если Redis недоступен
         """
         if not self.enabled:
-            return {'enabled': False}
+            return {'enabled': False, 'local': self.local.get_stats()}
 
         try:
-            info = self.redis_client.info('stats')
+            info = await self.redis_client.info('stats')
             return {
                 'enabled': True,
-                'keys': self.redis_client.dbsize(),
+                'local': self.local.get_stats(),
+                'keys': await self.redis_client.dbsize(),
                 'hits': info.get('keyspace_hits', 0),
                 'misses': info.get('keyspace_misses', 0),
                 'hit_rate': self._calculate_hit_rate(
@@ -159,6 +871,18 @@ class CacheManager:
             logger.error(f"Ошибка получения статистики: {e}")
             return {'enabled': False, 'error': str(e)}
 
+    def _store_local(self, key: str, value: Any, pttl: Optional[int]):
+        """Положить значение, прочитанное из Redis, в L1 (не дольше оставшегося TTL)"""
+        if pttl is None or pttl == -2:
+            return
+        # -1 - ключ без TTL, тогда действует TTL правила L1
+        self.local.set(key, value, ttl=pttl / 1000 if pttl > 0 else None)
+
+    async def close(self):
+        """Закрыть пул соединений (вызывать при завершении)"""
+        await self.redis_client.aclose()
+        await self.pool.disconnect()
+
     @staticmethod
     def _calculate_hit_rate(hits: int, misses: int) -> float:
         """Вычислить hit rate в процентах"""
@@ -179,7 +903,8 @@ def get_cache_manager() -> CacheManager:
         # Читаем настройки из переменных окружения
         host = os.getenv('REDIS_HOST', 'localhost')
         port = int(os.getenv('REDIS_PORT', '6379'))
-        _cache_manager_instance = CacheManager(host=host, port=port)
+        max_connections = int(os.getenv('REDIS_MAX_CONNECTIONS', '50'))
+        _cache_manager_instance = CacheManager(host=host, port=port, max_connections=max_connections)
     return _cache_manager_instance
 
 
@@ -4,6 +4,8 @@ from typing import Optional
 from services.pelagos_api import PelagosAPI
 from utils.loaders import HotelsLoader, TransfersLoader, PackagesLoader
 from utils.loaders.excursions import ExcursionsLoader
+from utils.cache_manager import get_cache_manager
+from utils.service_prices import ServicePrices
 
 logger = logging.getLogger(__name__)
 
@@ -16,11 +18,14 @@ class DataLoader:
         Args:
             api: API для работы с отелями, экскурсиями, трансферами и турами (Pelagos API)
         """
+        # Цены ежедневных экскурсий, трансферов и туров - из одного общего кэша
+        self.service_prices = ServicePrices(api, get_cache_manager())
+
         # Инициализируем специализированные загрузчики
         self.hotels_loader = HotelsLoader(api=api)
-        self.excursions_loader = ExcursionsLoader(api=api)
-        self.transfers_loader = TransfersLoader(api=api)
-        self.packages_loader = PackagesLoader(api=api)
+        self.excursions_loader = ExcursionsLoader(api=api, service_prices=self.service_prices)
+        self.transfers_loader = TransfersLoader(api=api, service_prices=self.service_prices)
+        self.packages_loader = PackagesLoader(api=api, service_prices=self.service_prices)
 
     # ========== ОТЕЛИ (делегирование в HotelsLoader) ==========
 
@@ -87,6 +92,18 @@ class DataLoader:
             date=date
         )
 
+    async def get_group_excursions_by_date(self, date: str, island: str = None) -> list:
+        """Получить групповые экскурсии на дату с ценами"""
+        return await self.excursions_loader.get_group_excursions_by_date(date, island=island)
+
+    async def get_group_excursions_by_month(self, year: int, month: int, island: str = None) -> list:
+        """Получить групповые экскурсии за месяц с ценами"""
+        return await self.excursions_loader.get_group_excursions_by_month(year, month, island=island)
+
+    async def fill_missing_prices(self, excursions: list) -> list:
+        """Дозагрузить цены экскурсиям без price_usd (параллельно), возвращает новый список"""
+        return await self.excursions_loader.fill_missing_prices(excursions)
+
     async def get_excursion_by_id(self, excursion_id: str) -> dict:
         """Получить экскурсию по ID"""
         return await self.excursions_loader.get_excursion_by_id(excursion_id)
@@ -109,6 +126,10 @@ class DataLoader:
         """Получить пакетный тур по ID с ценами"""
         return await self.packages_loader.get_package_with_prices(package_id)
 
+    async def get_packages_with_prices(self, package_ids: list) -> list:
+        """Получить пакетные туры по ID с ценами (параллельно)"""
+        return await self.packages_loader.get_packages_with_prices(package_ids)
+
     def get_price_for_people_count(self, package: dict, people_count: int) -> float:
         """Получить цену тура для указанного количества людей"""
         return self.packages_loader.get_price_for_people_count(package, people_count)
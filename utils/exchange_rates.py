@@ -0,0 +1,146 @@
+"""Курсы валют (USD → RUB, PHP) с фоновым обновлением
+
+Раньше курсы запрашивались синхронным requests.get прямо из хэндлеров:
+медленный ответ exchangerate-api останавливал event loop для всех
+пользователей. Теперь курсы обновляются в фоне (aiohttp), делятся между
+процессами через Redis (один процесс ходит во внешний API под lock'ом),
+а чтение - синхронное из памяти процесса.
+"""
+import asyncio
+import logging
+from typing import Dict, Iterable, List, Optional
+
+import aiohttp
+
+from utils.cache_manager import CacheManager, Uncached, get_cache_manager
+
+logger = logging.getLogger(__name__)
+
+
+class ExchangeRates:
+    """Курсы валют в памяти процесса с фоновым обновлением"""
+
+    API_URL = "https://api.exchangerate-api.com/v4/latest/USD"
+    # Таймаут запроса к API курсов (секунды)
+    REQUEST_TIMEOUT = 5
+    # Ключ общих курсов в Redis
+    CACHE_KEY = "exchange_rates"
+    # Сколько курсы считаются свежими (1 час, как раньше)
+    CACHE_TTL = 3600
+    # Сколько ещё отдаются устаревшие курсы, если API курсов недоступен
+    CACHE_STALE_TTL = 86400
+    # Lock обновления - с запасом на таймаут запроса
+    LOCK_TIMEOUT = 15
+    # Как часто фоновая задача проверяет курсы
+    CHECK_INTERVAL = 300
+
+    # Курсы на случай недоступности API (и до первого обновления)
+    FALLBACK_RATES = {
+        "usd": 1.0,
+        "rub": 80.0,
+        "peso": 56.0
+    }
+    # Коды валют бота в ответе API
+    API_CODES = {
+        "rub": "RUB",
+        "peso": "PHP",  # PHP = Philippine Peso
+    }
+
+    def __init__(self, cache: CacheManager):
+        self.cache = cache
+        self._rates: Dict[str, float] = dict(self.FALLBACK_RATES)
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    def get_rates(self) -> Dict[str, float]:
+        """Текущие курсы {валюта: сколько за 1 USD} (только память, без запросов)"""
+        return self._rates
+
+    def convert(self, amount: float, from_currency: str, to_currency: str) -> float:
+        """Конвертация валюты по текущим курсам (через USD)"""
+        rates = self._rates
+        return round(amount / rates[from_currency] * rates[to_currency], 2)
+
+    def convert_many(self, amounts_usd: Iterable[float]) -> List[Dict[str, float]]:
+        """
+        Перевести суммы в USD во все валюты бота
+
+        Returns:
+            [{"usd": ..., "rub": ..., "peso": ...}, ...] в порядке amounts_usd
+        """
+        rates = self._rates
+        return [
+            {currency: round(amount * rate, 2) for currency, rate in rates.items()}
+            for amount in amounts_usd
+        ]
+
+    async def refresh(self):
+        """Обновить курсы из Redis (или из API, если общие курсы устарели/отсутствуют)"""
+        try:
+            rates = await self.cache.get_or_load(
+                self.CACHE_KEY,
+                self._fetch,
+                ttl=self.CACHE_TTL,
+                stale_ttl=self.CACHE_STALE_TTL,
+                lock_timeout=self.LOCK_TIMEOUT
+            )
+        except Exception as e:
+            logger.error(f"❌ Ошибка обновления курсов валют: {e}")
+            return
+
+        if rates:
+            self._rates = {**self.FALLBACK_RATES, **rates}
+
+    async def _fetch(self):
+        """Загрузить курсы из API (без кэша); при ошибке - Uncached(None), остаются прежние курсы"""
+        try:
+            timeout = aiohttp.ClientTimeout(total=self.REQUEST_TIMEOUT)
+            async with aiohttp.ClientSession(timeout=timeout) as session:
+                async with session.get(self.API_URL) as response:
+                    if response.status != 200:
+                        logger.warning(f"⚠️ API курсов валют вернул {response.status}")
+                        return Uncached(None)
+                    data = await response.json(content_type=None)
+        except Exception as e:
+            logger.warning(f"⚠️ API курсов валют недоступен: {e}")
+            return Uncached(None)
+
+        api_rates = data.get("rates", {})
+        rates = {"usd": 1.0}
+        for currency, code in self.API_CODES.items():
+            rates[currency] = float(api_rates.get(code) or self.FALLBACK_RATES[currency])
+
+        logger.info(f"💱 Курсы валют обновлены: {rates}")
+        return rates
+
+    def start(self):
+        """Запустить фоновое обновление курсов (вызывать при старте бота)"""
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self):
+        """Остановить фоновое обновление"""
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except asyncio.CancelledError:
+                pass
+            self._refresh_task = None
+
+    async def _refresh_loop(self):
+        """Периодически обновлять курсы"""
+        while True:
+            await self.refresh()
+            await asyncio.sleep(self.CHECK_INTERVAL)
+
+
+# Глобальный экземпляр
+_exchange_rates_instance = None
+
+
+def get_exchange_rates_service() -> ExchangeRates:
+    """Получить сервис курсов валют (до первого обновления - резервные курсы)"""
+    global _exchange_rates_instance
+    if _exchange_rates_instance is None:
+        _exchange_rates_instance = ExchangeRates(get_cache_manager())
+    return _exchange_rates_instance
@@ -3,7 +3,7 @@ import re
 import logging
 from datetime import datetime, timedelta
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton, Message
-import requests
+from utils.exchange_rates import get_exchange_rates_service
 
 logger = logging.getLogger(__name__)
 
@@ -162,62 +162,24 @@ def get_island_name_ru(island_code: str) -> str:
     return islands.get(island_code, island_code)
 
 
-# Кеш для курсов валют
-_exchange_rates_cache = None
-_cache_timestamp = None
-
-
 def get_exchange_rates() -> dict:
     """
-    Получение актуальных курсов валют из API с кешированием
-    Использует exchangerate-api.com (бесплатный, без регистрации)
-    Кеширование на 1 час
-    """
-    global _exchange_rates_cache, _cache_timestamp
-
-    # Проверяем кеш (обновляем раз в час)
-    if _exchange_rates_cache and _cache_timestamp:
-        if datetime.now() - _cache_timestamp < timedelta(hours=1):
-            return _exchange_rates_cache
-
-    # Fallback курсы на случай ошибки API
-    fallback_rates = {
-        "usd": 1.0,
-        "rub": 80.0,
-        "peso": 56.0
-    }
+    Актуальные курсы валют {валюта: сколько за 1 USD}
 
-    try:
-        # Используем бесплатный API exchangerate-api.com
-        response = requests.get("https://api.exchangerate-api.com/v4/latest/USD", timeout=5)
-        if response.status_code == 200:
-            data = response.json()
-            rates = data.get("rates", {})
-            _exchange_rates_cache = {
-                "usd": 1.0,
-                "rub": rates.get("RUB", 80.0),
-                "peso": rates.get("PHP", 56.0)  # PHP = Philippine Peso
-            }
-            _cache_timestamp = datetime.now()
-            return _exchange_rates_cache
-    except:
-        pass
-
-    # Возвращаем fallback
-    _exchange_rates_cache = fallback_rates
-    _cache_timestamp = datetime.now()
-    return fallback_rates
+    Читаются из памяти процесса; обновляет их в фоне сервис курсов
+    (utils/exchange_rates.py), поэтому вызов не блокирует event loop
+    """
+    return get_exchange_rates_service().get_rates()
 
 
 def convert_price(amount: float, from_currency: str, to_currency: str) -> float:
     """Конвертация валюты с актуальными курсами"""
-    rates = get_exchange_rates()
+    return get_exchange_rates_service().convert(amount, from_currency, to_currency)
 
-    # Конвертируем в USD, затем в целевую валюту
-    usd_amount = amount / rates[from_currency]
-    result = usd_amount * rates[to_currency]
 
-    return round(result, 2)
+def convert_prices(amounts_usd: list) -> list:
+    """Перевести суммы в USD во все валюты бота: [{"usd": ..., "rub": ..., "peso": ...}, ...]"""
+    return get_exchange_rates_service().convert_many(amounts_usd)
 
 
 def get_currency_symbol(currency: str) -> str:
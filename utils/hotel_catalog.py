@@ -0,0 +1,257 @@
+"""Резидентный индекс каталога отелей
+
+Держит в памяти процесса все отели загруженных локаций с доступом по ID
+за O(1): локация, звёзды, рейтинг (ord), фото и ID номеров. Хэндлеры
+бронирования вызывают get_hotel_by_id несколько раз на клик - с индексом
+это чтение из памяти вместо постраничного перебора export-hotels.
+
+Снимок каждой локации хранится в Redis (hotels:catalog:{code}) и
+обновляется в фоне: один процесс пересобирает его под lock'ом, остальные
+подхватывают готовый снимок. Локации, запрошенные хэндлерами сверх
+списка по умолчанию, обновляются, пока к ним обращаются. Отеля нет в
+снимке (добавлен в API после сборки) - снимок пересобирается из API.
+"""
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Set
+
+from services.pelagos_api import PelagosAPI
+from utils.cache_manager import CacheManager
+
+logger = logging.getLogger(__name__)
+
+
+class HotelCatalog:
+    """Индекс отелей по ID с фоновым обновлением по локациям"""
+
+    # Локации, которые загружаются при старте (острова из меню отелей)
+    DEFAULT_LOCATIONS = ("boracay", "cebu", "manila", "bohol", "palawan")
+    # Как часто снимок локации считается свежим (секунды)
+    REFRESH_INTERVAL = 1800
+    # Сколько ещё можно отдавать устаревший снимок, пока он пересобирается
+    STALE_TTL = 10800
+    # Lock пересборки снимка - с запасом на постраничную загрузку всех отелей
+    LOCK_TIMEOUT = 60
+    # Как часто фоновая задача проверяет снимки
+    CHECK_INTERVAL = 300
+    # Сколько запрошенная хэндлерами локация обновляется без новых обращений
+    REQUESTED_LOCATION_TTL = 86400
+    # Пересборка снимка при промахе по ID - не чаще раза в столько секунд на локацию
+    MISS_REBUILD_INTERVAL = 60
+
+    def __init__(self, api: Optional[PelagosAPI], cache: CacheManager, locations: Iterable[str] = DEFAULT_LOCATIONS):
+        """
+        Args:
+            api: Pelagos API
+            cache: менеджер кэша (снимки локаций хранятся в Redis)
+            locations: локации для фонового обновления; локации, запрошенные
+                хэндлерами, обновляются REQUESTED_LOCATION_TTL после последнего обращения
+        """
+        self.api = api
+        self.cache = cache
+        self._hotels: Dict[int, dict] = {}
+        # ID отелей локации в порядке API: {code: [hotel_id, ...]}
+        self._location_ids: Dict[str, List[int]] = {}
+        self._locations: Set[str] = set(locations)
+        # Локации, запрошенные хэндлерами: {code: время последнего обращения}
+        self._requested: Dict[str, float] = {}
+        self._loaded_at: Dict[str, float] = {}
+        # Последняя пересборка снимка из-за промаха по ID: {code: время}
+        self._rebuilt_at: Dict[str, float] = {}
+        # Загрузки и пересборки локаций (одна на ключ): {key: Task}
+        self._location_tasks: Dict[str, asyncio.Task] = {}
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    def get(self, hotel_id: int) -> Optional[dict]:
+        """
+        Найти отель в индексе (только память, без запросов)
+
+        Returns:
+            Словарь отеля (поля Hotel + location_code, room_ids) или None
+        """
+        return self._hotels.get(int(hotel_id))
+
+    async def lookup(self, hotel_id: int, location_code: Optional[str] = None) -> Optional[dict]:
+        """
+        Найти отель, при необходимости загрузив его локацию в индекс
+
+        Если локация уже загружена, а отеля в ней нет, снимок локации
+        пересобирается из API (не чаще MISS_REBUILD_INTERVAL) - отели,
+        добавленные после сборки, доступны сразу.
+
+        Args:
+            hotel_id: ID отеля
+            location_code: код локации (нужен, если локация ещё не в индексе)
+
+        Returns:
+            Словарь отеля или None
+        """
+        entry = self.get(hotel_id)
+        if entry is not None or not location_code:
+            return entry
+
+        if location_code not in self._loaded_at:
+            await self.ensure_location(location_code)
+        else:
+            await self._coalesced(f"{location_code}:rebuild", lambda: self.rebuild_location(location_code))
+        return self.get(hotel_id)
+
+    def hotels_in(self, location_code: str) -> List[dict]:
+        """Отели локации из индекса в порядке API (пустой список, если локация не загружена)"""
+        return [self._hotels[hotel_id] for hotel_id in self._location_ids.get(location_code, []) if hotel_id in self._hotels]
+
+    def set_room_ids(self, hotel_id: int, room_ids: List[int]):
+        """Запомнить ID номеров отеля (после загрузки номеров)"""
+        entry = self._hotels.get(int(hotel_id))
+        if entry is not None:
+            entry['room_ids'] = [int(room_id) for room_id in room_ids]
+
+    async def ensure_location(self, location_code: str):
+        """Загрузить локацию в индекс, если её там ещё нет (одновременные вызовы объединяются)"""
+        if location_code not in self._locations:
+            self._requested[location_code] = time.monotonic()
+        if location_code in self._loaded_at:
+            return
+        await self._coalesced(location_code, lambda: self.refresh_location(location_code))
+
+    async def _coalesced(self, key: str, factory: Callable[[], Awaitable[None]]):
+        """Выполнить загрузку один раз на ключ: одновременные вызовы ждут одну задачу"""
+        task = self._location_tasks.get(key)
+        if task is None:
+            task = asyncio.ensure_future(factory())
+            self._location_tasks[key] = task
+            task.add_done_callback(lambda _: self._location_tasks.pop(key, None))
+        await asyncio.shield(task)
+
+    async def rebuild_location(self, location_code: str):
+        """Пересобрать снимок локации из API в обход свежего кэша (не чаще MISS_REBUILD_INTERVAL)"""
+        if not self.api:
+            return
+        now = time.monotonic()
+        if now - self._rebuilt_at.get(location_code, -self.MISS_REBUILD_INTERVAL) < self.MISS_REBUILD_INTERVAL:
+            return
+        self._rebuilt_at[location_code] = now
+
+        try:
+            entries = await self._load_location(location_code)
+            if entries:
+                await self.cache.set(
+                    f"hotels:catalog:{location_code}",
+                    entries,
+                    ttl=self.REFRESH_INTERVAL + self.STALE_TTL,
+                    local_ttl=self.REFRESH_INTERVAL
+                )
+        except Exception as e:
+            logger.error(f"❌ Ошибка пересборки каталога отелей {location_code}: {e}")
+            return
+
+        self._apply(location_code, entries)
+
+    async def refresh_location(self, location_code: str):
+        """Обновить локацию в индексе из снимка Redis (или пересобрать снимок из API)"""
+        if not self.api:
+            return
+
+        try:
+            entries = await self.cache.get_or_load(
+                f"hotels:catalog:{location_code}",
+                lambda: self._load_location(location_code),
+                ttl=self.REFRESH_INTERVAL,
+                stale_ttl=self.STALE_TTL,
+                lock_timeout=self.LOCK_TIMEOUT
+            )
+        except Exception as e:
+            logger.error(f"❌ Ошибка обновления каталога отелей {location_code}: {e}")
+            return
+
+        self._apply(location_code, entries or [])
+
+    async def _load_location(self, location_code: str) -> List[dict]:
+        """Загрузить все отели локации из API и собрать записи индекса (без кэша)"""
+        logger.info(f"📡 Загрузка каталога отелей {location_code}...")
+        hotels = await self.api.get_all_hotels(location_code)
+
+        # ID номеров берём из уже закэшированных списков номеров - без запросов к API
+        rooms_cached = await self.cache.mget([f"hotel:rooms:{h.id}" for h in hotels]) if hotels else []
+
+        entries = []
+        for hotel, rooms in zip(hotels, rooms_cached):
+            entries.append({
+                'id': hotel.id,
+                'name': hotel.name,
+                'stars': hotel.stars,
+                'address': hotel.address,
+                'location': hotel.location,
+                'location_code': location_code,
+                'pics': hotel.pics,
+                'ord': hotel.ord,
+                'room_ids': [r['id'] for r in rooms] if rooms else None,
+            })
+
+        logger.info(f"✅ Каталог отелей {location_code}: {len(entries)} шт")
+        return entries
+
+    def _forget(self, location_code: str):
+        """Убрать локацию и её отели из индекса"""
+        for hotel_id in self._location_ids.pop(location_code, []):
+            self._hotels.pop(hotel_id, None)
+        self._loaded_at.pop(location_code, None)
+        self._rebuilt_at.pop(location_code, None)
+
+    def _expire_requested(self):
+        """Перестать обновлять запрошенные локации, к которым давно не обращались"""
+        now = time.monotonic()
+        for location_code, requested_at in list(self._requested.items()):
+            if now - requested_at > self.REQUESTED_LOCATION_TTL:
+                del self._requested[location_code]
+                self._forget(location_code)
+
+    def _apply(self, location_code: str, entries: List[dict]):
+        """Заменить отели локации в индексе"""
+        new_ids = []
+        for entry in entries:
+            hotel_id = int(entry['id'])
+            previous = self._hotels.get(hotel_id)
+            # Номера, загруженные после сборки снимка, не теряем
+            if previous and not entry.get('room_ids') and previous.get('room_ids'):
+                entry = dict(entry, room_ids=previous['room_ids'])
+            self._hotels[hotel_id] = entry
+            new_ids.append(hotel_id)
+
+        for hotel_id in set(self._location_ids.get(location_code, [])) - set(new_ids):
+            self._hotels.pop(hotel_id, None)
+
+        self._location_ids[location_code] = new_ids
+        self._loaded_at[location_code] = time.monotonic()
+
+    def start(self):
+        """Запустить фоновое обновление индекса (вызывать при старте бота)"""
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self):
+        """Остановить фоновое обновление"""
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except asyncio.CancelledError:
+                pass
+            self._refresh_task = None
+
+    async def _refresh_loop(self):
+        """Периодически обновлять локации по умолчанию и недавно запрошенные"""
+        while True:
+            self._expire_requested()
+            for location_code in sorted(self._locations | set(self._requested)):
+                await self.refresh_location(location_code)
+            logger.info(f"🏨 Каталог отелей обновлён: {len(self._hotels)} отелей в {len(self._loaded_at)} локациях")
+            await asyncio.sleep(self.CHECK_INTERVAL)
+
+    def get_stats(self) -> dict:
+        """Статистика индекса"""
+        return {
+            'hotels': len(self._hotels),
+            'locations': {code: len(ids) for code, ids in self._location_ids.items()},
+        }
@@ -3,9 +3,16 @@
 # TTL для разных типов кэша (в секундах)
 CACHE_TTL_GROUP = 3600  # 1 час для групповых
 CACHE_TTL_PRIVATE = 7200  # 2 часа для индивидуальных (меняются реже)
+CACHE_STALE_TTL_PRIVATE = 3600  # +1 час отдаём устаревшие индивидуальные, пока обновляются в фоне
 CACHE_TTL_COMPANIONS = 3600  # 1 час для попутчиков
 CACHE_TTL_DAILY = 7200  # 2 часа для ежедневных (меняются редко)
 
+# Сколько экскурсий одновременно дозагружают цены (детали события из API)
+PRICE_BACKFILL_CONCURRENCY = 8
+
+# Lock пересборки islands_with_count (секунды) - с запасом на загрузку всех экскурсий
+ISLANDS_LOCK_TIMEOUT = 60
+
 # Маппинг островов (location ID → код острова)
 LOCATION_MAP = {
     "cebu": 9,
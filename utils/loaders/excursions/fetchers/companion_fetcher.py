@@ -5,6 +5,7 @@ from datetime import datetime
 from services.pelagos_api import PelagosAPI
 from utils.cache_manager import CacheManager
 from ..constants import CACHE_TTL_COMPANIONS, LOCATION_MAP
+from ..registry import ExcursionRegistry, KIND_COMPANIONS
 from ..transformers import CompanionTransformer, BaseTransformer
 
 logger = logging.getLogger(__name__)
@@ -13,9 +14,10 @@ logger = logging.getLogger(__name__)
 class CompanionFetcher:
     """Класс для загрузки экскурсий с попутчиками"""
 
-    def __init__(self, api: PelagosAPI, cache: CacheManager):
+    def __init__(self, api: PelagosAPI, cache: CacheManager, registry: Optional[ExcursionRegistry] = None):
         self.api = api
         self.cache = cache
+        self.registry = registry
 
     async def get_by_month(self, island: str, year: int, month: int) -> List[dict]:
         """
@@ -31,7 +33,7 @@ class CompanionFetcher:
         """
         # Проверяем кэш
         cache_key = f"companions:{island}:{year}-{month:02d}"
-        cached = self.cache.get(cache_key)
+        cached = await self.cache.get(cache_key)
         if cached:
             logger.info(f"✓ Кэш HIT: {len(cached)} экскурсий с попутчиками")
             return cached
@@ -112,7 +114,9 @@ class CompanionFetcher:
             logger.info(f"  ✅ Найдено экскурсий для '{island}': {len(excursions)}")
 
             # Кэшируем
-            self.cache.set(cache_key, excursions, ttl=CACHE_TTL_COMPANIONS)
+            await self.cache.set(cache_key, excursions, ttl=CACHE_TTL_COMPANIONS)
+            if self.registry:
+                await self.registry.register(excursions, KIND_COMPANIONS, cache_key)
 
             return excursions
 
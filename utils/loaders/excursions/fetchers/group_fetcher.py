@@ -1,9 +1,11 @@
 """Загрузчик групповых экскурсий"""
 import logging
-from typing import List, Optional
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
 from services.pelagos_api import PelagosAPI
-from utils.cache_manager import CacheManager
+from utils.cache_manager import CacheManager, Uncached
 from ..constants import CACHE_TTL_GROUP
+from ..registry import ExcursionRegistry, KIND_GROUP
 from ..transformers import EventTransformer
 
 logger = logging.getLogger(__name__)
@@ -12,9 +14,10 @@ logger = logging.getLogger(__name__)
 class GroupFetcher:
     """Класс для загрузки групповых экскурсий"""
 
-    def __init__(self, api: PelagosAPI, cache: CacheManager):
+    def __init__(self, api: PelagosAPI, cache: CacheManager, registry: Optional[ExcursionRegistry] = None):
         self.api = api
         self.cache = cache
+        self.registry = registry
 
     async def get_by_filters(
         self,
@@ -28,26 +31,35 @@ class GroupFetcher:
         Args:
             island: код острова (cebu, bohol, boracay)
             excursion_type: тип экскурсии
-            date: дата в формате YYYY-MM-DD
+            date: дата в формате YYYY-MM-DD - только экскурсии этого дня
+                (из закэшированного календаря месяца)
 
         Returns:
             список словарей с данными экскурсий
         """
+        if date:
+            try:
+                day = datetime.strptime(date, "%Y-%m-%d")
+            except ValueError:
+                logger.error(f"❌ Неверный формат даты: {date}")
+                return []
+            calendar = await self.get_month_calendar(island, excursion_type, day.year, day.month)
+            excursions = calendar.get(date, [])
+            logger.info(f"✅ Возвращаем {len(excursions)} экскурсий на {date}")
+            return excursions
+
         # Проверяем кэш
-        cache_key = f"excursions:{island or 'all'}:{excursion_type or 'all'}:{date or 'all'}"
-        cached = self.cache.get(cache_key)
+        cache_key = f"excursions:{island or 'all'}:{excursion_type or 'all'}:all"
+        cached = await self.cache.get(cache_key)
         if cached:
             logger.info(f"✓ Кэш HIT: {len(cached)} экскурсий")
             return cached
 
         try:
-            logger.info(f"🔍 Загрузка: island={island}, type={excursion_type}, date={date}")
+            logger.info(f"🔍 Загрузка: island={island}, type={excursion_type}")
 
             # Получаем события из API
-            events = await self.api.get_excursions_by_location_and_date(
-                location_code=island,
-                date=date
-            )
+            events = await self.api.get_excursions_by_location_and_date(location_code=island)
 
             logger.info(f"📡 API вернул {len(events)} событий")
 
@@ -59,7 +71,9 @@ class GroupFetcher:
                     excursions.append(exc_dict)
 
             # Кэшируем
-            self.cache.set(cache_key, excursions, ttl=CACHE_TTL_GROUP)
+            await self.cache.set(cache_key, excursions, ttl=CACHE_TTL_GROUP)
+            if self.registry:
+                await self.registry.register(excursions, KIND_GROUP, cache_key)
 
             logger.info(f"✅ Возвращаем {len(excursions)} экскурсий")
             return excursions
@@ -68,6 +82,99 @@ class GroupFetcher:
             logger.error(f"❌ Ошибка загрузки экскурсий: {e}", exc_info=True)
             return []
 
+    async def get_month_calendar(
+        self,
+        island: str = None,
+        excursion_type: str = None,
+        year: int = None,
+        month: int = None
+    ) -> Dict[str, List[dict]]:
+        """
+        Календарь групповых экскурсий месяца: {дата YYYY-MM-DD: [экскурсии]}
+
+        API всегда отдаёт календарь целого месяца, поэтому он кэшируется один
+        раз на (остров, месяц): выбор любого дня того же месяца - без запросов
+        к API и повторной конвертации событий.
+
+        Returns:
+            словарь дата → экскурсии (может содержать дни соседних месяцев)
+        """
+        cache_key = f"excursions:calendar:{island or 'all'}:{excursion_type or 'all'}:{year:04d}-{month:02d}"
+        try:
+            calendar = await self.cache.get_or_load(
+                cache_key,
+                lambda: self._load_month_calendar(cache_key, island, excursion_type, year, month),
+                ttl=CACHE_TTL_GROUP
+            )
+            return calendar or {}
+        except Exception as e:
+            logger.error(f"❌ Ошибка загрузки календаря экскурсий {year}-{month:02d}: {e}", exc_info=True)
+            return {}
+
+    async def update_month_calendar(
+        self,
+        island: Optional[str],
+        excursion_type: Optional[str],
+        year: int,
+        month: int,
+        transform: Callable[[Dict[str, List[dict]]], Optional[Dict[str, List[dict]]]]
+    ) -> bool:
+        """
+        Изменить закэшированный календарь месяца (например, дописать цены), не продлевая TTL
+
+        transform применяется к актуальной версии календаря (cache.update):
+        календарь, обновлённый в фоне за время дозагрузки, не затирается старым.
+
+        Returns:
+            True если календарь перезаписан
+        """
+        cache_key = f"excursions:calendar:{island or 'all'}:{excursion_type or 'all'}:{year:04d}-{month:02d}"
+        return await self.cache.update(cache_key, transform)
+
+    async def _load_month_calendar(
+        self,
+        cache_key: str,
+        island: Optional[str],
+        excursion_type: Optional[str],
+        year: int,
+        month: int
+    ):
+        """Загрузить календарь месяца из API и разложить события по датам (без кэша)"""
+        logger.info(f"🔍 Загрузка календаря: island={island}, type={excursion_type}, месяц={year}-{month:02d}")
+        with self.api.track_failures() as failures:
+            events = await self.api.get_excursions_by_location_and_date(
+                location_code=island,
+                date=f"{year:04d}-{month:02d}-01"
+            )
+
+        logger.info(f"📡 API вернул {len(events)} событий")
+
+        calendar: Dict[str, List[dict]] = {}
+        seen = set()
+        for event in events:
+            # Дни на стыке месяцев могут прийти дважды
+            if event.id in seen:
+                continue
+            seen.add(event.id)
+
+            exc_dict = EventTransformer.transform(event, excursion_type or "group")
+            if exc_dict and exc_dict.get("date"):
+                calendar.setdefault(exc_dict["date"], []).append(exc_dict)
+
+        logger.info(f"✅ Календарь {year}-{month:02d}: {len(seen)} событий, {len(calendar)} дней")
+
+        if self.registry:
+            await self.registry.register(
+                (excursion for excursions in calendar.values() for excursion in excursions),
+                KIND_GROUP,
+                cache_key
+            )
+
+        # Неполный календарь при сбое API не кэшируем
+        if failures.failed:
+            return Uncached(calendar)
+        return calendar
+
     async def get_by_id(self, excursion_id: int) -> Optional[dict]:
         """
         Получить групповую экскурсию по ID
@@ -4,8 +4,10 @@ import asyncio
 from typing import List, Optional
 from datetime import datetime, timedelta
 from services.pelagos_api import PelagosAPI
-from utils.cache_manager import CacheManager
-from ..constants import CACHE_TTL_PRIVATE, CACHE_TTL_DAILY, LOCATION_MAP, PRIVATE_ISLANDS_MAP
+from utils.cache_manager import CacheManager, Uncached
+from utils.service_prices import ServicePrices
+from ..constants import CACHE_TTL_PRIVATE, CACHE_STALE_TTL_PRIVATE, CACHE_TTL_DAILY, LOCATION_MAP, PRIVATE_ISLANDS_MAP
+from ..registry import ExcursionRegistry, KIND_PRIVATE
 from ..transformers import ServiceTransformer, DailyTransformer
 
 logger = logging.getLogger(__name__)
@@ -14,9 +16,17 @@ logger = logging.getLogger(__name__)
 class PrivateFetcher:
     """Класс для загрузки индивидуальных экскурсий"""
 
-    def __init__(self, api: PelagosAPI, cache: CacheManager):
+    def __init__(
+        self,
+        api: PelagosAPI,
+        cache: CacheManager,
+        registry: Optional[ExcursionRegistry] = None,
+        service_prices: Optional[ServicePrices] = None
+    ):
         self.api = api
         self.cache = cache
+        self.registry = registry
+        self.service_prices = service_prices or ServicePrices(api, cache)
         self._preload_tasks = {}  # Храним фоновые задачи предзагрузки
 
     async def get_filtered(self, island: str = None) -> List[dict]:
@@ -35,59 +45,14 @@ class PrivateFetcher:
                 try:
                     location_id = int(island)
 
-                    # Проверяем кэш для конкретного острова
-                    cache_key = f"private_excursions_island_{location_id}"
-                    cached = self.cache.get(cache_key)
-                    if cached:
-                        logger.info(f"✓ Кэш HIT: {len(cached)} экскурсий для острова {PRIVATE_ISLANDS_MAP.get(location_id, location_id)}")
-                        return cached
-
-                    logger.info(f"🔍 Загрузка экскурсий для location_id={location_id} ({PRIVATE_ISLANDS_MAP.get(location_id, location_id)})")
-
-                    # Загружаем параллельно индивидуальные и ежедневные
-                    tomorrow = datetime.now() + timedelta(days=1)
-                    api_date = tomorrow.strftime("%d.%m.%Y")
-
-                    private_services, daily_services = await asyncio.gather(
-                        self.api.get_private_excursions(location_id=location_id, date=api_date),
-                        self.api.get_daily_excursions(location_id=location_id),
-                        return_exceptions=True
+                    # Кэш острова с stale-while-revalidate
+                    excursions = await self.cache.get_or_load(
+                        f"private_excursions_island_{location_id}",
+                        lambda: self._load_island(location_id, f"private_excursions_island_{location_id}"),
+                        ttl=CACHE_TTL_PRIVATE,
+                        stale_ttl=CACHE_STALE_TTL_PRIVATE
                     )
 
-                    # Обрабатываем ошибки
-                    if isinstance(private_services, Exception):
-                        logger.error(f"Ошибка загрузки индивидуальных: {private_services}")
-                        private_services = []
-                    if isinstance(daily_services, Exception):
-                        logger.error(f"Ошибка загрузки ежедневных: {daily_services}")
-                        daily_services = []
-
-                    logger.info(f"📡 API: {len(private_services)} индивидуальных + {len(daily_services)} ежедневных")
-
-                    # Конвертируем services в словари
-                    excursions = []
-                    for service in private_services:
-                        exc_dict = ServiceTransformer.transform(service, "private")
-                        if exc_dict:
-                            excursions.append(exc_dict)
-
-                    daily_excursions = []
-                    for service in daily_services:
-                        exc_dict = DailyTransformer.transform(service)
-                        if exc_dict:
-                            daily_excursions.append(exc_dict)
-
-                    # Подгружаем цены для ежедневных (export-services не содержит цен)
-                    if daily_excursions:
-                        await self._load_daily_prices(daily_excursions)
-                        excursions.extend(daily_excursions)
-
-                    # Сортируем по рейтингу (ord) в порядке убывания
-                    excursions.sort(key=lambda x: x.get('ord', 0), reverse=True)
-
-                    # Кэшируем результат для этого острова
-                    self.cache.set(cache_key, excursions, ttl=CACHE_TTL_PRIVATE)
-
                     logger.info(f"✅ Возвращаем {len(excursions)} экскурсий для острова {PRIVATE_ISLANDS_MAP.get(location_id, location_id)}")
                     return excursions
 
@@ -113,7 +78,7 @@ class PrivateFetcher:
                     return excursions
             else:
                 # Если остров не указан - загружаем все экскурсии через общий кэш
-                all_excursions = self.cache.get("all_private_excursions")
+                all_excursions = await self.cache.get("all_private_excursions")
 
                 if not all_excursions:
                     # Если нет в кэше - нужно загрузить через island_fetcher
@@ -128,6 +93,73 @@ class PrivateFetcher:
             logger.error(f"❌ Ошибка загрузки индивидуальных экскурсий: {e}", exc_info=True)
             return []
 
+    async def _load_island(self, location_id: int, cache_key: str):
+        """
+        Загрузить индивидуальные + ежедневные экскурсии острова из API (без кэша)
+
+        Args:
+            location_id: ID локации
+            cache_key: ключ кэша острова (для реестра ID)
+
+        Returns:
+            Список словарей экскурсий или Uncached, если во время загрузки API сбоил
+        """
+        logger.info(f"🔍 Загрузка экскурсий для location_id={location_id} ({PRIVATE_ISLANDS_MAP.get(location_id, location_id)})")
+
+        with self.api.track_failures() as failures:
+            excursions = await self._fetch_island(location_id)
+
+        if self.registry:
+            await self.registry.register(excursions, KIND_PRIVATE, cache_key)
+
+        # Неполный результат при сбое API не кэшируем
+        if failures.failed:
+            return Uncached(excursions)
+        return excursions
+
+    async def _fetch_island(self, location_id: int) -> List[dict]:
+        """Индивидуальные + ежедневные экскурсии острова с ценами, по убыванию ord"""
+        # Загружаем параллельно индивидуальные и ежедневные
+        tomorrow = datetime.now() + timedelta(days=1)
+        api_date = tomorrow.strftime("%d.%m.%Y")
+        private_services, daily_services = await asyncio.gather(
+            self.api.get_private_excursions(location_id=location_id, date=api_date),
+            self.api.get_daily_excursions(location_id=location_id),
+            return_exceptions=True
+        )
+
+        # Обрабатываем ошибки
+        if isinstance(private_services, Exception):
+            logger.error(f"Ошибка загрузки индивидуальных: {private_services}")
+            private_services = []
+        if isinstance(daily_services, Exception):
+            logger.error(f"Ошибка загрузки ежедневных: {daily_services}")
+            daily_services = []
+
+        logger.info(f"📡 API: {len(private_services)} индивидуальных + {len(daily_services)} ежедневных")
+
+        # Конвертируем services в словари
+        excursions = []
+        for service in private_services:
+            exc_dict = ServiceTransformer.transform(service, "private")
+            if exc_dict:
+                excursions.append(exc_dict)
+
+        daily_excursions = []
+        for service in daily_services:
+            exc_dict = DailyTransformer.transform(service)
+            if exc_dict:
+                daily_excursions.append(exc_dict)
+
+        # Подгружаем цены для ежедневных (export-services не содержит цен)
+        if daily_excursions:
+            await self._load_daily_prices(daily_excursions)
+            excursions.extend(daily_excursions)
+
+        # Сортируем по рейтингу (ord) в порядке убывания
+        excursions.sort(key=lambda x: x.get('ord', 0), reverse=True)
+        return excursions
+
     async def get_daily_filtered(self, island: str = None) -> List[dict]:
         """
         Получить ежедневные экскурсии с кэшированием
@@ -149,34 +181,20 @@ class PrivateFetcher:
 
             # Проверяем кэш
             cache_key = f"daily_excursions_island_{location_id}"
-            cached = self.cache.get(cache_key)
+            cached = await self.cache.get(cache_key)
             if cached:
                 logger.info(f"✓ Кэш HIT: {len(cached)} ежедневных экскурсий")
                 return cached
 
             logger.info(f"🔍 Загрузка ежедневных экскурсий для location_id={location_id}")
+            with self.api.track_failures() as failures:
+                excursions = await self._fetch_daily(location_id)
 
-            # Загружаем ежедневные экскурсии
-            services = await self.api.get_daily_excursions(location_id=location_id)
-
-            logger.info(f"📡 API вернул {len(services)} ежедневных экскурсий")
-
-            # Конвертируем в словари
-            excursions = []
-            for service in services:
-                exc_dict = DailyTransformer.transform(service)
-                if exc_dict:
-                    excursions.append(exc_dict)
-
-            # Подгружаем цены (export-services не содержит цен)
-            if excursions:
-                await self._load_daily_prices(excursions)
-
-            # Сортируем по рейтингу (ord) в порядке убывания
-            excursions.sort(key=lambda x: x.get('ord', 0), reverse=True)
-
-            # Кэшируем
-            self.cache.set(cache_key, excursions, ttl=CACHE_TTL_DAILY)
+            # Кэшируем (если цены не потерялись из-за сбоя API)
+            if not failures.failed:
+                await self.cache.set(cache_key, excursions, ttl=CACHE_TTL_DAILY)
+                if self.registry:
+                    await self.registry.register(excursions, KIND_PRIVATE, cache_key)
 
             logger.info(f"✅ Возвращаем {len(excursions)} ежедневных экскурсий")
             return excursions
@@ -185,24 +203,40 @@ class PrivateFetcher:
             logger.error(f"❌ Ошибка загрузки ежедневных экскурсий: {e}", exc_info=True)
             return []
 
+    async def _fetch_daily(self, location_id: int) -> List[dict]:
+        """Ежедневные экскурсии локации с ценами, по убыванию ord"""
+        services = await self.api.get_daily_excursions(location_id=location_id)
+        logger.info(f"📡 API вернул {len(services)} ежедневных экскурсий")
+
+        # Конвертируем в словари
+        excursions = []
+        for service in services:
+            exc_dict = DailyTransformer.transform(service)
+            if exc_dict:
+                excursions.append(exc_dict)
+
+        # Подгружаем цены (export-services не содержит цен)
+        if excursions:
+            await self._load_daily_prices(excursions)
+
+        # Сортируем по рейтингу (ord) в порядке убывания
+        excursions.sort(key=lambda x: x.get('ord', 0), reverse=True)
+        return excursions
+
     async def _load_daily_prices(self, excursions: List[dict]):
-        """Подгрузить цены для ежедневных экскурсий через export-services-prices"""
-        async def fetch_price(exc):
-            try:
-                prices = await self.api.get_service_prices(int(exc['service_id']))
-                if prices:
-                    # Ежедневные групповые — фиксированная цена, берём первую из plst
-                    plst = prices[0].get('plst', [])
-                    if plst:
-                        price = plst[0].get('price', 0)
-                        if price:
-                            exc['price'] = price
-                            exc['price_usd'] = price
-                            exc['min_price'] = price
-            except Exception as e:
-                logger.error(f"Ошибка загрузки цены для {exc.get('id')}: {e}")
-
-        await asyncio.gather(*[fetch_price(exc) for exc in excursions], return_exceptions=True)
+        """Подгрузить цены для ежедневных экскурсий из общего кэша цен услуг"""
+        tables = await self.service_prices.get_many(int(exc['service_id']) for exc in excursions)
+
+        for exc in excursions:
+            price_table = tables.get(int(exc['service_id']))
+            if price_table:
+                # Ежедневные групповые — фиксированная цена, берём цену наименьшей группы
+                price = price_table.first_price
+                if price:
+                    exc['price'] = price
+                    exc['price_usd'] = price
+                    exc['min_price'] = price
+
         logger.info(f"💰 Загружены цены для {len(excursions)} ежедневных экскурсий")
 
     async def preload(self, island: str = None):
@@ -217,7 +251,7 @@ class PrivateFetcher:
         cache_key = f"excursions_private:{island or 'all'}"
 
         # Если уже есть в кэше - не грузим
-        if self.cache.get(cache_key):
+        if await self.cache.get(cache_key):
             return
 
         # Если уже грузим - не дублируем
@@ -238,7 +272,7 @@ class PrivateFetcher:
         """
         Получить индивидуальную экскурсию по ID
 
-        Сначала ищем в кэшах островов, потом делаем API запрос
+        Сначала ищем в индексе ID закэшированных списков, потом делаем API запрос
 
         Args:
             excursion_id: ID экскурсии
@@ -247,23 +281,11 @@ class PrivateFetcher:
             Словарь с данными экскурсии или None
         """
         try:
-            # Проверяем кэши для конкретных островов
-            for location_id in PRIVATE_ISLANDS_MAP.keys():
-                island_cache_key = f"private_excursions_island_{location_id}"
-                island_cached = self.cache.get(island_cache_key)
-                if island_cached:
-                    for exc in island_cached:
-                        if exc.get('id') == str(excursion_id) or exc.get('service_id') == str(excursion_id):
-                            logger.info(f"✓ Найдена индивидуальная экскурсия {excursion_id} в кэше острова")
-                            return exc
-
-            # Проверяем общий кэш
-            all_private_cache = self.cache.get("all_private_excursions")
-            if all_private_cache:
-                for exc in all_private_cache:
-                    if exc.get('id') == str(excursion_id) or exc.get('service_id') == str(excursion_id):
-                        logger.info(f"✓ Найдена индивидуальная экскурсия {excursion_id} в общем кэше")
-                        return exc
+            # Индекс ID кэшей островов и общего списка (у индивидуальных id == service_id)
+            exc = await self.cache.get_indexed("private_excursions", excursion_id)
+            if exc:
+                logger.info(f"✓ Найдена индивидуальная экскурсия {excursion_id} в кэше")
+                return exc
 
             # Если не нашли в кэше - загружаем все индивидуальные экскурсии
             tomorrow = datetime.now() + timedelta(days=1)
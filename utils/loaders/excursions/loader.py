@@ -1,10 +1,14 @@
 """Главный класс-оркестратор для загрузки экскурсий"""
+import asyncio
 import logging
-from typing import Optional, List, Dict
+from datetime import datetime
+from typing import Optional, List, Dict, Iterable
 from services.pelagos_api import PelagosAPI
 from utils.cache_manager import get_cache_manager
-from .constants import CACHE_TTL_GROUP, CACHE_TTL_PRIVATE, CACHE_TTL_COMPANIONS
+from utils.service_prices import ServicePrices
+from .constants import CACHE_TTL_GROUP, CACHE_TTL_PRIVATE, CACHE_TTL_COMPANIONS, PRICE_BACKFILL_CONCURRENCY
 from .fetchers import PrivateFetcher, GroupFetcher, CompanionFetcher, IslandFetcher
+from .registry import ExcursionRegistry, KIND_GROUP, KIND_COMPANIONS, KIND_PRIVATE
 from .transformers import BaseTransformer
 
 logger = logging.getLogger(__name__)
@@ -17,15 +21,18 @@ class ExcursionsLoader:
     Делегирует работу специализированным fetchers и transformers
     """
 
-    def __init__(self, api: Optional[PelagosAPI] = None):
+    def __init__(self, api: Optional[PelagosAPI] = None, service_prices: Optional[ServicePrices] = None):
         self.api = api
         self.cache = get_cache_manager()
 
+        # Реестр ID экскурсий: fetchers пополняют его при загрузке списков
+        self.registry = ExcursionRegistry(self.cache)
+
         # Инициализируем fetchers
-        self.private_fetcher = PrivateFetcher(api, self.cache) if api else None
-        self.group_fetcher = GroupFetcher(api, self.cache) if api else None
-        self.companion_fetcher = CompanionFetcher(api, self.cache) if api else None
-        self.island_fetcher = IslandFetcher(api, self.cache) if api else None
+        self.private_fetcher = PrivateFetcher(api, self.cache, self.registry, service_prices) if api else None
+        self.group_fetcher = GroupFetcher(api, self.cache, self.registry) if api else None
+        self.companion_fetcher = CompanionFetcher(api, self.cache, self.registry) if api else None
+        self.island_fetcher = IslandFetcher(api, self.cache, self.registry) if api else None
 
     # ========== Публичные методы для работы с островами ==========
 
@@ -56,7 +63,7 @@ class ExcursionsLoader:
         Args:
             island: код острова (cebu, bohol, boracay)
             excursion_type: тип экскурсии (group, private, companions)
-            date: дата в формате YYYY-MM-DD
+            date: дата в формате YYYY-MM-DD (для групповых - только экскурсии этого дня)
 
         Returns:
             список словарей с данными экскурсий
@@ -76,11 +83,202 @@ class ExcursionsLoader:
             date=date
         )
 
+    async def get_group_excursions_by_date(
+        self,
+        date: str,
+        island: str = None,
+        excursion_type: str = "group"
+    ) -> list:
+        """
+        Получить групповые экскурсии на дату с ценами
+
+        Цены, которых нет в календаре, дозагружаются один раз и сохраняются
+        в закэшированный календарь месяца.
+
+        Args:
+            date: дата YYYY-MM-DD
+            island: код острова или None для всех
+            excursion_type: тип экскурсии
+
+        Returns:
+            список словарей экскурсий
+        """
+        if not self.group_fetcher:
+            logger.warning("⚠️ API не инициализирован")
+            return []
+
+        try:
+            day = datetime.strptime(date, "%Y-%m-%d")
+        except ValueError:
+            logger.error(f"❌ Неверный формат даты: {date}")
+            return []
+
+        calendar = await self._get_priced_calendar(island, excursion_type, day.year, day.month, [date])
+        return calendar.get(date, [])
+
+    async def get_group_excursions_by_month(
+        self,
+        year: int,
+        month: int,
+        island: str = None,
+        excursion_type: str = "group"
+    ) -> list:
+        """
+        Получить групповые экскурсии за месяц с ценами (календарь месяца кэшируется целиком)
+
+        Args:
+            year: год
+            month: месяц (1-12)
+            island: код острова или None для всех
+            excursion_type: тип экскурсии
+
+        Returns:
+            список словарей экскурсий месяца в порядке дат
+        """
+        if not self.group_fetcher:
+            logger.warning("⚠️ API не инициализирован")
+            return []
+
+        month_prefix = f"{year:04d}-{month:02d}-"
+        calendar = await self._get_priced_calendar(island, excursion_type, year, month)
+        return [
+            excursion
+            for date in sorted(calendar)
+            if date.startswith(month_prefix)
+            for excursion in calendar[date]
+        ]
+
+    async def _get_priced_calendar(
+        self,
+        island: Optional[str],
+        excursion_type: Optional[str],
+        year: int,
+        month: int,
+        dates: Optional[Iterable[str]] = None
+    ) -> Dict[str, list]:
+        """
+        Календарь месяца с дозагруженными ценами на указанные даты (None - весь месяц)
+
+        Цены дописываются в копии событий (календарь из кэша не меняется) и
+        в актуальную версию календаря в кэше - повторно цены не грузятся.
+        Если во время дозагрузки API сбоил, календарь не сохраняется: цены
+        недоступных событий будут запрошены снова при следующем обращении.
+        """
+        calendar = await self.group_fetcher.get_month_calendar(island, excursion_type, year, month)
+        if dates is None:
+            month_prefix = f"{year:04d}-{month:02d}-"
+            dates = [date for date in calendar if date.startswith(month_prefix)]
+
+        excursions = [excursion for date in dates for excursion in calendar.get(date, [])]
+        with self.api.track_failures() as failures:
+            backfill = await self._backfill_prices(excursions)
+        if not backfill:
+            return calendar
+
+        def apply_backfill(current: Dict[str, list]) -> Optional[Dict[str, list]]:
+            return self._apply_backfill_to_calendar(current, backfill)
+
+        if failures.failed:
+            logger.warning(f"⚠️ Сбой API при дозагрузке цен {year}-{month:02d}, календарь не сохраняется")
+        else:
+            await self.group_fetcher.update_month_calendar(island, excursion_type, year, month, apply_backfill)
+        return self._apply_backfill_to_calendar(calendar, backfill) or calendar
+
+    @classmethod
+    def _apply_backfill_to_calendar(cls, calendar: Dict[str, list], backfill: Dict[str, dict]) -> Optional[Dict[str, list]]:
+        """Копия календаря с дозагруженными ценами (None - ни одно событие не изменилось)"""
+        changed = False
+        result = {}
+        for date, events in calendar.items():
+            priced = [cls._apply_backfill(event, backfill) for event in events]
+            if any(new is not old for new, old in zip(priced, events)):
+                changed = True
+                result[date] = priced
+            else:
+                result[date] = events
+        return result if changed else None
+
+    @staticmethod
+    def _apply_backfill(excursion: dict, backfill: Dict[str, dict]) -> dict:
+        """Копия экскурсии с дозагруженной ценой (или сама экскурсия, если менять нечего)"""
+        fields = backfill.get(str(excursion.get('id')))
+        if not fields or excursion.get('price_usd') or excursion.get('price_backfilled'):
+            return excursion
+        return dict(excursion, **fields)
+
+    async def fill_missing_prices(self, excursions: List[dict]) -> List[dict]:
+        """
+        Дозагрузить цены экскурсиям без price_usd
+
+        Словари экскурсий могут быть общими объектами кэша (L1), поэтому
+        не меняются: экскурсии с дозагруженной ценой заменяются копиями.
+
+        Args:
+            excursions: список словарей экскурсий
+
+        Returns:
+            новый список экскурсий в том же порядке
+        """
+        backfill = await self._backfill_prices(excursions)
+        return [self._apply_backfill(excursion, backfill) for excursion in excursions]
+
+    async def _backfill_prices(self, excursions: List[dict]) -> Dict[str, dict]:
+        """
+        Цены экскурсий без price_usd (сами экскурсии не меняются)
+
+        Детали событий берутся из кэша одним MGET, недостающие - параллельно
+        (не больше PRICE_BACKFILL_CONCURRENCY запросов одновременно) через
+        get_excursion_by_id, который кэширует их. Экскурсии, детали которых
+        получены, но без цены, помечаются price_backfilled и повторно не
+        проверяются; не полученные детали (сбой API) не помечаются.
+
+        Returns:
+            {id экскурсии: поля для записи в неё} (пусто - дозагружать было нечего)
+        """
+        missing = [
+            excursion for excursion in excursions
+            if not excursion.get('price_usd') and not excursion.get('price_backfilled')
+        ]
+        if not missing:
+            return {}
+
+        logger.info(f"📊 Дозагрузка цен для {len(missing)} экскурсий...")
+        excursion_ids = list(dict.fromkeys(str(excursion['id']) for excursion in missing))
+
+        cached = await self.cache.mget([f"excursion:{excursion_id}" for excursion_id in excursion_ids])
+        details = {excursion_id: data for excursion_id, data in zip(excursion_ids, cached) if data}
+
+        semaphore = asyncio.Semaphore(PRICE_BACKFILL_CONCURRENCY)
+
+        async def fetch(excursion_id: str):
+            async with semaphore:
+                return excursion_id, await self.get_excursion_by_id(excursion_id)
+
+        fetched = await asyncio.gather(*[
+            fetch(excursion_id) for excursion_id in excursion_ids if excursion_id not in details
+        ])
+        details.update((excursion_id, data) for excursion_id, data in fetched if data)
+
+        backfill = {}
+        for excursion_id in excursion_ids:
+            detail = details.get(excursion_id)
+            if detail is None:
+                # Детали не получены (API недоступен) - цену проверим в следующий раз
+                continue
+            price = detail.get('price_usd')
+            backfill[excursion_id] = {'price': price, 'price_usd': price} if price else {'price_backfilled': True}
+
+        priced = sum(1 for fields in backfill.values() if 'price_usd' in fields)
+        logger.info(f"💰 Цены дозагружены: {priced} из {len(excursion_ids)}")
+        return backfill
+
     async def get_excursion_by_id(self, excursion_id: str) -> Optional[dict]:
         """
         Получить экскурсию по ID с кэшированием
 
-        Автоматически определяет тип экскурсии и использует нужный fetcher
+        Тип экскурсии берётся из реестра ID: запись ищется в закэшированном
+        списке, где её видели, иначе запрашивается только нужный fetcher.
+        ID, которых нет в реестре, проверяются всеми fetchers по очереди.
 
         Args:
             excursion_id: ID экскурсии
@@ -93,7 +291,7 @@ class ExcursionsLoader:
 
         # Проверяем кэш
         cache_key = f"excursion:{excursion_id}"
-        cached = self.cache.get(cache_key)
+        cached = await self.cache.get(cache_key)
         if cached:
             logger.info(f"✓ Кэш HIT: экскурсия {excursion_id}")
             return cached
@@ -101,22 +299,47 @@ class ExcursionsLoader:
         try:
             service_id = int(excursion_id)
 
-            # Пробуем загрузить как групповую экскурсию (event)
+            entry = await self.registry.lookup(excursion_id)
+            if entry:
+                kind, source_key = entry
+
+                # Запись из списка подходит, если в ней уже есть цена
+                # (у попутчиков в списке нет slst - их всегда грузим целиком)
+                if kind != KIND_COMPANIONS:
+                    exc_dict = await self.registry.get_cached_record(excursion_id, source_key)
+                    if exc_dict and (kind == KIND_PRIVATE or exc_dict.get('price_usd')):
+                        logger.info(f"✓ Экскурсия {excursion_id} найдена в {source_key}")
+                        return exc_dict
+
+                fetcher, ttl = {
+                    KIND_GROUP: (self.group_fetcher, CACHE_TTL_GROUP),
+                    KIND_COMPANIONS: (self.companion_fetcher, CACHE_TTL_COMPANIONS),
+                    KIND_PRIVATE: (self.private_fetcher, CACHE_TTL_PRIVATE),
+                }[kind]
+                exc_dict = await fetcher.get_by_id(service_id)
+                if exc_dict:
+                    await self.cache.set(cache_key, exc_dict, ttl=ttl)
+                    return exc_dict
+
+                logger.warning(f"⚠️ Экскурсия {excursion_id} ({kind}) не найдена")
+                return None
+
+            # Тип неизвестен - пробуем как групповую экскурсию (event)
             exc_dict = await self.group_fetcher.get_by_id(service_id)
             if exc_dict:
-                self.cache.set(cache_key, exc_dict, ttl=CACHE_TTL_GROUP)
+                await self.cache.set(cache_key, exc_dict, ttl=CACHE_TTL_GROUP)
                 return exc_dict
 
             # Пробуем как companion event
             exc_dict = await self.companion_fetcher.get_by_id(service_id)
             if exc_dict:
-                self.cache.set(cache_key, exc_dict, ttl=CACHE_TTL_COMPANIONS)
+                await self.cache.set(cache_key, exc_dict, ttl=CACHE_TTL_COMPANIONS)
                 return exc_dict
 
             # Пробуем как индивидуальную экскурсию
             exc_dict = await self.private_fetcher.get_by_id(service_id)
             if exc_dict:
-                self.cache.set(cache_key, exc_dict, ttl=CACHE_TTL_PRIVATE)
+                await self.cache.set(cache_key, exc_dict, ttl=CACHE_TTL_PRIVATE)
                 return exc_dict
 
             logger.warning(f"⚠️ Экскурсия {excursion_id} не найдена")
@@ -0,0 +1,99 @@
+"""Реестр ID экскурсий: ID → (тип, ключ кэша со списком)
+
+Fetchers регистрируют экскурсии при каждой загрузке списков из API, поэтому
+get_excursion_by_id знает, к какому типу относится ID и где лежит готовая
+запись - без перебора fetchers и повторных запросов к одному и тому же
+endpoint'у. Реестр хранится в Redis hash (общий для процессов) и
+дублируется в ограниченном L1 кэше процесса. Сама запись берётся из
+индекса ID списка-источника (см. ID_INDEX_RULES в cache_manager).
+"""
+import logging
+import time
+from typing import Iterable, Optional, Tuple
+
+from utils.cache_manager import CacheManager
+from utils.local_cache import LocalCache, MISSING
+
+logger = logging.getLogger(__name__)
+
+# Типы записей реестра
+KIND_GROUP = "group"
+KIND_COMPANIONS = "companions"
+KIND_PRIVATE = "private"
+
+
+class ExcursionRegistry:
+    """Реестр ID экскурсий с источниками записей"""
+
+    # Redis hash реестра: {id: [тип, ключ кэша]}, по одному на поколение
+    REDIS_KEY = "excursions:registry"
+    # Длительность поколения реестра: ID читаются из текущего и предыдущего
+    # поколения, более старые hash истекают - ID прошлых месяцев не копятся.
+    # Устаревшая запись всего лишь указывает на истёкший ключ - тогда грузим по типу
+    TTL = 86400
+    # Максимум ID в памяти процесса
+    LOCAL_MAX_SIZE = 20000
+
+    def __init__(self, cache: CacheManager):
+        self.cache = cache
+        # {id: (тип, ключ кэша)} - LRU с TTL поколения
+        self._entries = LocalCache({"": (self.LOCAL_MAX_SIZE, self.TTL)})
+
+    def _redis_key(self, generation: int) -> str:
+        return f"{self.REDIS_KEY}:{generation}"
+
+    def _generation(self) -> int:
+        return int(time.time() // self.TTL)
+
+    async def register(self, excursions: Iterable[dict], kind: str, source_key: str):
+        """
+        Запомнить тип и источник экскурсий
+
+        Args:
+            excursions: словари экскурсий (нужно поле id)
+            kind: тип (KIND_GROUP, KIND_COMPANIONS, KIND_PRIVATE)
+            source_key: ключ кэша, где лежит список (или календарь) с этими записями
+        """
+        mapping = {}
+        for excursion in excursions:
+            excursion_id = excursion.get('id')
+            if excursion_id:
+                self._entries.set(str(excursion_id), (kind, source_key))
+                mapping[str(excursion_id)] = [kind, source_key]
+
+        if mapping:
+            # Поколение пишется не дольше TTL, hash живёт ещё 2 * TTL после последней записи
+            await self.cache.hset_many(self._redis_key(self._generation()), mapping, ttl=2 * self.TTL)
+            logger.debug(f"📇 Реестр экскурсий: {len(mapping)} ID ({kind}, {source_key})")
+
+    async def lookup(self, excursion_id: str) -> Optional[Tuple[str, str]]:
+        """
+        Найти тип и источник экскурсии
+
+        Returns:
+            (тип, ключ кэша) или None если ID не встречался
+        """
+        excursion_id = str(excursion_id)
+        entry = self._entries.get(excursion_id)
+        if entry is not MISSING:
+            return entry
+
+        generation = self._generation()
+        for key in (self._redis_key(generation), self._redis_key(generation - 1)):
+            data = await self.cache.hget(key, excursion_id)
+            if data:
+                entry = (data[0], data[1])
+                self._entries.set(excursion_id, entry)
+                return entry
+        return None
+
+    async def get_cached_record(self, excursion_id: str, source_key: str) -> Optional[dict]:
+        """
+        Найти запись экскурсии в закэшированном источнике (списке или календаре {дата: [...]})
+
+        Одно чтение поля из индекса ID источника - без загрузки и перебора всего списка.
+
+        Returns:
+            Словарь экскурсии или None если источник истёк / записи в нём нет
+        """
+        return await self.cache.get_list_record(source_key, excursion_id)
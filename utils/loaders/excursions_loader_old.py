@@ -430,7 +430,7 @@ class ExcursionsLoader:
 
         # Проверяем кэш
         cache_key = "islands_with_count"
-        cached = self.cache.get(cache_key)
+        cached = await self.cache.get(cache_key)
         if cached:
             logger.info(f"✓ Кэш HIT: {len(cached)} островов с подсчётом")
             return cached
@@ -471,7 +471,7 @@ class ExcursionsLoader:
                     all_excursions.append(exc_dict)
 
             # Кэшируем ВСЕ экскурсии
-            self.cache.set("all_private_excursions", all_excursions, ttl=self.CACHE_TTL_PRIVATE)
+            await self.cache.set("all_private_excursions", all_excursions, ttl=self.CACHE_TTL_PRIVATE)
             logger.info(f"💾 Закэшировано {len(all_excursions)} экскурсий")
 
             # Подсчитываем экскурсии по островам
@@ -502,7 +502,7 @@ class ExcursionsLoader:
                 logger.info(f"  • {island['name']}: {island['count']} экскурсий")
 
             # Кэшируем с увеличенным TTL
-            self.cache.set(cache_key, islands, ttl=self.CACHE_TTL_PRIVATE)
+            await self.cache.set(cache_key, islands, ttl=self.CACHE_TTL_PRIVATE)
 
             return islands
 
@@ -537,7 +537,7 @@ class ExcursionsLoader:
 
         # Проверяем кэш для групповых
         cache_key = f"excursions:{island or 'all'}:{excursion_type or 'all'}:{date or 'all'}"
-        cached = self.cache.get(cache_key)
+        cached = await self.cache.get(cache_key)
         if cached:
             logger.info(f"✓ Кэш HIT: {len(cached)} экскурсий")
             return cached
@@ -561,7 +561,7 @@ class ExcursionsLoader:
                     excursions.append(exc_dict)
 
             # Кэшируем
-            self.cache.set(cache_key, excursions, ttl=self.CACHE_TTL_GROUP)
+            await self.cache.set(cache_key, excursions, ttl=self.CACHE_TTL_GROUP)
 
             logger.info(f"✅ Возвращаем {len(excursions)} экскурсий")
             return excursions
@@ -585,7 +585,7 @@ class ExcursionsLoader:
 
                     # Проверяем кэш для конкретного острова
                     cache_key = f"private_excursions_island_{location_id}"
-                    cached = self.cache.get(cache_key)
+                    cached = await self.cache.get(cache_key)
                     if cached:
                         logger.info(f"✓ Кэш HIT: {len(cached)} экскурсий для острова {self.PRIVATE_ISLANDS_MAP.get(location_id, location_id)}")
                         return cached
@@ -625,7 +625,7 @@ class ExcursionsLoader:
                             excursions.append(exc_dict)
 
                     # Кэшируем результат для этого острова
-                    self.cache.set(cache_key, excursions, ttl=self.CACHE_TTL_PRIVATE)
+                    await self.cache.set(cache_key, excursions, ttl=self.CACHE_TTL_PRIVATE)
 
                     logger.info(f"✅ Возвращаем {len(excursions)} экскурсий для острова {self.PRIVATE_ISLANDS_MAP.get(location_id, location_id)}")
                     return excursions
@@ -652,14 +652,14 @@ class ExcursionsLoader:
                     return excursions
             else:
                 # Если остров не указан - загружаем все экскурсии через общий кэш
-                all_excursions = self.cache.get("all_private_excursions")
+                all_excursions = await self.cache.get("all_private_excursions")
 
                 if not all_excursions:
                     # Если нет в кэше - загружаем через get_available_islands_with_count
                     # Эта функция автоматически закэширует все экскурсии
                     logger.info("🔄 Кэш пуст, загружаем все экскурсии...")
                     await self.get_available_islands_with_count()
-                    all_excursions = self.cache.get("all_private_excursions") or []
+                    all_excursions = await self.cache.get("all_private_excursions") or []
 
                 # Возвращаем все экскурсии
                 logger.info(f"✅ Возвращаем все {len(all_excursions)} индивидуальных экскурсий")
@@ -690,7 +690,7 @@ class ExcursionsLoader:
 
             # Проверяем кэш
             cache_key = f"daily_excursions_island_{location_id}"
-            cached = self.cache.get(cache_key)
+            cached = await self.cache.get(cache_key)
             if cached:
                 logger.info(f"✓ Кэш HIT: {len(cached)} ежедневных экскурсий")
                 return cached
@@ -710,7 +710,7 @@ class ExcursionsLoader:
                     excursions.append(exc_dict)
 
             # Кэшируем
-            self.cache.set(cache_key, excursions, ttl=self.CACHE_TTL_DAILY)
+            await self.cache.set(cache_key, excursions, ttl=self.CACHE_TTL_DAILY)
 
             logger.info(f"✅ Возвращаем {len(excursions)} ежедневных экскурсий")
             return excursions
@@ -728,7 +728,7 @@ class ExcursionsLoader:
         cache_key = f"excursions_private:{island or 'all'}"
 
         # Если уже есть в кэше - не грузим
-        if self.cache.get(cache_key):
+        if await self.cache.get(cache_key):
             return
 
         # Если уже грузим - не дублируем
@@ -757,7 +757,7 @@ class ExcursionsLoader:
 
         # Проверяем кэш
         cache_key = f"excursion:{excursion_id}"
-        cached = self.cache.get(cache_key)
+        cached = await self.cache.get(cache_key)
         if cached:
             logger.info(f"✓ Кэш HIT: экскурсия {excursion_id}")
             return cached
@@ -769,7 +769,7 @@ class ExcursionsLoader:
             event = await self.api.get_excursion_event_details(service_id)
             if event:
                 exc_dict = self._event_to_dict(event)
-                self.cache.set(cache_key, exc_dict, ttl=self.CACHE_TTL_GROUP)
+                await self.cache.set(cache_key, exc_dict, ttl=self.CACHE_TTL_GROUP)
                 return exc_dict
 
             # Пробуем как companion event
@@ -803,7 +803,7 @@ class ExcursionsLoader:
                     exc_dict['pax'] = total_pax
                     exc_dict['companions'] = slst
 
-                    self.cache.set(cache_key, exc_dict, ttl=self.CACHE_TTL_COMPANIONS)
+                    await self.cache.set(cache_key, exc_dict, ttl=self.CACHE_TTL_COMPANIONS)
                     return exc_dict
 
             # ОПТИМИЗАЦИЯ: проверяем кэши индивидуальных экскурсий для конкретных островов
@@ -812,20 +812,20 @@ class ExcursionsLoader:
             # 1. Проверяем кэши для конкретных островов (новый формат)
             for location_id in self.PRIVATE_ISLANDS_MAP.keys():
                 island_cache_key = f"private_excursions_island_{location_id}"
-                island_cached = self.cache.get(island_cache_key)
+                island_cached = await self.cache.get(island_cache_key)
                 if island_cached:
                     for exc in island_cached:
                         if exc.get('id') == str(service_id) or exc.get('service_id') == str(service_id):
-                            self.cache.set(cache_key, exc, ttl=self.CACHE_TTL_PRIVATE)
+                            await self.cache.set(cache_key, exc, ttl=self.CACHE_TTL_PRIVATE)
                             logger.info(f"✓ Найдена индивидуальная экскурсия {service_id}")
                             return exc
 
             # 2. Проверяем общий кэш (старый формат)
-            all_private_cache = self.cache.get("all_private_excursions")
+            all_private_cache = await self.cache.get("all_private_excursions")
             if all_private_cache:
                 for exc in all_private_cache:
                     if exc.get('id') == str(service_id) or exc.get('service_id') == str(service_id):
-                        self.cache.set(cache_key, exc, ttl=self.CACHE_TTL_PRIVATE)
+                        await self.cache.set(cache_key, exc, ttl=self.CACHE_TTL_PRIVATE)
                         logger.info(f"✓ Найдена индивидуальная экскурсия {service_id}")
                         return exc
 
@@ -839,7 +839,7 @@ class ExcursionsLoader:
             for service_data in services:
                 if service_data.get('id') == service_id:
                     exc_dict = self._service_to_dict(service_data, "private")
-                    self.cache.set(cache_key, exc_dict, ttl=self.CACHE_TTL_PRIVATE)
+                    await self.cache.set(cache_key, exc_dict, ttl=self.CACHE_TTL_PRIVATE)
                     logger.info(f"✓ Найдена индивидуальная экскурсия {excursion_id}")
                     return exc_dict
 
@@ -927,7 +927,7 @@ class ExcursionsLoader:
 
         # Проверяем кэш
         cache_key = f"companions:{island}:{year}-{month:02d}"
-        cached = self.cache.get(cache_key)
+        cached = await self.cache.get(cache_key)
         if cached:
             logger.info(f"✓ Кэш HIT: {len(cached)} экскурсий с попутчиками")
             return cached
@@ -1010,7 +1010,7 @@ class ExcursionsLoader:
             logger.info(f"  ✅ Найдено экскурсий для '{island}': {len(excursions)}")
 
             # Кэшируем
-            self.cache.set(cache_key, excursions, ttl=self.CACHE_TTL_COMPANIONS)
+            await self.cache.set(cache_key, excursions, ttl=self.CACHE_TTL_COMPANIONS)
 
             return excursions
 
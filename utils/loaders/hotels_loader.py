@@ -1,9 +1,13 @@
 """Загрузчик данных для отелей"""
+import asyncio
 import logging
+from contextlib import aclosing
 from typing import Optional, List
-from services.pelagos_api import PelagosAPI
+from services.pelagos_api import PelagosAPI, UpstreamUnavailableError
 from services.schemas import Hotel, HotelRoom
-from utils.cache_manager import get_cache_manager
+from utils.cache_manager import get_cache_manager, Uncached
+from utils.hotel_catalog import HotelCatalog
+from utils.room_prices import RoomPriceStore
 
 logger = logging.getLogger(__name__)
 
@@ -13,10 +17,20 @@ class HotelsLoader:
 
     # TTL для кэша (3 часа)
     CACHE_TTL = 10800
+    # Сколько ещё после CACHE_TTL можно отдавать устаревший список (пока идёт обновление)
+    CACHE_STALE_TTL = 3600
+    # Кэш ценового фильтра: 1 час (совпадает с кэшем цен на номера)
+    PRICE_FILTER_TTL = 3600
+    # Lock пересборки ценового фильтра - с запасом на загрузку цен всех номеров острова
+    PRICE_FILTER_LOCK_TIMEOUT = 120
 
     def __init__(self, api: Optional[PelagosAPI] = None):
         self.api = api
         self.cache = get_cache_manager()
+        # Резидентный индекс отелей по ID (обновляется в фоне, см. bot.py)
+        self.catalog = HotelCatalog(api, self.cache)
+        # Расписания цен номеров: цена для любых дат без запросов к API
+        self.room_prices = RoomPriceStore(api, self.cache)
 
     async def get_all_locations(self) -> list:
         """
@@ -32,7 +46,7 @@ class HotelsLoader:
 
         # Проверяем кэш
         cache_key = "locations:all"
-        cached_locations = self.cache.get(cache_key)
+        cached_locations = await self.cache.get(cache_key)
 
         if cached_locations:
             logger.info(f"✓ Используем кэш локаций ({len(cached_locations)} шт)")
@@ -55,7 +69,7 @@ class HotelsLoader:
                 locations.append(location_dict)
 
             # Кэшируем на 24 часа (локации меняются редко)
-            self.cache.set(cache_key, locations, ttl=86400)
+            await self.cache.set(cache_key, locations, ttl=86400)
 
             logger.info(f"✅ Загружено {len(locations)} локаций из API")
             return locations
@@ -76,6 +90,34 @@ class HotelsLoader:
         check_out: str = None,
         filtered_hotels: list = None
     ) -> dict:
+        try:
+            return await self._get_hotels_by_filters(
+                island=island,
+                stars=stars,
+                min_price=min_price,
+                max_price=max_price,
+                page=page,
+                per_page=per_page,
+                check_in=check_in,
+                check_out=check_out,
+                filtered_hotels=filtered_hotels
+            )
+        except UpstreamUnavailableError as e:
+            logger.error(f"❌ Pelagos API недоступен при загрузке отелей: {e}")
+            return {'hotels': [], 'total': 0, 'page': page, 'total_pages': 0, 'unavailable': True}
+
+    async def _get_hotels_by_filters(
+        self,
+        island: str = None,
+        stars: int = None,
+        min_price: float = None,
+        max_price: float = None,
+        page: int = 0,
+        per_page: int = None,
+        check_in: str = None,
+        check_out: str = None,
+        filtered_hotels: list = None
+    ) -> dict:
 
         logger.info(f"🔍 get_hotels_by_filters: island={island}, stars={stars}, page={page}, per_page={per_page}, filtered_hotels={len(filtered_hotels) if filtered_hotels else 0}")
 
@@ -110,40 +152,14 @@ class HotelsLoader:
         if per_page:
             # Если есть фильтр по звездам, загружаем с запасом
             if stars:
-                # Пытаемся получить из кэша
-                cache_key = f"hotels:filtered:{island}:{stars}"
-                cached_filtered = self.cache.get(cache_key)
-
-                if cached_filtered:
-                    logger.info(f"✓ Используем кэш отфильтрованных отелей ({len(cached_filtered)} шт)")
-                    filtered_hotels = [Hotel.from_dict(h) for h in cached_filtered]
-                    # Сортируем кэшированные отели
-                    filtered_hotels = sorted(filtered_hotels, key=lambda h: h.ord if h.ord else 0, reverse=True)
-                else:
-                    logger.info(f"📡 Загрузка всех отелей для фильтрации по {stars} звездам...")
-                    all_hotels = await self.api.get_all_hotels(island)
-
-                    # Фильтруем по звездам
-                    filtered_hotels = [h for h in all_hotels if h.stars == stars]
-                    logger.info(f"⭐ После фильтра по звездам: {len(filtered_hotels)} отелей из {len(all_hotels)}")
-
-                    # Сортируем по рейтингу ДО кэширования
-                    filtered_hotels = sorted(filtered_hotels, key=lambda h: h.ord if h.ord else 0, reverse=True)
-
-                    # Кэшируем отфильтрованный и отсортированный список (без номеров)
-                    filtered_dicts = [
-                        {
-                            'id': h.id,
-                            'name': h.name,
-                            'stars': h.stars,
-                            'address': h.address,
-                            'location': h.location,
-                            'pics': h.pics,
-                            'ord': h.ord
-                        }
-                        for h in filtered_hotels
-                    ]
-                    self.cache.set(cache_key, filtered_dicts, ttl=self.CACHE_TTL)
+                # Кэш с stale-while-revalidate (отсортированный список без номеров)
+                cached_filtered = await self.cache.get_or_load(
+                    f"hotels:filtered:{island}:{stars}",
+                    lambda: self._load_star_filtered_hotels(island, stars),
+                    ttl=self.CACHE_TTL,
+                    stale_ttl=self.CACHE_STALE_TTL
+                )
+                filtered_hotels = [Hotel.from_dict(h) for h in cached_filtered]
 
                 # Применяем пагинацию к отфильтрованному и отсортированному списку
                 start_idx = page * per_page
@@ -196,27 +212,8 @@ class HotelsLoader:
             first_hotel = hotels[0]
             logger.info(f"   🏨 Загружаем: {first_hotel.name} (id={first_hotel.id})")
 
-            # Пытаемся получить номера из кэша
-            cache_key = f"hotel:rooms:{first_hotel.id}"
-            cached_rooms = self.cache.get(cache_key)
-
-            if cached_rooms:
-                logger.info(f"      ✓ Используем кэш номеров ({len(cached_rooms)} шт)")
-                rooms = [HotelRoom.from_dict(r) for r in cached_rooms]
-            else:
-                rooms = await self.api.get_all_rooms(first_hotel.id)
-                logger.info(f"      ✓ Получено {len(rooms)} номеров")
-                # Кэшируем номера
-                rooms_dicts = [
-                    {
-                        'id': r.id,
-                        'name': r.name,
-                        'parent': r.parent,
-                        'type': r.type
-                    }
-                    for r in rooms
-                ]
-                self.cache.set(cache_key, rooms_dicts, ttl=self.CACHE_TTL)
+            rooms = await self._get_hotel_rooms(first_hotel.id)
+            logger.info(f"      ✓ Номеров: {len(rooms)}")
 
             # Используем async версию с загрузкой цен
             first_hotel_dict = await self._convert_hotel_async(
@@ -240,24 +237,7 @@ class HotelsLoader:
             async def load_hotel_with_prices(hotel):
                 """Загрузить номера и цены для отеля"""
                 try:
-                    cache_key = f"hotel:rooms:{hotel.id}"
-                    cached_rooms = self.cache.get(cache_key)
-
-                    if cached_rooms:
-                        rooms = [HotelRoom.from_dict(r) for r in cached_rooms]
-                    else:
-                        rooms = await self.api.get_all_rooms(hotel.id)
-                        # Кэшируем номера
-                        rooms_dicts = [
-                            {
-                                'id': r.id,
-                                'name': r.name,
-                                'parent': r.parent,
-                                'type': r.type
-                            }
-                            for r in rooms
-                        ]
-                        self.cache.set(cache_key, rooms_dicts, ttl=self.CACHE_TTL)
+                    rooms = await self._get_hotel_rooms(hotel.id)
 
                     # Конвертируем С загрузкой цен
                     return await self._convert_hotel_async(
@@ -292,6 +272,36 @@ class HotelsLoader:
             'total_pages': total_pages
         }
 
+    async def _load_star_filtered_hotels(self, island: str, stars: int) -> list:
+        """
+        Загрузить отели острова с фильтром по звездам (без кэша)
+
+        Returns:
+            list: словари отелей без номеров, отсортированные по рейтингу (ord)
+        """
+        logger.info(f"📡 Загрузка всех отелей для фильтрации по {stars} звездам...")
+        all_hotels = await self.api.get_all_hotels(island)
+
+        # Фильтруем по звездам
+        filtered_hotels = [h for h in all_hotels if h.stars == stars]
+        logger.info(f"⭐ После фильтра по звездам: {len(filtered_hotels)} отелей из {len(all_hotels)}")
+
+        # Сортируем по рейтингу ДО кэширования
+        filtered_hotels = sorted(filtered_hotels, key=lambda h: h.ord if h.ord else 0, reverse=True)
+
+        return [
+            {
+                'id': h.id,
+                'name': h.name,
+                'stars': h.stars,
+                'address': h.address,
+                'location': h.location,
+                'pics': h.pics,
+                'ord': h.ord
+            }
+            for h in filtered_hotels
+        ]
+
     async def get_hotel_by_id(
         self,
         hotel_id: int,
@@ -304,64 +314,25 @@ class HotelsLoader:
             logger.error("❌ API не инициализирован")
             return None
 
-        if not location_code:
-            logger.error(f"❌ get_hotel_by_id({hotel_id}) вызван БЕЗ location_code! Это критическая ошибка производительности.")
-            return None
-
         try:
-            # Получаем отели из конкретной локации с пагинацией
-            hotel = None
-            start = 0
-            perpage = 100
-            max_iterations = 5  # Защита: максимум 500 отелей (5 * 100)
-
-            for iteration in range(max_iterations):
-                hotels_result = await self.api.get_hotels(location_code, perpage=perpage, start=start)
-                hotels = hotels_result.get('hotels', [])
-
-                if not hotels:
-                    break
-
-                # Ищем нужный отель в текущей порции
-                for h in hotels:
-                    if h.id == hotel_id:
-                        hotel = h
-                        break
-
-                if hotel:
-                    break  # Нашли - выходим
-
-                # Проверяем, есть ли еще отели
-                pagination = hotels_result.get('pagination')
-                if not pagination or (start + perpage >= pagination.total):
-                    break
-
-                start += perpage
-
-            if not hotel:
-                logger.warning(f"⚠️ Отель {hotel_id} не найден в локации {location_code}")
+            # Индекс каталога: чтение из памяти, локация загружается только при первом обращении
+            entry = await self.catalog.lookup(hotel_id, location_code)
+            if not entry:
+                if not location_code:
+                    logger.error(f"❌ get_hotel_by_id({hotel_id}) вызван БЕЗ location_code, отеля нет в каталоге")
+                else:
+                    logger.warning(f"⚠️ Отель {hotel_id} не найден в локации {location_code}")
                 return None
-
-            # Загружаем номера с кэшированием
-            cache_key = f"hotel:rooms:{hotel_id}"
-            cached_rooms = self.cache.get(cache_key)
-
-            if cached_rooms:
-                logger.info(f"✓ Используем кэш номеров для отеля {hotel_id} ({len(cached_rooms)} шт)")
-                rooms = [HotelRoom.from_dict(r) for r in cached_rooms]
+            hotel = Hotel.from_dict(entry)
+
+            # ID номеров известны из каталога - расписания цен грузятся параллельно со списком номеров
+            if entry.get('room_ids'):
+                rooms, _ = await asyncio.gather(
+                    self._get_hotel_rooms(hotel_id),
+                    self.room_prices.load(entry['room_ids'])
+                )
             else:
-                rooms = await self.api.get_all_rooms(hotel_id)
-                # Кэшируем номера
-                rooms_dicts = [
-                    {
-                        'id': r.id,
-                        'name': r.name,
-                        'parent': r.parent,
-                        'type': r.type
-                    }
-                    for r in rooms
-                ]
-                self.cache.set(cache_key, rooms_dicts, ttl=self.CACHE_TTL)
+                rooms = await self._get_hotel_rooms(hotel_id)
 
             # Используем async версию с загрузкой цен
             return await self._convert_hotel_async(
@@ -377,19 +348,52 @@ class HotelsLoader:
         if not self.api:
             return None
 
-        # Проверяем Redis кэш
+        # Индекс ID номеров отеля (пересобирается при кэшировании hotel:rooms:{hotel_id})
+        cached_room = await self.cache.get_list_record(f"hotel:rooms:{hotel_id}", room_id)
+        if cached_room:
+            price = None
+            if check_in and check_out:
+                price = await self._get_room_price(room_id, check_in, check_out)
+            return self._convert_room(HotelRoom.from_dict(cached_room), price)
+
+        try:
+            rooms = await self._get_hotel_rooms(hotel_id)
+        except UpstreamUnavailableError as e:
+            logger.error(f"❌ Pelagos API недоступен при загрузке номеров отеля {hotel_id}: {e}")
+            return None
+
+        # Ищем нужный номер
+        for room in rooms:
+            if room.id == room_id:
+                # Загружаем цену для номера, если указаны даты
+                price = None
+                if check_in and check_out:
+                    price = await self._get_room_price(room_id, check_in, check_out)
+
+                return self._convert_room(room, price)
+
+        return None
+
+    async def _get_hotel_rooms(self, hotel_id: int) -> List[HotelRoom]:
+        """
+        Номера отеля: кэш hotel:rooms:{hotel_id} или API (с кэшированием)
+
+        ID номеров запоминаются в каталоге отелей - по ним get_hotel_by_id
+        загружает расписания цен, не дожидаясь списка номеров.
+
+        Raises:
+            UpstreamUnavailableError: номеров нет в кэше, а API недоступен
+        """
+        hotel_id = int(hotel_id)
         cache_key = f"hotel:rooms:{hotel_id}"
-        cached_rooms = self.cache.get(cache_key)
+        cached_rooms = await self.cache.get(cache_key)
 
         if cached_rooms:
-            logger.debug(f"✓ Используем кэш номеров для отеля {hotel_id}")
+            logger.debug(f"✓ Используем кэш номеров для отеля {hotel_id} ({len(cached_rooms)} шт)")
             rooms = [HotelRoom.from_dict(r) for r in cached_rooms]
         else:
-            # Загружаем и кэшируем все номера отеля
             rooms = await self.api.get_all_rooms(hotel_id)
             logger.debug(f"Загружено {len(rooms)} номеров для отеля {hotel_id}")
-
-            # Кэшируем номера
             rooms_dicts = [
                 {
                     'id': r.id,
@@ -399,19 +403,10 @@ class HotelsLoader:
                 }
                 for r in rooms
             ]
-            self.cache.set(cache_key, rooms_dicts, ttl=self.CACHE_TTL)
+            await self.cache.set(cache_key, rooms_dicts, ttl=self.CACHE_TTL)
 
-        # Ищем нужный номер
-        for room in rooms:
-            if room.id == room_id:
-                # Загружаем цену для номера, если указаны даты
-                price = None
-                if check_in and check_out:
-                    price = await self._get_room_price(room_id, check_in, check_out)
-
-                return self._convert_room(room, price)
-
-        return None
+        self.catalog.set_room_ids(hotel_id, [r.id for r in rooms])
+        return rooms
 
     async def _convert_hotel_async(
         self,
@@ -425,23 +420,18 @@ class HotelsLoader:
         # Параллельная загрузка цен для всех номеров
         rooms_data = []
         if load_prices and rooms:
-            import asyncio
             if check_in and check_out:
                 logger.info(f"🏨 Загрузка цен для {len(rooms)} номеров для {check_in} - {check_out}")
             else:
                 logger.info(f"🏨 Загрузка цен для {len(rooms)} номеров")
 
-            # Загружаем цены параллельно с учетом дат
-            room_prices_tasks = [
-                self._get_room_price(r.id, check_in, check_out)
-                for r in rooms
-            ]
-            prices = await asyncio.gather(*room_prices_tasks, return_exceptions=True)
+            # Цены всех номеров одним пакетом из расписаний (API только для незакэшированных)
+            prices = await self.room_prices.get_prices([r.id for r in rooms], check_in, check_out)
 
             # Проверяем уникальность цен
             unique_prices = set()
-            for room, price in zip(rooms, prices):
-                price_value = price if not isinstance(price, Exception) else None
+            for room in rooms:
+                price_value = prices.get(room.id)
                 logger.info(f"   💰 Номер '{room.name}' (ID: {room.id}): ${price_value}")
                 if price_value and price_value > 0:
                     unique_prices.add(price_value)
@@ -497,103 +487,9 @@ class HotelsLoader:
         }
 
     async def _get_room_price(self, room_id: int, check_in: str = None, check_out: str = None) -> float:
-        
+        """Минимальная цена номера за сутки для дат проживания (из кэша расписаний)"""
         try:
-            from datetime import datetime
-
-            # Проверяем кэш с учетом дат
-            cache_key = f"room:price:{room_id}"
-            if check_in and check_out:
-                cache_key = f"room:price:{room_id}:{check_in}:{check_out}"
-
-            cached_price = self.cache.get(cache_key)
-            if cached_price is not None:
-                logger.debug(f"✓ Используем кэш цены для номера {room_id}")
-                return float(cached_price)
-
-            data = await self.api.get_room_prices(room_id)
-            room_prices = []
-
-            logger.debug(f"📊 API вернул {len(data)} ценников для номера {room_id}")
-
-            # Конвертируем даты пользователя в Unix timestamps
-            check_in_ts = None
-            check_out_ts = None
-            if check_in:
-                check_in_ts = int(datetime.strptime(check_in, "%Y-%m-%d").timestamp())
-            if check_out:
-                check_out_ts = int(datetime.strptime(check_out, "%Y-%m-%d").timestamp())
-
-            # Обрабатываем массив ценников
-            matched_schedules = 0
-            for idx, price_obj in enumerate(data):
-                sdt = price_obj.get('sdt')  # Начало периода действия цены
-                edt = price_obj.get('edt')  # Окончание периода действия цены
-                plst = price_obj.get('plst', [])
-
-                # Если даты указаны, проверяем пересечение периодов
-                if check_in_ts and check_out_ts:
-                    if sdt and edt:
-                        from_date = datetime.fromtimestamp(sdt).strftime('%Y-%m-%d')
-                        to_date = datetime.fromtimestamp(edt).strftime('%Y-%m-%d')
-
-                        # Проверяем ЛЮБОЕ пересечение периодов (более гибкая логика)
-                        # Периоды пересекаются если: check_in <= edt И check_out >= sdt
-                        if check_in_ts <= edt and check_out_ts >= sdt:
-                            matched_schedules += 1
-
-                            # Проверяем, полностью ли покрывает или частично
-                            if sdt <= check_in_ts and edt >= check_out_ts:
-                                logger.debug(f"   ✓ Ценник #{idx+1} подходит ПОЛНОСТЬЮ ({from_date} - {to_date})")
-                            else:
-                                logger.debug(f"   ⚠ Ценник #{idx+1} подходит ЧАСТИЧНО ({from_date} - {to_date})")
-                        else:
-                            logger.debug(f"   ✗ Ценник #{idx+1} пропущен (период {from_date} - {to_date})")
-                            continue
-                    else:
-                        logger.debug(f"   ⚠ Ценник #{idx+1} без дат (sdt/edt)")
-                else:
-                    # Даты не указаны - берем все ценники
-                    logger.debug(f"   ✓ Ценник #{idx+1} (даты не заданы)")
-
-                # Обрабатываем компоненты ценника
-                for comp_idx, price_component in enumerate(plst):
-                    price = price_component.get('price', 0)
-                    per = price_component.get('per')  # За что платим
-                    period = price_component.get('period')  # Период оплаты
-
-                    # per: 2 = за объект (номер), period: 2 = за день
-                    # Берем ТОЛЬКО базовую цену номера, игнорируем доп. услуги (питание и т.д.)
-                    # Список per: https://app.pelagos.ru/json-loadenum/per/
-                    if per == 2 and price and price > 0:
-                        room_prices.append(price)
-                        logger.debug(f"      → Компонент #{comp_idx+1}: ${price} (per={per}, period={period})")
-                    else:
-                        # Пропускаем доп. услуги
-                        logger.debug(f"      ✗ Пропущен компонент #{comp_idx+1}: ${price} (per={per} - не базовая цена)")
-
-            # Возвращаем минимальную цену, если есть доступные цены
-            if room_prices:
-                min_price = min(room_prices)
-                max_price = max(room_prices)
-                period_info = f" для периода {check_in} - {check_out}" if check_in and check_out else ""
-
-                if min_price == max_price:
-                    logger.info(f"✓ Номер {room_id}{period_info}: ${min_price}/день")
-                else:
-                    logger.info(f"✓ Номер {room_id}{period_info}: ${min_price}-${max_price}/день (выбран min)")
-
-                # Кэшируем полученную цену на 1 час
-                self.cache.set(cache_key, min_price, ttl=3600)
-
-                return min_price
-            else:
-                period_info = f" для периода {check_in} - {check_out}" if check_in and check_out else ""
-                logger.warning(f"⚠️ Номер {room_id}{period_info}: цены не найдены (подходящих ценников: {matched_schedules})")
-
-                # НЕ кэшируем нулевые цены - возможно, данные появятся позже
-                return 0.0
-
+            return await self.room_prices.get_price(room_id, check_in, check_out)
         except Exception as e:
             logger.error(f"⚠️ Ошибка получения цены для номера {room_id}: {e}")
             return 0.0
@@ -621,8 +517,6 @@ class HotelsLoader:
         Загрузить все отели с ценами, отфильтровать по диапазону цен.
         Отель проходит фильтр если хотя бы один его номер имеет цену в диапазоне.
         """
-        import asyncio
-
         # Ключ кэша включает все параметры фильтрации
         stars_key = str(stars) if stars else "all"
         min_key = str(int(min_price)) if min_price else "0"
@@ -630,67 +524,15 @@ class HotelsLoader:
         dates_key = f"{check_in}:{check_out}" if check_in and check_out else "no_dates"
         cache_key = f"hotels:price_filtered:{island}:{stars_key}:{min_key}:{max_key}:{dates_key}"
 
-        cached = self.cache.get(cache_key)
-        if cached:
-            logger.info(f"✓ Кэш отелей с ценовым фильтром ({len(cached)} шт)")
-            filtered = cached
-        else:
-            # Загружаем все отели острова
-            logger.info(f"📡 Загрузка всех отелей для ценового фильтра {min_price}-{max_price}...")
-            all_hotels = await self.api.get_all_hotels(island)
-
-            # Фильтр по звёздам
-            if stars:
-                all_hotels = [h for h in all_hotels if h.stars == stars]
-                logger.info(f"⭐ После фильтра по звёздам: {len(all_hotels)} отелей")
-
-            # Сортировка по рейтингу
-            all_hotels.sort(key=lambda h: h.ord if h.ord else 0, reverse=True)
-
-            logger.info(f"💰 Параллельная загрузка цен для {len(all_hotels)} отелей...")
-
-            async def load_hotel_with_prices(hotel):
-                try:
-                    rooms_cache_key = f"hotel:rooms:{hotel.id}"
-                    cached_rooms = self.cache.get(rooms_cache_key)
-                    if cached_rooms:
-                        rooms = [HotelRoom.from_dict(r) for r in cached_rooms]
-                    else:
-                        rooms = await self.api.get_all_rooms(hotel.id)
-                        rooms_dicts = [
-                            {'id': r.id, 'name': r.name, 'parent': r.parent, 'type': r.type}
-                            for r in rooms
-                        ]
-                        self.cache.set(rooms_cache_key, rooms_dicts, ttl=self.CACHE_TTL)
-                    return await self._convert_hotel_async(
-                        hotel, rooms, load_prices=True, check_in=check_in, check_out=check_out
-                    )
-                except Exception as e:
-                    logger.error(f"Ошибка загрузки отеля {hotel.id}: {e}")
-                    return self._convert_hotel(hotel, [])
-
-            hotel_dicts = await asyncio.gather(
-                *[load_hotel_with_prices(h) for h in all_hotels],
-                return_exceptions=True
-            )
-            hotel_dicts = [h for h in hotel_dicts if not isinstance(h, Exception)]
-
-            # Фильтруем: оставляем отель если хотя бы один номер попадает в диапазон
-            filtered = []
-            for hotel in hotel_dicts:
-                for room in hotel.get('rooms', []):
-                    price = room.get('price', 0)
-                    if price and price > 0:
-                        above_min = (min_price is None or price >= min_price)
-                        below_max = (max_price is None or price <= max_price)
-                        if above_min and below_max:
-                            filtered.append(hotel)
-                            break
-
-            logger.info(f"✅ Ценовой фильтр: {len(filtered)} из {len(hotel_dicts)} отелей")
-
-            # Кэшируем на 1 час (TTL совпадает с кэшем цен на номера)
-            self.cache.set(cache_key, filtered, ttl=3600)
+        # Сборка дорогая (цены всех номеров острова): пересобирает один процесс под lock'ом,
+        # горячие ключи обновляются в фоне незадолго до истечения
+        filtered = await self.cache.get_or_load(
+            cache_key,
+            lambda: self._load_price_filtered_hotels(island, stars, min_price, max_price, check_in, check_out),
+            ttl=self.PRICE_FILTER_TTL,
+            lock_timeout=self.PRICE_FILTER_LOCK_TIMEOUT,
+            early_beta=1.0
+        )
 
         total_hotels = len(filtered)
         if not total_hotels:
@@ -713,6 +555,85 @@ class HotelsLoader:
             'total_pages': total_pages
         }
 
+    async def _load_price_filtered_hotels(
+        self,
+        island: str,
+        stars: Optional[int],
+        min_price: Optional[float],
+        max_price: Optional[float],
+        check_in: Optional[str],
+        check_out: Optional[str]
+    ):
+        """
+        Загрузить отели острова с ценами и оставить попадающие в диапазон (без кэша)
+
+        Returns:
+            Список словарей отелей или Uncached, если во время загрузки API сбоил
+        """
+        async def load_hotel_rooms(hotel):
+            try:
+                return await self._get_hotel_rooms(hotel.id)
+            except Exception as e:
+                logger.error(f"Ошибка загрузки отеля {hotel.id}: {e}")
+                return None
+
+        # Отели острова приходят постранично - номера каждого отеля загружаются,
+        # не дожидаясь остальных страниц списка
+        logger.info(f"📡 Загрузка всех отелей для ценового фильтра {min_price}-{max_price}...")
+        with self.api.track_failures() as failures:
+            all_hotels = []
+            rooms_tasks = {}
+            try:
+                async with aclosing(self.api.iter_hotels(island)) as hotels_stream:
+                    async for hotel in hotels_stream:
+                        # Фильтр по звёздам
+                        if (stars and hotel.stars != stars) or hotel.id in rooms_tasks:
+                            continue
+                        all_hotels.append(hotel)
+                        rooms_tasks[hotel.id] = asyncio.ensure_future(load_hotel_rooms(hotel))
+            except BaseException:
+                for task in rooms_tasks.values():
+                    task.cancel()
+                raise
+
+            # Сортировка по рейтингу
+            all_hotels.sort(key=lambda h: h.ord if h.ord else 0, reverse=True)
+
+            logger.info(f"💰 Номера {len(all_hotels)} отелей{f' ({stars}⭐)' if stars else ''}...")
+            hotels_rooms = await asyncio.gather(*[rooms_tasks[h.id] for h in all_hotels])
+
+            # Расписания цен всех номеров острова одним пакетом - дальше цены считаются в памяти
+            await self.room_prices.load(r.id for rooms in hotels_rooms if rooms for r in rooms)
+
+            hotel_dicts = []
+            for hotel, rooms in zip(all_hotels, hotels_rooms):
+                if rooms is None:
+                    hotel_dicts.append(self._convert_hotel(hotel, []))
+                    continue
+                hotel_dicts.append(await self._convert_hotel_async(
+                    hotel, rooms, load_prices=True, check_in=check_in, check_out=check_out
+                ))
+
+        # Фильтруем: оставляем отель если хотя бы один номер попадает в диапазон
+        filtered = []
+        for hotel in hotel_dicts:
+            for room in hotel.get('rooms', []):
+                price = room.get('price', 0)
+                if price and price > 0:
+                    above_min = (min_price is None or price >= min_price)
+                    below_max = (max_price is None or price <= max_price)
+                    if above_min and below_max:
+                        filtered.append(hotel)
+                        break
+
+        logger.info(f"✅ Ценовой фильтр: {len(filtered)} из {len(hotel_dicts)} отелей")
+
+        # Во время сбоя API часть цен могла не загрузиться - такой результат не кэшируем
+        if failures.failed:
+            logger.warning("⚠️ Сбой Pelagos API во время загрузки цен, результат не кэшируется")
+            return Uncached(filtered)
+        return filtered
+
     async def _get_filtered_hotels_page(
         self,
         filtered_hotels: list,
@@ -754,37 +675,14 @@ class HotelsLoader:
                 hotel_id = int(hotel_dict['id'])
 
                 # Получаем номера из кэша или API
-                cache_key = f"hotel:rooms:{hotel_id}"
-                cached_rooms = self.cache.get(cache_key)
-
-                if cached_rooms:
-                    rooms = [HotelRoom.from_dict(r) for r in cached_rooms]
-                else:
-                    rooms = await self.api.get_all_rooms(hotel_id)
-                    # Кэшируем номера
-                    rooms_dicts = [
-                        {
-                            'id': r.id,
-                            'name': r.name,
-                            'parent': r.parent,
-                            'type': r.type
-                        }
-                        for r in rooms
-                    ]
-                    self.cache.set(cache_key, rooms_dicts, ttl=self.CACHE_TTL)
+                rooms = await self._get_hotel_rooms(hotel_id)
 
                 # Загружаем цены параллельно
                 rooms_data = []
                 if rooms:
-                    room_prices_tasks = [
-                        self._get_room_price(r.id, check_in, check_out)
-                        for r in rooms
-                    ]
-                    prices = await asyncio.gather(*room_prices_tasks, return_exceptions=True)
-
-                    for room, price in zip(rooms, prices):
-                        price_value = price if not isinstance(price, Exception) else None
-                        rooms_data.append(self._convert_room(room, price_value))
+                    prices = await self.room_prices.get_prices([r.id for r in rooms], check_in, check_out)
+                    for room in rooms:
+                        rooms_data.append(self._convert_room(room, prices.get(room.id)))
 
                 # Обновляем словарь отеля с номерами
                 hotel_dict['rooms'] = rooms_data
@@ -1,8 +1,11 @@
 """Загрузчик данных для пакетных туров через Pelagos API"""
+import asyncio
 import logging
-from typing import Optional, Dict, List
+from typing import List, Optional
 from services.pelagos_api import PelagosAPI
 from utils.cache_manager import get_cache_manager
+from utils.price_table import PriceTable
+from utils.service_prices import ServicePrices
 
 logger = logging.getLogger(__name__)
 
@@ -12,62 +15,23 @@ class PackagesLoader:
 
     # TTL для кэша (3 часа)
     CACHE_TTL = 10800
+    # Сколько ещё после CACHE_TTL можно отдавать устаревший список (пока идёт обновление)
+    CACHE_STALE_TTL = 3600
 
     # Тип услуги для туров в API
     SERVICE_TYPE = 1150
 
-    def __init__(self, api: Optional[PelagosAPI] = None, **kwargs):
+    def __init__(self, api: Optional[PelagosAPI] = None, service_prices: Optional[ServicePrices] = None, **kwargs):
         """
         Args:
             api: API для работы с турами (Pelagos API)
+            service_prices: общий кэш цен услуг (по умолчанию - свой)
         """
         self.api = api
         self.cache = get_cache_manager()
-
-    def _extract_price_list_from_plst(self, plst: List[Dict]) -> Dict[int, float]:
-        """
-        Извлечь список цен для разного количества человек из plst
-
-        Args:
-            plst: массив из API с ценами [{grp: 1, price: 50}, ...]
-
-        Returns:
-            dict: {количество_людей: цена_за_человека}
-        """
-        price_list = {}
-        for item in plst:
-            grp = item.get('grp')
-            price = item.get('price')
-            if grp and price is not None:
-                price_list[grp] = float(price)
-        return price_list
-
-    async def _load_package_prices(self, package_id: int) -> Dict[int, float]:
-        """
-        Загрузить цены для тура по его ID
-
-        Args:
-            package_id: ID тура
-
-        Returns:
-            dict: {количество_людей: цена_за_человека}
-        """
-        try:
-            prices_data = await self.api.get_service_prices(package_id)
-
-            if not prices_data:
-                return {}
-
-            combined_price_list = {}
-            for price_entry in prices_data:
-                plst = price_entry.get('plst', [])
-                price_list = self._extract_price_list_from_plst(plst)
-                combined_price_list.update(price_list)
-
-            return combined_price_list
-        except Exception as e:
-            logger.warning(f"⚠️ Не удалось загрузить цены для тура {package_id}: {e}")
-            return {}
+        self.service_prices = service_prices or ServicePrices(api, self.cache)
+        # Фоновые предзагрузки цен свежезагруженного списка (ссылки, чтобы задачи не собрал GC)
+        self._preload_tasks = set()
 
     async def get_all_packages(self) -> list:
         """
@@ -80,82 +44,110 @@ class PackagesLoader:
             logger.warning("⚠️ API не инициализирован")
             return []
 
-        # Проверяем кэш
-        cache_key = "packages:all"
-        cached = self.cache.get(cache_key)
-        if cached:
-            logger.info(f"✓ Используем кэш пакетных туров ({len(cached)} шт)")
-            return cached
-
+        # Кэш с stale-while-revalidate: после CACHE_TTL отдаём старый список и обновляем в фоне
         try:
-            logger.info("📡 Запрос пакетных туров из API...")
-
-            result = await self.api.get_services(
-                service_type=self.SERVICE_TYPE,
-                perpage=500
+            return await self.cache.get_or_load(
+                "packages:all",
+                self._load_packages,
+                ttl=self.CACHE_TTL,
+                stale_ttl=self.CACHE_STALE_TTL
             )
-
-            # Используем raw данные из API напрямую (Service dataclass теряет некоторые поля)
-            raw_services = result.get("raw_data", {}).get("services", [])
-            logger.info(f"📥 API вернул {len(raw_services)} пакетных туров")
-
-            packages = []
-            for service in raw_services:
-                # Пропускаем детские тарифы
-                childrate = service.get('childrate')
-                if childrate and childrate > 0:
-                    continue
-
-                service_id = service.get('id')
-
-                # Фото
-                pics = service.get('pics', [])
-                photo_url = None
-                if pics and len(pics) > 0:
-                    first_pic = pics[0]
-                    if isinstance(first_pic, dict):
-                        md5 = first_pic.get('md5')
-                        ext = first_pic.get('ext')
-                        if md5 and ext:
-                            photo_url = f"https://ru.pelagos.ru/pic/{md5}/{md5}.{ext}"
-
-                # URL описания: inhttp или fallback
-                inhttp = service.get('inhttp') or f"https://app.pelagos.ru/activity/{service_id}/"
-
-                package_dict = {
-                    'id': str(service_id),
-                    'name': service.get('name', ''),
-                    'type': service.get('type'),
-                    'subtype': service.get('subtype'),
-                    'russian_guide': service.get('russian_guide') == 10,
-                    'lunch_included': service.get('lunch_included') == 10,
-                    'private_transport': service.get('private_transport') == 10,
-                    'tickets_included': service.get('tickets_included') == 10,
-                    'inhttp': inhttp,
-                    'pics': pics,
-                    'photo': photo_url,
-                    'ord': service.get('ord', 0),
-                    # Цены загружаются отдельно
-                    'price_usd': None,
-                    'price_list': {},
-                    'prices_loaded': False,
-                }
-
-                packages.append(package_dict)
-
-            # Сортируем по рейтингу (ord) — чем больше, тем выше
-            packages.sort(key=lambda x: x.get('ord', 0), reverse=True)
-
-            # Кэшируем
-            self.cache.set(cache_key, packages, ttl=self.CACHE_TTL)
-
-            logger.info(f"✅ Загружено {len(packages)} пакетных туров из API")
-            return packages
-
         except Exception as e:
             logger.error(f"❌ Ошибка загрузки пакетных туров: {e}")
             return []
 
+    async def _load_packages(self) -> list:
+        """
+        Загрузить пакетные туры из API и преобразовать в словари (без кэша)
+
+        Returns:
+            list: список словарей туров, отсортированный по ord
+        """
+        logger.info("📡 Запрос пакетных туров из API...")
+
+        result = await self.api.get_services(
+            service_type=self.SERVICE_TYPE,
+            perpage=500
+        )
+
+        # Используем raw данные из API напрямую (Service dataclass теряет некоторые поля)
+        raw_services = result.get("raw_data", {}).get("services", [])
+        logger.info(f"📥 API вернул {len(raw_services)} пакетных туров")
+
+        packages = []
+        for service in raw_services:
+            # Пропускаем детские тарифы
+            childrate = service.get('childrate')
+            if childrate and childrate > 0:
+                continue
+
+            service_id = service.get('id')
+
+            # Фото
+            pics = service.get('pics', [])
+            photo_url = None
+            if pics and len(pics) > 0:
+                first_pic = pics[0]
+                if isinstance(first_pic, dict):
+                    md5 = first_pic.get('md5')
+                    ext = first_pic.get('ext')
+                    if md5 and ext:
+                        photo_url = f"https://ru.pelagos.ru/pic/{md5}/{md5}.{ext}"
+
+            # URL описания: inhttp или fallback
+            inhttp = service.get('inhttp') or f"https://app.pelagos.ru/activity/{service_id}/"
+
+            package_dict = {
+                'id': str(service_id),
+                'name': service.get('name', ''),
+                'type': service.get('type'),
+                'subtype': service.get('subtype'),
+                'russian_guide': service.get('russian_guide') == 10,
+                'lunch_included': service.get('lunch_included') == 10,
+                'private_transport': service.get('private_transport') == 10,
+                'tickets_included': service.get('tickets_included') == 10,
+                'inhttp': inhttp,
+                'pics': pics,
+                'photo': photo_url,
+                'ord': service.get('ord', 0),
+                # Цены загружаются отдельно
+                'price_usd': None,
+                'price_table': [],
+                'prices_loaded': False,
+            }
+
+            packages.append(package_dict)
+
+        # Сортируем по рейтингу (ord) — чем больше, тем выше
+        packages.sort(key=lambda x: x.get('ord', 0), reverse=True)
+
+        # Уже закэшированные цены проставляем сразу (без запросов к API),
+        # остальные дозагрузит фоновая предзагрузка цен
+        tables = await self.service_prices.get_many((int(p['id']) for p in packages), load_missing=False)
+        packages = [self._apply_prices(p, tables[int(p['id'])]) if tables.get(int(p['id'])) else p for p in packages]
+        if not all(p['prices_loaded'] for p in packages):
+            self._schedule_preload(packages)
+
+        logger.info(f"✅ Загружено {len(packages)} пакетных туров из API")
+        return packages
+
+    def _schedule_preload(self, packages: list):
+        """
+        Проставить цены свежезагруженному списку в фоне, не дожидаясь таймера предзагрузчика
+
+        Задача ждёт, пока загрузка сохранит список в кэш, и дописывает цены уже в него.
+        """
+        async def preload():
+            try:
+                await self.cache.wait_loading("packages:all")
+                await self.preload_prices(packages)
+            except Exception as e:
+                logger.error(f"❌ Ошибка предзагрузки цен туров: {e}")
+
+        task = asyncio.create_task(preload())
+        self._preload_tasks.add(task)
+        task.add_done_callback(self._preload_tasks.discard)
+
     async def get_package_by_id(self, package_id: str) -> Optional[dict]:
         """
         Получить тур по ID (без цен)
@@ -170,13 +162,10 @@ class PackagesLoader:
             return None
 
         try:
-            # Ищем в кэше
-            cache_key = "packages:all"
-            cached = self.cache.get(cache_key)
-            if cached:
-                for pkg in cached:
-                    if str(pkg['id']) == str(package_id):
-                        return pkg
+            # Ищем в индексе ID (заполняется при кэшировании packages:all)
+            pkg = await self.cache.get_indexed("packages", package_id)
+            if pkg:
+                return pkg
 
             # Если нет в кэше — загружаем все
             all_packages = await self.get_all_packages()
@@ -201,31 +190,100 @@ class PackagesLoader:
         Returns:
             dict с ценами или None
         """
-        package = await self.get_package_by_id(package_id)
-        if not package:
-            return None
+        return (await self.get_packages_with_prices([package_id]))[0]
 
-        # Если цены уже загружены
-        if package.get('prices_loaded'):
-            return package
+    async def get_packages_with_prices(self, package_ids: List[str]) -> List[Optional[dict]]:
+        """
+        Получить туры по ID с ценами (цены недостающих загружаются параллельно)
 
-        try:
-            price_list = await self._load_package_prices(int(package_id))
+        Туры с загруженными ценами записываются обратно в индекс ID кэша -
+        повторные показы (и другие пользователи) обходятся без запросов цен.
 
-            if price_list:
-                package['price_list'] = price_list
-                # Базовая цена — для 1 человека или минимальная
-                package['price_usd'] = price_list.get(1) or min(price_list.values())
-                package['prices_loaded'] = True
-                logger.info(f"💰 Загружены цены для тура {package_id}: {price_list}")
-            else:
-                logger.warning(f"⚠️ Цены для тура {package_id} не найдены")
+        Args:
+            package_ids: ID туров
 
-            return package
+        Returns:
+            список dict (None для ненайденных) в порядке package_ids
+        """
+        packages = list(await asyncio.gather(*[self.get_package_by_id(package_id) for package_id in package_ids]))
+
+        unpriced = [(i, package) for i, package in enumerate(packages) if package and not package.get('prices_loaded')]
+        if not unpriced:
+            return packages
 
+        try:
+            tables = await self.service_prices.get_many(int(package['id']) for _, package in unpriced)
         except Exception as e:
-            logger.error(f"❌ Ошибка загрузки цен для тура {package_id}: {e}")
-            return package
+            logger.error(f"❌ Ошибка загрузки цен для туров: {e}")
+            return packages
+
+        priced = []
+        for i, package in unpriced:
+            price_table = tables.get(int(package['id']))
+            if not price_table:
+                logger.warning(f"⚠️ Цены для тура {package['id']} не найдены")
+                continue
+
+            packages[i] = self._apply_prices(package, price_table)
+            priced.append(packages[i])
+
+        if priced:
+            await self.cache.set_indexed("packages", priced)
+            logger.info(f"💰 Загружены цены для {len(priced)} туров")
+
+        return packages
+
+    async def preload_prices(self, packages: Optional[list] = None) -> int:
+        """
+        Проставить цены всем турам закэшированного списка
+
+        Таблицы цен загружаются пакетно (ограниченная параллельность) и
+        обновляются по stale-while-revalidate. Цены проставляются в актуальную
+        версию списка (cache.update): пока они грузились, список могло
+        обновить SWR - он не затирается прочитанным ранее. TTL сохраняется,
+        карточки показываются сразу с ценами.
+
+        Args:
+            packages: уже загруженный список (по умолчанию - из кэша)
+
+        Returns:
+            количество туров с изменившимися ценами
+        """
+        if packages is None:
+            packages = await self.get_all_packages()
+        if not packages:
+            return 0
+
+        tables = await self.service_prices.get_many((int(p['id']) for p in packages), revalidate=True)
+
+        changed = 0
+
+        def apply_prices(current: list) -> Optional[list]:
+            nonlocal changed
+            changed = 0
+            priced = []
+            for package in current:
+                price_table = tables.get(int(package['id']))
+                if price_table and (not package.get('prices_loaded') or PriceTable.from_record(package) != price_table):
+                    package = self._apply_prices(package, price_table)
+                    changed += 1
+                priced.append(package)
+            return priced if changed else None
+
+        if not await self.cache.update("packages:all", apply_prices):
+            return 0
+        logger.info(f"💰 Цены туров: обновлено {changed}")
+        return changed
+
+    @staticmethod
+    def _apply_prices(package: dict, price_table: PriceTable) -> dict:
+        """Копия тура с таблицей цен и базовой ценой (для 1 человека или минимальной)"""
+        package = dict(package)
+        package.pop('price_list', None)
+        package['price_table'] = price_table.to_cache()
+        package['price_usd'] = price_table.get(1) or price_table.min_price
+        package['prices_loaded'] = True
+        return package
 
     def get_price_for_people_count(self, package: dict, people_count: int) -> float:
         """
@@ -236,25 +294,9 @@ class PackagesLoader:
             people_count: количество человек
 
         Returns:
-            float: цена за человека
+            float: цена за человека (точный grp, иначе ближайший больший, иначе максимальный)
         """
-        price_list = package.get('price_list', {})
-
-        if not price_list:
+        price = PriceTable.from_record(package).price_for(people_count)
+        if price is None:
             return package.get('price_usd') or 0
-
-        # Точное совпадение
-        if people_count in price_list:
-            return price_list[people_count]
-
-        # Ближайшее большее значение grp
-        available_grps = sorted(price_list.keys())
-        for grp in available_grps:
-            if grp >= people_count:
-                return price_list[grp]
-
-        # Максимальный grp
-        if available_grps:
-            return price_list[max(available_grps)]
-
-        return 0
+        return price
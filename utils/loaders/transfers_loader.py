@@ -1,8 +1,11 @@
 """Загрузчик данных для трансферов"""
+import asyncio
 import logging
-from typing import Optional, Dict, List
+from typing import List, Optional
 from services.pelagos_api import PelagosAPI
 from utils.cache_manager import get_cache_manager
+from utils.price_table import PriceTable
+from utils.service_prices import ServicePrices
 
 logger = logging.getLogger(__name__)
 
@@ -12,6 +15,8 @@ class TransfersLoader:
 
     # TTL для кэша (3 часа)
     CACHE_TTL = 10800
+    # Сколько ещё после CACHE_TTL можно отдавать устаревший список (пока идёт обновление)
+    CACHE_STALE_TTL = 3600
 
     # Маппинг кодов островов на ID локаций в API
     LOCATION_MAP = {
@@ -24,61 +29,40 @@ class TransfersLoader:
         # Добавьте другие острова по необходимости
     }
 
-    def __init__(self, api: Optional[PelagosAPI] = None, json_path: str = None):
+    def __init__(
+        self,
+        api: Optional[PelagosAPI] = None,
+        json_path: str = None,
+        service_prices: Optional[ServicePrices] = None
+    ):
         """
         Args:
             api: API для работы с трансферами (Pelagos API)
             json_path: устаревший параметр, оставлен для обратной совместимости
+            service_prices: общий кэш цен услуг (по умолчанию - свой)
         """
         self.api = api
         self.cache = get_cache_manager()
-
-    def _extract_price_list_from_plst(self, plst: List[Dict]) -> Dict[int, float]:
-        """
-        Извлечь список цен для разного количества человек из plst
-
-        Args:
-            plst: массив из API с ценами [{grp: 1, price: 50}, {grp: 2, price: 25}, ...]
-
-        Returns:
-            dict: {количество_людей: цена_за_человека}
-        """
-        price_list = {}
-        for item in plst:
-            grp = item.get('grp')
-            price = item.get('price')
-            if grp and price is not None:
-                price_list[grp] = float(price)
-        return price_list
-
-    async def _load_transfer_prices(self, transfer_id: int) -> Dict[int, float]:
-        """
-        Загрузить цены для трансфера по его ID
-
-        Args:
-            transfer_id: ID трансфера
-
-        Returns:
-            dict: {количество_людей: цена_за_человека}
-        """
-        try:
-            prices_data = await self.api.get_service_prices(transfer_id)
-
-            if not prices_data:
-                return {}
-
-            # Объединяем plst из всех ценников (prices может быть несколько)
-            combined_price_list = {}
-            for price_entry in prices_data:
-                plst = price_entry.get('plst', [])
-                price_list = self._extract_price_list_from_plst(plst)
-                # Обновляем, более новые записи перезапишут старые
-                combined_price_list.update(price_list)
-
-            return combined_price_list
-        except Exception as e:
-            logger.warning(f"⚠️ Не удалось загрузить цены для трансфера {transfer_id}: {e}")
-            return {}
+        self.service_prices = service_prices or ServicePrices(api, self.cache)
+        # Фоновые предзагрузки цен свежезагруженных списков (ссылки, чтобы задачи не собрал GC)
+        self._preload_tasks = set()
+
+    @classmethod
+    def canonical_islands(cls) -> List[str]:
+        """Коды островов без дублей по локации API (bohol и panglao - одна локация)"""
+        islands = {}
+        for island, location_id in cls.LOCATION_MAP.items():
+            islands.setdefault(location_id, island)
+        return list(islands.values())
+
+    @classmethod
+    def _cache_key(cls, island: Optional[str]) -> str:
+        """Ключ списка трансферов: острова с одной локацией API делят один список"""
+        if not island:
+            return "transfers:all"
+        location_id = cls.LOCATION_MAP[island.lower()]
+        canonical = next(code for code, code_location in cls.LOCATION_MAP.items() if code_location == location_id)
+        return f"transfers:{canonical}"
 
     async def get_transfers_by_island(self, island: str = None) -> list:
         """
@@ -102,91 +86,123 @@ class TransfersLoader:
                 logger.warning(f"⚠️ Неизвестный код острова: {island}")
                 return []
 
-        # Создаем ключ кэша
-        cache_key = f"transfers:{island if island else 'all'}"
-        cached_transfers = self.cache.get(cache_key)
-
-        if cached_transfers:
-            logger.info(f"✓ Используем кэш трансферов для {island or 'всех островов'} ({len(cached_transfers)} шт)")
-            return cached_transfers
-
+        # Кэш с stale-while-revalidate: после CACHE_TTL отдаём старый список и обновляем в фоне
+        cache_key = self._cache_key(island)
         try:
-            if location_id:
-                logger.info(f"📡 Запрос трансферов для {island} (location_id={location_id})...")
-            else:
-                logger.info(f"📡 Запрос всех трансферов (без фильтра по location)...")
-
-            # Получаем все трансферы через API
-            transfers_objects = await self.api.get_all_transfers(location_id=location_id)
-
-            # Конвертируем Transfer объекты в словари для совместимости
-            transfers = []
-            for transfer in transfers_objects:
-                # Пропускаем детские тарифы
-                if transfer.childrate and transfer.childrate > 0:
-                    continue
-
-                # Формируем описание на основе характеристик трансфера
-                description_parts = []
-                if transfer.group_ex:
-                    description_parts.append("Групповой трансфер")
-                elif transfer.private_transport:
-                    description_parts.append("Приватный трансфер")
-                else:
-                    description_parts.append("Комфортабельный трансфер")
-
-                if transfer.russian_guide:
-                    description_parts.append("с русскоговорящим гидом")
-
-                description = ". ".join(description_parts) + "."
-
-                transfer_dict = {
-                    'id': str(transfer.id),
-                    'name': transfer.name,
-                    'island': island or 'unknown',
-                    'location': transfer.location,
-                    'base_id': transfer.base_id,
-                    'type': transfer.type,
-                    'subtype': transfer.subtype,
-                    'russian_guide': transfer.russian_guide,
-                    'private_transport': transfer.private_transport,
-                    'group_ex': transfer.group_ex,
-                    'pics': transfer.pics,
-                    'inhttp': transfer.inhttp,
-                    'ord': transfer.ord,
-                    'score': transfer.score,
-                    # Добавляем недостающие поля для совместимости
-                    'description': description,
-                    # Цены будут загружены отдельно через get_transfer_with_prices()
-                    'price_per_person_usd': None,  # Будет заполнено при загрузке цен
-                    'base_price_usd': None,
-                    'price_list': {},  # {grp: price} - цены для разного кол-ва людей
-                    'prices_loaded': False  # Флаг, что цены ещё не загружены
-                }
-
-                # Извлекаем URL первого фото, если есть
-                if transfer.pics and len(transfer.pics) > 0:
-                    first_pic = transfer.pics[0]
-                    # Используем формат md5 как у экскурсий и отелей
-                    if isinstance(first_pic, dict) and 'md5' in first_pic and 'ext' in first_pic:
-                        photo_url = f"https://app.pelagos.ru/pic/{first_pic['md5']}/{first_pic['md5']}.{first_pic['ext']}"
-                        transfer_dict['photo'] = photo_url
-
-                transfers.append(transfer_dict)
-
-            # Сортируем по ord (рейтингу) в порядке убывания
-            transfers = sorted(transfers, key=lambda t: t.get('ord', 0), reverse=True)
-
-            # Кэшируем результат
-            self.cache.set(cache_key, transfers, ttl=self.CACHE_TTL)
-
-            logger.info(f"✅ Загружено {len(transfers)} трансферов из API")
-            return transfers
-
+            return await self.cache.get_or_load(
+                cache_key,
+                lambda: self._load_transfers(island, location_id),
+                ttl=self.CACHE_TTL,
+                stale_ttl=self.CACHE_STALE_TTL
+            )
         except Exception as e:
             logger.error(f"❌ Ошибка загрузки трансферов: {e}")
             return []
 
+    async def _load_transfers(self, island: Optional[str], location_id: Optional[int]) -> list:
+        """
+        Загрузить трансферы из API и преобразовать в словари (без кэша)
+
+        Args:
+            island: код острова или None
+            location_id: ID локации в API или None для всех
+
+        Returns:
+            list: список словарей трансферов, отсортированный по ord
+        """
+        if location_id:
+            logger.info(f"📡 Запрос трансферов для {island} (location_id={location_id})...")
+        else:
+            logger.info(f"📡 Запрос всех трансферов (без фильтра по location)...")
+
+        # Получаем все трансферы через API
+        transfers_objects = await self.api.get_all_transfers(location_id=location_id)
+
+        # Конвертируем Transfer объекты в словари для совместимости
+        transfers = []
+        for transfer in transfers_objects:
+            # Пропускаем детские тарифы
+            if transfer.childrate and transfer.childrate > 0:
+                continue
+
+            # Формируем описание на основе характеристик трансфера
+            description_parts = []
+            if transfer.group_ex:
+                description_parts.append("Групповой трансфер")
+            elif transfer.private_transport:
+                description_parts.append("Приватный трансфер")
+            else:
+                description_parts.append("Комфортабельный трансфер")
+
+            if transfer.russian_guide:
+                description_parts.append("с русскоговорящим гидом")
+
+            description = ". ".join(description_parts) + "."
+
+            transfer_dict = {
+                'id': str(transfer.id),
+                'name': transfer.name,
+                # Остров не пишем: список локации общий для её островов (bohol/panglao)
+                'location': transfer.location,
+                'base_id': transfer.base_id,
+                'type': transfer.type,
+                'subtype': transfer.subtype,
+                'russian_guide': transfer.russian_guide,
+                'private_transport': transfer.private_transport,
+                'group_ex': transfer.group_ex,
+                'pics': transfer.pics,
+                'inhttp': transfer.inhttp,
+                'ord': transfer.ord,
+                'score': transfer.score,
+                # Добавляем недостающие поля для совместимости
+                'description': description,
+                # Цены будут загружены отдельно через get_transfer_with_prices()
+                'price_per_person_usd': None,  # Будет заполнено при загрузке цен
+                'base_price_usd': None,
+                'price_table': [],  # [[grp, price], ...] - цены для разного кол-ва людей (PriceTable)
+                'prices_loaded': False  # Флаг, что цены ещё не загружены
+            }
+
+            # Извлекаем URL первого фото, если есть
+            if transfer.pics and len(transfer.pics) > 0:
+                first_pic = transfer.pics[0]
+                # Используем формат md5 как у экскурсий и отелей
+                if isinstance(first_pic, dict) and 'md5' in first_pic and 'ext' in first_pic:
+                    photo_url = f"https://app.pelagos.ru/pic/{first_pic['md5']}/{first_pic['md5']}.{first_pic['ext']}"
+                    transfer_dict['photo'] = photo_url
+
+            transfers.append(transfer_dict)
+
+        # Сортируем по ord (рейтингу) в порядке убывания
+        transfers = sorted(transfers, key=lambda t: t.get('ord', 0), reverse=True)
+
+        # Уже закэшированные цены проставляем сразу (без запросов к API),
+        # остальные дозагрузит фоновая предзагрузка цен
+        tables = await self.service_prices.get_many((int(t['id']) for t in transfers), load_missing=False)
+        transfers = [self._apply_prices(t, tables[int(t['id'])]) if tables.get(int(t['id'])) else t for t in transfers]
+        if not all(t['prices_loaded'] for t in transfers):
+            self._schedule_preload(island, transfers)
+
+        logger.info(f"✅ Загружено {len(transfers)} трансферов из API")
+        return transfers
+
+    def _schedule_preload(self, island: Optional[str], transfers: list):
+        """
+        Проставить цены свежезагруженному списку в фоне, не дожидаясь таймера предзагрузчика
+
+        Задача ждёт, пока загрузка сохранит список в кэш, и дописывает цены уже в него.
+        """
+        async def preload():
+            try:
+                await self.cache.wait_loading(self._cache_key(island))
+                await self.preload_prices(island, transfers)
+            except Exception as e:
+                logger.error(f"❌ Ошибка предзагрузки цен трансферов ({island or 'все'}): {e}")
+
+        task = asyncio.create_task(preload())
+        self._preload_tasks.add(task)
+        task.add_done_callback(self._preload_tasks.discard)
+
     async def get_transfer_by_id(self, transfer_id: str) -> Optional[dict]:
         """
         Получить трансфер по ID (без цен)
@@ -202,16 +218,11 @@ class TransfersLoader:
             return None
 
         try:
-            # Пытаемся найти в кэше среди всех трансферов
-            for island_key in ['cebu', 'bohol', 'boracay', 'panglao', 'palawan', 'all']:
-                cache_key = f"transfers:{island_key}"
-                cached_transfers = self.cache.get(cache_key)
-
-                if cached_transfers:
-                    for transfer in cached_transfers:
-                        if str(transfer['id']) == str(transfer_id):
-                            logger.info(f"✓ Трансфер {transfer_id} найден в кэше")
-                            return transfer
+            # Индекс ID заполняется при кэшировании любого списка transfers:*
+            transfer = await self.cache.get_indexed("transfers", transfer_id)
+            if transfer:
+                logger.info(f"✓ Трансфер {transfer_id} найден в кэше")
+                return transfer
 
             # Если не нашли в кэше, загружаем все трансферы
             logger.info(f"📡 Трансфер {transfer_id} не найден в кэше, загружаем все...")
@@ -239,36 +250,103 @@ class TransfersLoader:
         Returns:
             dict: словарь с информацией о трансфере и ценами или None
         """
-        # Сначала получаем базовую информацию о трансфере
-        transfer = await self.get_transfer_by_id(transfer_id)
-        if not transfer:
-            return None
+        return (await self.get_transfers_with_prices([transfer_id]))[0]
 
-        # Если цены уже загружены - возвращаем как есть
-        if transfer.get('prices_loaded'):
-            return transfer
+    async def get_transfers_with_prices(self, transfer_ids: List[str]) -> List[Optional[dict]]:
+        """
+        Получить трансферы по ID с ценами (цены недостающих загружаются параллельно)
 
-        # Загружаем цены
-        try:
-            price_list = await self._load_transfer_prices(int(transfer_id))
+        Трансферы с загруженными ценами записываются обратно в индекс ID кэша -
+        повторные показы (и другие пользователи) обходятся без запросов цен.
 
-            if price_list:
-                transfer['price_list'] = price_list
-                # Устанавливаем базовую цену (для 1 человека)
-                transfer['price_per_person_usd'] = price_list.get(1, 0)
-                transfer['base_price_usd'] = price_list.get(1, 0)
-                transfer['prices_loaded'] = True
+        Args:
+            transfer_ids: ID трансферов
 
-                logger.info(f"💰 Загружены цены для трансфера {transfer_id}: {price_list}")
-            else:
-                logger.warning(f"⚠️ Цены для трансфера {transfer_id} не найдены в API")
-                # Оставляем None, чтобы было понятно что цен нет
+        Returns:
+            list: словари трансферов (None для ненайденных) в порядке transfer_ids
+        """
+        transfers = list(await asyncio.gather(*[self.get_transfer_by_id(transfer_id) for transfer_id in transfer_ids]))
 
-            return transfer
+        unpriced = [(i, transfer) for i, transfer in enumerate(transfers) if transfer and not transfer.get('prices_loaded')]
+        if not unpriced:
+            return transfers
 
+        try:
+            tables = await self.service_prices.get_many(int(transfer['id']) for _, transfer in unpriced)
         except Exception as e:
-            logger.error(f"❌ Ошибка загрузки цен для трансфера {transfer_id}: {e}")
-            return transfer
+            logger.error(f"❌ Ошибка загрузки цен для трансферов: {e}")
+            return transfers
+
+        priced = []
+        for i, transfer in unpriced:
+            price_table = tables.get(int(transfer['id']))
+            if not price_table:
+                # Оставляем None, чтобы было понятно что цен нет
+                logger.warning(f"⚠️ Цены для трансфера {transfer['id']} не найдены в API")
+                continue
+
+            transfers[i] = self._apply_prices(transfer, price_table)
+            priced.append(transfers[i])
+
+        if priced:
+            await self.cache.set_indexed("transfers", priced)
+            logger.info(f"💰 Загружены цены для {len(priced)} трансферов")
+
+        return transfers
+
+    async def preload_prices(self, island: str = None, transfers: Optional[list] = None) -> int:
+        """
+        Проставить цены всем трансферам закэшированного списка острова
+
+        Таблицы цен загружаются пакетно (ограниченная параллельность) и
+        обновляются по stale-while-revalidate. Цены проставляются в актуальную
+        версию списка (cache.update): пока они грузились, список могло
+        обновить SWR - он не затирается прочитанным ранее. TTL сохраняется,
+        карточки показываются сразу с ценами.
+
+        Args:
+            island: код острова или None для всех трансферов
+            transfers: уже загруженный список (по умолчанию - из кэша)
+
+        Returns:
+            количество трансферов с изменившимися ценами
+        """
+        if transfers is None:
+            transfers = await self.get_transfers_by_island(island)
+        if not transfers:
+            return 0
+
+        tables = await self.service_prices.get_many((int(t['id']) for t in transfers), revalidate=True)
+
+        changed = 0
+
+        def apply_prices(current: list) -> Optional[list]:
+            nonlocal changed
+            changed = 0
+            priced = []
+            for transfer in current:
+                price_table = tables.get(int(transfer['id']))
+                if price_table and (not transfer.get('prices_loaded') or PriceTable.from_record(transfer) != price_table):
+                    transfer = self._apply_prices(transfer, price_table)
+                    changed += 1
+                priced.append(transfer)
+            return priced if changed else None
+
+        if not await self.cache.update(self._cache_key(island), apply_prices):
+            return 0
+        logger.info(f"💰 Цены трансферов ({island or 'все'}): обновлено {changed}")
+        return changed
+
+    @staticmethod
+    def _apply_prices(transfer: dict, price_table: PriceTable) -> dict:
+        """Копия трансфера с таблицей цен и базовой ценой (для 1 человека)"""
+        transfer = dict(transfer)
+        transfer.pop('price_list', None)
+        transfer['price_table'] = price_table.to_cache()
+        transfer['price_per_person_usd'] = price_table.get(1, 0)
+        transfer['base_price_usd'] = price_table.get(1, 0)
+        transfer['prices_loaded'] = True
+        return transfer
 
     def get_price_for_people_count(self, transfer: dict, people_count: int) -> float:
         """
@@ -280,27 +358,10 @@ class TransfersLoader:
 
         Returns:
             float: цена за человека для данного количества людей
+            (точный grp, иначе ближайший больший, иначе максимальный)
         """
-        price_list = transfer.get('price_list', {})
-
-        if not price_list:
-            # Если нет списка цен, вернуть базовую цену или 0
+        price = PriceTable.from_record(transfer).price_for(people_count)
+        if price is None:
+            # Если нет таблицы цен, вернуть базовую цену или 0
             return transfer.get('price_per_person_usd') or 0
-
-        # Ищем точное совпадение по количеству людей
-        if people_count in price_list:
-            return price_list[people_count]
-
-        # Если нет точного совпадения, ищем ближайшее большее значение grp
-        # (чем больше группа, тем дешевле цена за человека)
-        available_grps = sorted(price_list.keys())
-
-        for grp in available_grps:
-            if grp >= people_count:
-                return price_list[grp]
-
-        # Если people_count больше всех доступных grp, берём максимальный grp
-        if available_grps:
-            return price_list[max(available_grps)]
-
-        return 0
+        return price
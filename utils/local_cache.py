@@ -0,0 +1,137 @@
+"""Локальный (in-process) L1 кэш перед Redis
+
+Хранит уже декодированные значения для горячих ключей, чтобы не ходить
+в Redis и не делать json.loads больших списков на каждый callback.
+Размер и TTL ограничиваются отдельно для каждого префикса ключа.
+
+ВАЖНО: значения разделяются между всеми пользователями процесса.
+Списки отдаются поверхностной копией, но сами элементы (dict) общие -
+перед изменением записи её нужно скопировать.
+"""
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Маркер промаха (None - допустимое закэшированное значение)
+MISSING = object()
+
+
+class LocalCache:
+    """Ограниченный TTL/LRU кэш в памяти процесса с лимитами по префиксам"""
+
+    def __init__(self, rules: Dict[str, Tuple[int, int]]):
+        """
+        Args:
+            rules: {префикс_ключа: (максимум_записей, ttl_в_секундах)}
+                Ключи без подходящего префикса в L1 не попадают
+        """
+        # Длинные префиксы проверяем первыми ("transfers:cebu" раньше "transfers:")
+        self.rules = dict(sorted(rules.items(), key=lambda item: len(item[0]), reverse=True))
+        self._entries: Dict[str, OrderedDict] = {prefix: OrderedDict() for prefix in self.rules}
+        self._hits: Dict[str, int] = {prefix: 0 for prefix in self.rules}
+        self._misses: Dict[str, int] = {prefix: 0 for prefix in self.rules}
+
+    def match(self, key: str) -> Optional[str]:
+        """Найти префикс-правило для ключа (None - ключ не кэшируется локально)"""
+        for prefix in self.rules:
+            if key.startswith(prefix):
+                return prefix
+        return None
+
+    def get(self, key: str) -> Any:
+        """
+        Получить значение из L1
+
+        Returns:
+            Значение или MISSING если ключа нет / истёк TTL
+        """
+        prefix = self.match(key)
+        if prefix is None:
+            return MISSING
+
+        entries = self._entries[prefix]
+        entry = entries.get(key)
+        if entry is None:
+            self._misses[prefix] += 1
+            return MISSING
+
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del entries[key]
+            self._misses[prefix] += 1
+            return MISSING
+
+        entries.move_to_end(key)
+        self._hits[prefix] += 1
+        logger.debug(f"✓ L1 HIT: {key}")
+        # Поверхностная копия защищает общий список от sort()/присваивания по индексу
+        return list(value) if isinstance(value, list) else value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        """
+        Сохранить значение в L1
+
+        Args:
+            key: ключ
+            value: уже декодированное значение
+            ttl: TTL записи в Redis (секунды) - L1 не живёт дольше него
+        """
+        prefix = self.match(key)
+        if prefix is None:
+            return
+
+        max_size, rule_ttl = self.rules[prefix]
+        local_ttl = rule_ttl if ttl is None else min(rule_ttl, ttl)
+        if local_ttl <= 0:
+            return
+
+        if isinstance(value, list):
+            value = list(value)
+
+        entries = self._entries[prefix]
+        entries[key] = (time.monotonic() + local_ttl, value)
+        entries.move_to_end(key)
+        while len(entries) > max_size:
+            entries.popitem(last=False)
+
+    def delete(self, key: str):
+        """Удалить ключ из L1"""
+        prefix = self.match(key)
+        if prefix is not None:
+            self._entries[prefix].pop(key, None)
+
+    def clear(self):
+        """Очистить L1 полностью"""
+        for entries in self._entries.values():
+            entries.clear()
+
+    def get_stats(self) -> dict:
+        """
+        Статистика L1 по префиксам
+
+        Returns:
+            {'hits': int, 'misses': int, 'hit_rate': float, 'prefixes': {prefix: {...}}}
+        """
+        prefixes = {}
+        for prefix in self.rules:
+            hits = self._hits[prefix]
+            misses = self._misses[prefix]
+            prefixes[prefix] = {
+                'size': len(self._entries[prefix]),
+                'max_size': self.rules[prefix][0],
+                'hits': hits,
+                'misses': misses,
+            }
+
+        total_hits = sum(self._hits.values())
+        total_misses = sum(self._misses.values())
+        total = total_hits + total_misses
+        return {
+            'hits': total_hits,
+            'misses': total_misses,
+            'hit_rate': round((total_hits / total) * 100, 2) if total else 0.0,
+            'prefixes': prefixes,
+        }
@@ -1,5 +1,6 @@
 """Простой менеджер заказов"""
-from utils.helpers import convert_price
+from utils.helpers import convert_prices
+from utils.price_table import PriceTable
 
 
 class OrderManager:
@@ -101,24 +102,8 @@ class OrderManager:
         """Добавить трансфер в заказ"""
         order = state_data.get("order", [])
 
-        # Используем price_list для получения правильной цены
-        price_list = transfer.get("price_list", {})
-        price_per_person = None
-
-        if price_list:
-            # Ищем цену для указанного количества людей
-            if people_count in price_list:
-                price_per_person = price_list[people_count]
-            else:
-                # Ищем ближайшее большее значение grp
-                available_grps = sorted(price_list.keys())
-                for grp in available_grps:
-                    if grp >= people_count:
-                        price_per_person = price_list[grp]
-                        break
-                # Если не нашли, берём максимальный grp
-                if price_per_person is None and available_grps:
-                    price_per_person = price_list[max(available_grps)]
+        # Цена для указанного количества людей из таблицы цен трансфера
+        price_per_person = PriceTable.from_record(transfer).price_for(people_count)
 
         # Fallback на старую логику
         if price_per_person is None:
@@ -159,11 +144,12 @@ class OrderManager:
     def get_total(order: list) -> dict:
         """Получить общую сумму в разных валютах"""
         total_usd = sum(item["price_usd"] for item in order)
+        converted = convert_prices([total_usd])[0]
 
         return {
             "usd": total_usd,
-            "rub": int(convert_price(total_usd, "usd", "rub")),
-            "peso": int(convert_price(total_usd, "usd", "peso"))
+            "rub": int(converted["rub"]),
+            "peso": int(converted["peso"])
         }
 
     @staticmethod
@@ -0,0 +1,75 @@
+"""Фоновая предзагрузка цен трансферов и пакетных туров в закэшированные списки"""
+import asyncio
+import logging
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+class CatalogPricePreloader:
+    """Фоновое обновление цен в списках трансферов и туров"""
+
+    # Как часто проверяются цены (секунды) - заметно чаще TTL таблиц цен,
+    # чтобы устаревшие таблицы обновлялись до истечения
+    REFRESH_INTERVAL = 1800
+
+    def __init__(self, data_loader):
+        """
+        Args:
+            data_loader: DataLoader - загрузчики трансферов и туров
+        """
+        self.data_loader = data_loader
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    async def refresh(self):
+        """Проставить цены во всех списках (острова по очереди - параллельность ограничивает ServicePrices)"""
+        transfers_loader = self.data_loader.transfers_loader
+        for island in [None, *transfers_loader.canonical_islands()]:
+            try:
+                await transfers_loader.preload_prices(island)
+            except Exception as e:
+                logger.error(f"❌ Ошибка предзагрузки цен трансферов ({island or 'все'}): {e}", exc_info=True)
+
+        try:
+            await self.data_loader.packages_loader.preload_prices()
+        except Exception as e:
+            logger.error(f"❌ Ошибка предзагрузки цен туров: {e}", exc_info=True)
+
+    def start(self):
+        """Запустить фоновую предзагрузку (вызывать при старте бота)"""
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self):
+        """Остановить фоновую предзагрузку"""
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except asyncio.CancelledError:
+                pass
+            self._refresh_task = None
+
+    async def _refresh_loop(self):
+        """Периодически обновлять цены"""
+        while True:
+            await self.refresh()
+            await asyncio.sleep(self.REFRESH_INTERVAL)
+
+
+# Глобальный экземпляр
+_price_preloader_instance = None
+
+
+def get_price_preloader() -> CatalogPricePreloader:
+    """Получить экземпляр предзагрузчика цен"""
+    if _price_preloader_instance is None:
+        raise RuntimeError("CatalogPricePreloader не инициализирован! Вызовите init_price_preloader() в bot.py")
+    return _price_preloader_instance
+
+
+def init_price_preloader(data_loader) -> CatalogPricePreloader:
+    """Инициализировать предзагрузчик цен"""
+    global _price_preloader_instance
+    _price_preloader_instance = CatalogPricePreloader(data_loader)
+    return _price_preloader_instance
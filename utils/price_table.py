@@ -0,0 +1,110 @@
+"""Таблица цен по количеству людей (grp)
+
+Цена за человека зависит от размера группы: берётся цена точного grp,
+иначе ближайшего большего (чем больше группа, тем дешевле), иначе
+максимального. Таблица собирается один раз при разборе ценников API,
+хранится в кэше компактным списком [[grp, цена], ...] по возрастанию grp
+и отвечает на запросы бинарным поиском - без сортировки ключей и без
+приведения строковых ключей после JSON на каждый вызов.
+"""
+from bisect import bisect_left
+from typing import Any, Iterable, List, Mapping, Optional, Tuple
+
+
+class PriceTable:
+    """Неизменяемая таблица цен {grp: цена_за_человека}"""
+
+    __slots__ = ("_grps", "_prices")
+
+    def __init__(self, tiers: Iterable[Tuple[int, float]] = ()):
+        """
+        Args:
+            tiers: пары (grp, цена_за_человека) в любом порядке; при
+                повторе grp действует последняя пара
+        """
+        table = dict((int(grp), float(price)) for grp, price in tiers)
+        grps = sorted(table)
+        self._grps: Tuple[int, ...] = tuple(grps)
+        self._prices: Tuple[float, ...] = tuple(table[grp] for grp in grps)
+
+    @classmethod
+    def from_cache(cls, data: Any) -> "PriceTable":
+        """
+        Таблица из кэша: компактный список [[grp, цена], ...] (to_cache) или
+        словарь {grp: цена} из записей, закэшированных до появления таблиц
+        """
+        if not data:
+            return cls()
+        if isinstance(data, Mapping):
+            return cls(data.items())
+
+        table = cls.__new__(cls)
+        # to_cache() пишет пары уже по возрастанию grp - сортировать не нужно
+        table._grps = tuple(int(grp) for grp, _ in data)
+        table._prices = tuple(float(price) for _, price in data)
+        return table
+
+    @classmethod
+    def from_record(cls, record: dict) -> "PriceTable":
+        """Таблица цен записи трансфера/тура (поле price_table или старое price_list)"""
+        return cls.from_cache(record.get('price_table') or record.get('price_list'))
+
+    def to_cache(self) -> List[List]:
+        """Компактное представление для JSON: [[grp, цена], ...] по возрастанию grp"""
+        return [[grp, price] for grp, price in zip(self._grps, self._prices)]
+
+    def price_for(self, people_count: int) -> Optional[float]:
+        """
+        Цена за человека для группы из people_count человек
+
+        Returns:
+            цена точного grp, иначе ближайшего большего, иначе максимального;
+            None если таблица пуста
+        """
+        if not self._grps:
+            return None
+        i = bisect_left(self._grps, people_count)
+        return self._prices[i] if i < len(self._prices) else self._prices[-1]
+
+    def prices_for(self, people_counts: Iterable[int]) -> List[Optional[float]]:
+        """Цены за человека для нескольких размеров группы (например, для страницы карточек)"""
+        return [self.price_for(people_count) for people_count in people_counts]
+
+    def get(self, grp: int, default: Any = None) -> Any:
+        """Цена точно для grp (без подбора ближайшего)"""
+        i = bisect_left(self._grps, grp)
+        if i < len(self._grps) and self._grps[i] == grp:
+            return self._prices[i]
+        return default
+
+    @property
+    def first_price(self) -> Optional[float]:
+        """Цена наименьшего grp"""
+        return self._prices[0] if self._prices else None
+
+    @property
+    def min_price(self) -> Optional[float]:
+        """Минимальная цена за человека"""
+        return min(self._prices) if self._prices else None
+
+    def __len__(self) -> int:
+        return len(self._grps)
+
+    def __bool__(self) -> bool:
+        return bool(self._grps)
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, PriceTable):
+            return NotImplemented
+        return self._grps == other._grps and self._prices == other._prices
+
+    def __hash__(self) -> int:
+        return hash((self._grps, self._prices))
+
+    def __repr__(self) -> str:
+        return f"PriceTable({dict(zip(self._grps, self._prices))})"
+
+
+def prices_for_records(records: Iterable[dict], people_count: int) -> List[Optional[float]]:
+    """Цены за человека для people_count по списку записей (None - цен у записи нет)"""
+    return [PriceTable.from_record(record).price_for(people_count) for record in records]
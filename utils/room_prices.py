@@ -0,0 +1,253 @@
+"""Хранилище расписаний цен номеров
+
+export-hotels-rooms-prices/{room_id}/ отдаёт ценники с периодами действия
+(sdt/edt) и компонентами цены (plst). Вместо кэширования одной цены на
+каждую пару дат расписание номера кэшируется один раз в компактном виде
+(массивы NumPy начала/конца периодов и базовой цены за сутки), а цены для
+любых дат считаются локально: для всех номеров отеля или острова - одним
+векторным проходом по периодам. Смена дат в календаре не требует запросов к API.
+"""
+import asyncio
+import logging
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from services.pelagos_api import PelagosAPI
+from utils.cache_manager import CacheManager
+from utils.local_cache import LocalCache, MISSING
+
+logger = logging.getLogger(__name__)
+
+
+class RoomPriceSchedule:
+    """Расписание базовых цен номера (за объект в сутки), отсортированное по началу периода"""
+
+    __slots__ = ('starts', 'ends', 'prices', 'undated_price', 'min_price')
+
+    def __init__(self, starts: np.ndarray, ends: np.ndarray, prices: np.ndarray, undated_price: Optional[float]):
+        self.starts = starts
+        self.ends = ends
+        self.prices = prices
+        # Ценники без периода (sdt/edt) подходят под любые даты
+        self.undated_price = undated_price
+        # Минимум по всем ценникам - цена без указания дат
+        candidates = ([float(prices.min())] if len(prices) else []) + ([undated_price] if undated_price is not None else [])
+        self.min_price = min(candidates) if candidates else None
+
+    @classmethod
+    def from_api(cls, price_objs: List[dict]) -> 'RoomPriceSchedule':
+        """
+        Собрать расписание из ответа API
+
+        Из plst берётся только базовая цена номера: per=2 (за объект),
+        доп. услуги (питание и т.д.) игнорируются.
+        Список per: https://app.pelagos.ru/json-loadenum/per/
+        """
+        rows = []
+        undated_price = None
+        for price_obj in price_objs:
+            base_prices = [
+                component.get('price')
+                for component in price_obj.get('plst', [])
+                if component.get('per') == 2 and component.get('price') and component.get('price') > 0
+            ]
+            if not base_prices:
+                continue
+
+            price = min(base_prices)
+            sdt = price_obj.get('sdt')
+            edt = price_obj.get('edt')
+            if sdt and edt:
+                rows.append((sdt, edt, price))
+            elif undated_price is None or price < undated_price:
+                undated_price = price
+
+        rows.sort()
+        return cls(
+            np.array([row[0] for row in rows], dtype=np.int64),
+            np.array([row[1] for row in rows], dtype=np.int64),
+            np.array([row[2] for row in rows], dtype=np.float64),
+            undated_price
+        )
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'RoomPriceSchedule':
+        """Восстановить расписание из кэша"""
+        return cls(
+            np.array(data['s'], dtype=np.int64),
+            np.array(data['e'], dtype=np.int64),
+            np.array(data['p'], dtype=np.float64),
+            data.get('u')
+        )
+
+    def to_dict(self) -> dict:
+        """Компактное представление для кэша"""
+        return {
+            's': self.starts.tolist(),
+            'e': self.ends.tolist(),
+            'p': self.prices.tolist(),
+            'u': self.undated_price,
+        }
+
+    def __bool__(self) -> bool:
+        return self.min_price is not None
+
+    def price_for(self, check_in_ts: Optional[int] = None, check_out_ts: Optional[int] = None) -> float:
+        """Минимальная цена за сутки для периода проживания (см. prices_for_many)"""
+        return float(self.prices_for_many([self], check_in_ts, check_out_ts)[0])
+
+    @staticmethod
+    def prices_for_many(
+        schedules: Sequence[Optional['RoomPriceSchedule']],
+        check_in_ts: Optional[int] = None,
+        check_out_ts: Optional[int] = None
+    ) -> np.ndarray:
+        """
+        Минимальные цены за сутки для многих номеров одним векторным проходом
+
+        Периоды всех расписаний склеиваются в общие массивы, пересечение с
+        периодом проживания (check_in <= edt И check_out >= sdt) считается
+        одной маской, минимум по номеру - через np.minimum.at.
+        Без дат - минимум по всем ценникам номера.
+
+        Returns:
+            Массив цен в порядке schedules; 0.0 - подходящих ценников нет
+            (или расписания нет - None)
+        """
+        if check_in_ts is None or check_out_ts is None:
+            return np.array([(s.min_price or 0.0) if s is not None else 0.0 for s in schedules], dtype=np.float64)
+
+        best = np.array(
+            [s.undated_price if s is not None and s.undated_price is not None else np.inf for s in schedules],
+            dtype=np.float64
+        )
+        dated = [(i, s) for i, s in enumerate(schedules) if s is not None and len(s.prices)]
+        if dated:
+            starts = np.concatenate([s.starts for _, s in dated])
+            ends = np.concatenate([s.ends for _, s in dated])
+            prices = np.concatenate([s.prices for _, s in dated])
+            owners = np.repeat(
+                np.array([i for i, _ in dated], dtype=np.intp),
+                [len(s.prices) for _, s in dated]
+            )
+            overlapping = (starts <= check_out_ts) & (ends >= check_in_ts)
+            np.minimum.at(best, owners[overlapping], prices[overlapping])
+
+        best[np.isinf(best)] = 0.0
+        return best
+
+
+class RoomPriceStore:
+    """Кэш расписаний цен номеров (L1 в памяти + Redis) и пакетный расчёт цен"""
+
+    # TTL расписания в Redis (секунды)
+    CACHE_TTL = 3600
+    # Максимум расписаний в памяти процесса
+    LOCAL_MAX_SIZE = 20000
+
+    def __init__(self, api: Optional[PelagosAPI], cache: CacheManager):
+        self.api = api
+        self.cache = cache
+        # Уже разобранные расписания: {str(room_id): RoomPriceSchedule}
+        self.local = LocalCache({"": (self.LOCAL_MAX_SIZE, self.CACHE_TTL)})
+
+    @staticmethod
+    def _cache_key(room_id: int) -> str:
+        return f"room:schedule:{room_id}"
+
+    @staticmethod
+    def _to_timestamp(date_str: Optional[str]) -> Optional[int]:
+        """YYYY-MM-DD → Unix timestamp (локальное время, как в ценниках API)"""
+        if not date_str:
+            return None
+        return int(datetime.strptime(date_str, "%Y-%m-%d").timestamp())
+
+    async def load(self, room_ids: Iterable[int]) -> Dict[int, RoomPriceSchedule]:
+        """
+        Получить расписания номеров: память → Redis (один MGET) → API (параллельно)
+
+        Returns:
+            {room_id: RoomPriceSchedule}; номера, для которых API не ответил, отсутствуют
+        """
+        room_ids = list(dict.fromkeys(int(room_id) for room_id in room_ids))
+        schedules: Dict[int, RoomPriceSchedule] = {}
+
+        missing = []
+        for room_id in room_ids:
+            schedule = self.local.get(str(room_id))
+            if schedule is MISSING:
+                missing.append(room_id)
+            else:
+                schedules[room_id] = schedule
+        if not missing:
+            return schedules
+
+        cached = await self.cache.mget([self._cache_key(room_id) for room_id in missing])
+        to_fetch = []
+        for room_id, data in zip(missing, cached):
+            if data:
+                schedule = RoomPriceSchedule.from_dict(data)
+                self.local.set(str(room_id), schedule)
+                schedules[room_id] = schedule
+            else:
+                to_fetch.append(room_id)
+
+        if to_fetch and self.api:
+            logger.info(f"📡 Загрузка расписаний цен для {len(to_fetch)} номеров")
+            responses = await asyncio.gather(
+                *[self.api.get_room_prices(room_id) for room_id in to_fetch],
+                return_exceptions=True
+            )
+            writes = []
+            for room_id, data in zip(to_fetch, responses):
+                if isinstance(data, Exception):
+                    logger.error(f"⚠️ Ошибка получения цен для номера {room_id}: {data}")
+                    continue
+                schedule = RoomPriceSchedule.from_api(data)
+                schedules[room_id] = schedule
+                # Пустые расписания не кэшируем - возможно, цены появятся позже
+                if schedule:
+                    self.local.set(str(room_id), schedule)
+                    writes.append(self.cache.set(self._cache_key(room_id), schedule.to_dict(), ttl=self.CACHE_TTL))
+            if writes:
+                await asyncio.gather(*writes)
+
+        return schedules
+
+    async def get_prices(
+        self,
+        room_ids: Iterable[int],
+        check_in: str = None,
+        check_out: str = None
+    ) -> Dict[int, float]:
+        """
+        Цены за сутки для набора номеров (отеля или всего острова) одним проходом
+
+        Args:
+            room_ids: ID номеров
+            check_in: дата заезда (YYYY-MM-DD)
+            check_out: дата выезда (YYYY-MM-DD)
+
+        Returns:
+            {room_id: цена}, 0.0 если цен нет
+        """
+        room_ids = [int(room_id) for room_id in room_ids]
+        schedules = await self.load(room_ids)
+
+        check_in_ts = check_out_ts = None
+        if check_in and check_out:
+            check_in_ts = self._to_timestamp(check_in)
+            check_out_ts = self._to_timestamp(check_out)
+
+        # Все номера одним векторным проходом по периодам
+        values = RoomPriceSchedule.prices_for_many(
+            [schedules.get(room_id) for room_id in room_ids], check_in_ts, check_out_ts
+        )
+        return {room_id: float(price) for room_id, price in zip(room_ids, values)}
+
+    async def get_price(self, room_id: int, check_in: str = None, check_out: str = None) -> float:
+        """Цена за сутки для одного номера"""
+        prices = await self.get_prices([room_id], check_in, check_out)
+        return prices[int(room_id)]
@@ -0,0 +1,249 @@
+"""Резидентный поисковый индекс по отелям, экскурсиям, трансферам и турам
+
+Раньше каждый поисковый запрос заново скачивал каталог из API (отели пяти
+локаций подряд, все трансферы, все индивидуальные экскурсии). Индекс
+держит документы всех сущностей в памяти процесса и обновляет их в фоне
+из кэшированных загрузчиков. Для каждой сущности заранее готовится
+FuzzyMatcher, поэтому запрос - это один пакетный подсчёт оценок.
+"""
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from utils.helpers import get_island_name_ru
+from utils.loaders.excursions.constants import CACHE_TTL_PRIVATE
+from utils.local_cache import LocalCache, MISSING
+from utils.search_utils import FuzzyMatcher, normalize_text
+
+logger = logging.getLogger(__name__)
+
+
+class SearchIndex:
+    """Поисковый индекс по всем сущностям с фоновым обновлением"""
+
+    # Сущности индекса
+    ENTITIES = ("hotels", "private", "group", "companions", "transfers", "packages")
+    # Локации, по которым ищутся отели
+    HOTEL_LOCATIONS = ("cebu", "boracay", "bohol", "palawan", "manila-luson")
+    # Как часто индекс пересобирается в фоне (секунды)
+    REFRESH_INTERVAL = 600
+    # Кэш результатов популярных запросов: максимум записей и TTL (секунды)
+    RESULT_CACHE_SIZE = 2000
+    RESULT_CACHE_TTL = 600
+
+    def __init__(self, data_loader):
+        """
+        Args:
+            data_loader: DataLoader - источник данных (кэшированные загрузчики)
+        """
+        self.data_loader = data_loader
+        self._items: Dict[str, List[Any]] = {entity: [] for entity in self.ENTITIES}
+        # Подготовленные матчеры (нормализованные тексты) - пересоздаются вместе с документами
+        self._matchers: Dict[str, FuzzyMatcher] = {entity: FuzzyMatcher([]) for entity in self.ENTITIES}
+        self._built_at: Dict[str, float] = {}
+        # Увеличивается при каждой пересборке любой сущности
+        self.version = 0
+        # Версия документов каждой сущности - часть ключа кэша результатов
+        self._entity_versions: Dict[str, int] = {entity: 0 for entity in self.ENTITIES}
+        # Ранжированные результаты: {entity:версия:limit:threshold:запрос: [(позиция, score)]}
+        self.results = LocalCache({"": (self.RESULT_CACHE_SIZE, self.RESULT_CACHE_TTL)})
+        # Сборки сущностей (одна на сущность): {entity: Task}
+        self._build_tasks: Dict[str, asyncio.Task] = {}
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._builders: Dict[str, Callable[[], Awaitable[List[Any]]]] = {
+            "hotels": self._build_hotels,
+            "private": self._build_private,
+            "group": lambda: self._build_group("group"),
+            "companions": lambda: self._build_group("companions"),
+            "transfers": self._build_transfers,
+            "packages": self._build_packages,
+        }
+
+    async def search(
+        self,
+        entity: str,
+        query: str,
+        limit: int = 10,
+        threshold: int = 60
+    ) -> List[Tuple[Any, float]]:
+        """
+        Найти документы сущности
+
+        Args:
+            entity: одна из ENTITIES
+            query: поисковый запрос
+            limit: максимальное количество результатов
+            threshold: минимальный процент совпадения для нечеткого поиска
+
+        Returns:
+            список кортежей (документ, процент_совпадения); словари - копии,
+            их можно менять без влияния на индекс
+        """
+        await self.ensure(entity)
+        items = self._items[entity]
+
+        # Повторные запросы (в т.ч. с другим регистром/пунктуацией) - без подсчёта оценок;
+        # после пересборки сущности версия в ключе меняется и старые записи не используются
+        cache_key = f"{entity}:{self._entity_versions[entity]}:{limit}:{threshold}:{normalize_text(query)}"
+        ranked = self.results.get(cache_key)
+        if ranked is MISSING:
+            ranked = self._matchers[entity].search_indices(query, limit=limit, threshold=threshold)
+            self.results.set(cache_key, ranked)
+
+        return [
+            (dict(items[position]) if isinstance(items[position], dict) else items[position], score)
+            for position, score in ranked
+        ]
+
+    def is_built(self, entity: str) -> bool:
+        """Сущность уже в индексе (поиск по ней не вызовет загрузку)"""
+        return entity in self._built_at
+
+    def get_items(self, entity: str) -> List[Any]:
+        """Документы сущности (только чтение)"""
+        return self._items[entity]
+
+    async def ensure(self, entity: str):
+        """Собрать сущность, если она ещё не в индексе (одновременные вызовы объединяются)"""
+        if entity in self._built_at:
+            return
+
+        task = self._build_tasks.get(entity)
+        if task is None:
+            task = asyncio.ensure_future(self.refresh_entity(entity))
+            self._build_tasks[entity] = task
+            task.add_done_callback(lambda _: self._build_tasks.pop(entity, None))
+        await asyncio.shield(task)
+
+    async def refresh_entity(self, entity: str):
+        """Пересобрать документы сущности (при ошибке остаются предыдущие)"""
+        started = time.monotonic()
+        try:
+            items = await self._builders[entity]()
+        except Exception as e:
+            logger.error(f"❌ Ошибка обновления поискового индекса ({entity}): {e}", exc_info=True)
+            return
+
+        # Пустой результат при уже собранном индексе - скорее сбой API, оставляем старые данные
+        if not items and self._items[entity]:
+            logger.warning(f"⚠️ Поисковый индекс ({entity}): пустой результат, оставляем {len(self._items[entity])} документов")
+            return
+
+        # Триграммные индексы больших списков строятся заметное время - не блокируем event loop
+        self._matchers[entity] = await asyncio.to_thread(FuzzyMatcher, items)
+        self._items[entity] = items
+        self._built_at[entity] = time.monotonic()
+        self._entity_versions[entity] += 1
+        self.version += 1
+        logger.info(f"🔎 Поисковый индекс ({entity}): {len(items)} документов за {time.monotonic() - started:.2f}s")
+
+    async def refresh(self):
+        """Пересобрать все сущности"""
+        await asyncio.gather(*[self.refresh_entity(entity) for entity in self.ENTITIES])
+
+    def start(self):
+        """Запустить фоновое обновление индекса (вызывать при старте бота)"""
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self):
+        """Остановить фоновое обновление"""
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except asyncio.CancelledError:
+                pass
+            self._refresh_task = None
+
+    async def _refresh_loop(self):
+        """Периодически пересобирать индекс"""
+        while True:
+            await self.refresh()
+            await asyncio.sleep(self.REFRESH_INTERVAL)
+
+    def get_stats(self) -> dict:
+        """Статистика индекса"""
+        return {
+            'version': self.version,
+            'entities': {entity: len(items) for entity, items in self._items.items()},
+            'results_cache': self.results.get_stats(),
+        }
+
+    # ========== Источники документов ==========
+
+    async def _build_hotels(self) -> List[dict]:
+        """Отели локаций поиска из каталога отелей"""
+        catalog = self.data_loader.hotels_loader.catalog
+        await asyncio.gather(*[catalog.ensure_location(location) for location in self.HOTEL_LOCATIONS])
+
+        hotels = []
+        for location in self.HOTEL_LOCATIONS:
+            for entry in catalog.hotels_in(location):
+                pics = entry.get('pics') or []
+                hotel_dict = {
+                    'id': str(entry['id']),
+                    'name': entry.get('name', ''),
+                    'stars': entry.get('stars') or 0,
+                    'address': entry.get('address') or '',
+                    'location': entry.get('location') or 0,
+                    'location_code': location,
+                    'island_name': get_island_name_ru(location),
+                    'room_type': 'Все типы номеров',  # Для поиска показываем общий текст
+                    'photo': None,
+                    'pics': pics
+                }
+
+                # URL первого фото если есть
+                if pics and isinstance(pics[0], dict):
+                    md5 = pics[0].get('md5', '')
+                    filename = pics[0].get('filename', '')
+                    if md5 and filename:
+                        hotel_dict['photo'] = f"https://app.pelagos.ru/pic/{md5}/{filename}"
+
+                hotels.append(hotel_dict)
+        return hotels
+
+    async def _build_private(self) -> List[dict]:
+        """Индивидуальные экскурсии всех островов (сырые услуги API)"""
+        api = self.data_loader.excursions_loader.api
+        cache = self.data_loader.excursions_loader.cache
+
+        async def load():
+            tomorrow = datetime.now() + timedelta(days=1)
+            # location_id=0 означает ВСЕ острова (включая Манилу, Корон, Минданао и др.)
+            return await api.get_private_excursions(location_id=0, date=tomorrow.strftime("%d.%m.%Y"))
+
+        return await cache.get_or_load("search:private_services", load, ttl=CACHE_TTL_PRIVATE)
+
+    async def _build_group(self, excursion_type: str) -> List[dict]:
+        """Групповые экскурсии / попутчики всех островов"""
+        return await self.data_loader.get_excursions_by_filters(island=None, excursion_type=excursion_type)
+
+    async def _build_transfers(self) -> List[dict]:
+        """Все трансферы"""
+        return await self.data_loader.get_transfers_by_island(None)
+
+    async def _build_packages(self) -> List[dict]:
+        """Все пакетные туры"""
+        return await self.data_loader.get_all_packages()
+
+
+# Глобальный экземпляр
+_search_index_instance = None
+
+
+def get_search_index() -> SearchIndex:
+    """Получить экземпляр поискового индекса"""
+    if _search_index_instance is None:
+        raise RuntimeError("SearchIndex не инициализирован! Вызовите init_search_index() в bot.py")
+    return _search_index_instance
+
+
+def init_search_index(data_loader) -> SearchIndex:
+    """Инициализировать поисковый индекс"""
+    global _search_index_instance
+    _search_index_instance = SearchIndex(data_loader)
+    return _search_index_instance
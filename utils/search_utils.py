@@ -1,6 +1,11 @@
 """Утилиты для поиска с нечетким сопоставлением"""
-from typing import List, Tuple, Any
+from collections import OrderedDict
+from functools import lru_cache
+from typing import List, Tuple, Any, Callable, Dict, FrozenSet, Iterable, Optional, Sequence, Set
+
+import numpy as np
 from rapidfuzz import fuzz, process
+from rapidfuzz.utils import default_process
 
 # Словарь синонимов для улучшения поиска
 SYNONYMS = {
@@ -24,21 +29,108 @@ SYNONYMS = {
     "вулкан": ["volcano", "volcanic"],
 }
 
-def expand_query(query: str) -> str:
-    """Расширяет запрос синонимами для лучшего поиска"""
-    query_lower = query.lower()
-    expanded_terms = [query]
+# Транслитерация кириллицы в латиницу (как обычно пишут названия отелей и мест)
+TRANSLIT = {
+    "а": "a", "б": "b", "в": "v", "г": "g", "д": "d", "е": "e", "ё": "e", "ж": "zh",
+    "з": "z", "и": "i", "й": "y", "к": "k", "л": "l", "м": "m", "н": "n", "о": "o",
+    "п": "p", "р": "r", "с": "s", "т": "t", "у": "u", "ф": "f", "х": "h", "ц": "ts",
+    "ч": "ch", "ш": "sh", "щ": "sch", "ъ": "", "ы": "y", "ь": "", "э": "e", "ю": "yu",
+    "я": "ya",
+}
+_TRANSLIT_TABLE = str.maketrans(TRANSLIT)
+
+
+def normalize_text(text: str) -> str:
+    """Нижний регистр, без пунктуации, кириллица → латиница ("Шангри-Ла" → "shangri la")"""
+    return default_process(text).translate(_TRANSLIT_TABLE)
+
 
-    # Добавляем синонимы
+def _build_synonym_terms() -> Dict[str, List[str]]:
+    """{нормализованный термин: [канонические ключи групп SYNONYMS, где он встречается]}"""
+    terms: Dict[str, List[str]] = {}
     for word, synonyms in SYNONYMS.items():
-        if word in query_lower:
-            expanded_terms.extend(synonyms)
-        # Обратная проверка
-        for synonym in synonyms:
-            if synonym.lower() in query_lower and word not in expanded_terms:
-                expanded_terms.append(word)
+        canonical = normalize_text(word)
+        for term in (word, *synonyms):
+            groups = terms.setdefault(normalize_text(term), [])
+            if canonical not in groups:
+                groups.append(canonical)
+    return terms
+
+
+_SYNONYM_TERMS = _build_synonym_terms()
+# Первые слова составных терминов ("whale" для "whale shark")
+_PHRASE_HEADS = {term.split()[0] for term in _SYNONYM_TERMS if " " in term}
+# Термин не короче MIN_STEM_LENGTH совпадает и со словоформами: слово может
+# продолжать его не больше чем на MAX_STEM_SUFFIX букв ("snorkel" → "snorkeling",
+# "beach" → "beaches"). Короткие термины совпадают только целым словом -
+# "sea" не метит "season", "more" (море) не метит "moreno"
+MIN_STEM_LENGTH = 5
+MAX_STEM_SUFFIX = 3
+
+
+def _term_lengths(length: int, min_length: int = 1) -> range:
+    """Длины начала слова длины length, которые могут быть термином или его основой"""
+    return range(max(min_length, length - MAX_STEM_SUFFIX, MIN_STEM_LENGTH), length)
+
+
+@lru_cache(maxsize=65536)
+def _word_synonyms(word: str) -> Tuple[str, ...]:
+    """Канонические ключи групп, термин которых - слово целиком или его основа"""
+    canonicals = list(_SYNONYM_TERMS.get(word, ()))
+    for n in _term_lengths(len(word)):
+        for canonical in _SYNONYM_TERMS.get(word[:n], ()):
+            if canonical not in canonicals:
+                canonicals.append(canonical)
+    return tuple(canonicals)
+
+
+def search_key(text: str) -> str:
+    """
+    Поисковый ключ объекта (строится один раз при индексации)
 
-    return " ".join(expanded_terms)
+    Нормализованный текст + канонические ключи групп синонимов, термины
+    которых встречаются в тексте словом или основой слова (см. MIN_STEM_LENGTH):
+    "Beach Resort" → "beach resort plyazh". Запрос приводится к тем же ключам в normalize_query.
+    """
+    normalized = normalize_text(text)
+    words = normalized.split()
+    tokens = set(words)
+    tags = []
+    for i, word in enumerate(words):
+        canonicals = list(_word_synonyms(word))
+        # Составные термины ("whale shark", "boracay island")
+        if word in _PHRASE_HEADS and i + 1 < len(words):
+            phrase = f"{word} {words[i + 1]}"
+            canonicals.extend(_SYNONYM_TERMS.get(phrase, ()))
+            for n in _term_lengths(len(phrase), len(word) + 2):
+                canonicals.extend(_SYNONYM_TERMS.get(phrase[:n], ()))
+        for canonical in canonicals:
+            if canonical not in tokens:
+                tokens.add(canonical)
+                tags.append(canonical)
+    return " ".join([normalized, *tags]) if tags else normalized
+
+
+def normalize_query(normalized: str) -> str:
+    """
+    Привести нормализованный запрос (normalize_text) к ключам search_key:
+    слова и пары слов из SYNONYMS заменяются каноническим ключом группы
+
+    Один проход по словам запроса со словарным поиском - без перебора SYNONYMS.
+    """
+    tokens = normalized.split()
+    result = []
+    i = 0
+    while i < len(tokens):
+        pair = " ".join(tokens[i:i + 2])
+        if i + 1 < len(tokens) and pair in _SYNONYM_TERMS:
+            result.append(_SYNONYM_TERMS[pair][0])
+            i += 2
+            continue
+        groups = _SYNONYM_TERMS.get(tokens[i])
+        result.append(groups[0] if groups else tokens[i])
+        i += 1
+    return " ".join(result)
 
 
 def fuzzy_search(
@@ -136,52 +228,11 @@ def simple_search(
     return results
 
 
-def multi_field_search(
-    query: str,
-    items: List[Any],
-    fields: List[str] = None,
-    limit: int = 10,
-    threshold: int = 60
-) -> List[Tuple[Any, float]]:
-    """
-    Поиск по нескольким полям с весами
-
-    Args:
-        query: поисковый запрос
-        items: список объектов для поиска
-        fields: список полей для поиска (по умолчанию ["name", "description"])
-        limit: максимальное количество результатов
-        threshold: минимальный процент совпадения
-
-    Returns:
-        список кортежей (объект, процент_совпадения)
-    """
-    if fields is None:
-        fields = ["name", "description"]
-
-    if not query or not items:
-        return []
-
-    # Расширяем запрос синонимами
-    expanded_query = expand_query(query)
-
-    # Создаем словарь результатов: item_id -> (item, max_score)
-    results_dict = {}
-
-    # Ищем по каждому полю
-    for field in fields:
-        field_results = fuzzy_search(expanded_query, items, field, limit=limit * 2, threshold=threshold - 10)
-
-        for item, score in field_results:
-            item_id = id(item)
-            # Берем максимальный score среди всех полей
-            if item_id not in results_dict or score > results_dict[item_id][1]:
-                results_dict[item_id] = (item, score)
-
-    # Сортируем по релевантности
-    sorted_results = sorted(results_dict.values(), key=lambda x: x[1], reverse=True)
-
-    return sorted_results[:limit]
+# Матчеры hybrid_search: {(id списка, длина, поле, версия): (список, FuzzyMatcher)}
+# Список хранится вместе с матчером - пока запись жива, его id не достанется другому объекту
+_hybrid_matchers: "OrderedDict[tuple, Tuple[List[Any], FuzzyMatcher]]" = OrderedDict()
+# Сколько последних списков держать подготовленными
+HYBRID_MATCHERS_MAX = 8
 
 
 def hybrid_search(
@@ -189,63 +240,321 @@ def hybrid_search(
     items: List[Any],
     field_name: str = "name",
     limit: int = 10,
-    threshold: int = 60
+    threshold: int = 60,
+    version: Any = None
 ) -> List[Tuple[Any, float]]:
     """
     Умный гибридный поиск с синонимами и несколькими полями
 
+    FuzzyMatcher строится при первом запросе по списку и переиспользуется
+    для следующих запросов по тому же списку (последние HYBRID_MATCHERS_MAX).
+
     Args:
         query: поисковый запрос
         items: список объектов для поиска
         field_name: основное имя поля для поиска
         limit: максимальное количество результатов
         threshold: минимальный процент совпадения для нечеткого поиска
+        version: версия данных - менять, если список изменён на месте
 
     Returns:
         список кортежей (объект, процент_совпадения)
     """
-    # Расширяем запрос синонимами
-    expanded_query = expand_query(query)
-
-    # Сначала пробуем простой поиск с оригинальным запросом
-    simple_results = simple_search(query, items, field_name)
-
-    # Если нашли точные совпадения, добавляем их с максимальным score
-    seen_ids = set()
-    combined = []
-
-    for item in simple_results[:limit]:
-        item_id = id(item)
-        seen_ids.add(item_id)
-        combined.append((item, 100.0))
-
-    # Если нашли достаточно, возвращаем
-    if len(combined) >= limit:
-        return combined
-
-    # Ищем по основному полю с расширенным запросом
-    fuzzy_results = fuzzy_search(expanded_query, items, field_name, limit * 2, threshold)
-
-    # Добавляем результаты нечеткого поиска
-    for item, score in fuzzy_results:
-        item_id = id(item)
-        if item_id not in seen_ids:
-            seen_ids.add(item_id)
-            combined.append((item, score))
-
-    # Если все еще мало результатов, попробуем поиск по описанию
-    if len(combined) < limit and any(
-        isinstance(item, dict) and 'description' in item or hasattr(item, 'description')
-        for item in items[:1] if items
+    key = (id(items), len(items), field_name, version)
+    cached = _hybrid_matchers.get(key)
+    if cached is not None and cached[0] is items:
+        _hybrid_matchers.move_to_end(key)
+        matcher = cached[1]
+    else:
+        matcher = FuzzyMatcher(items, field_name)
+        _hybrid_matchers[key] = (items, matcher)
+        if len(_hybrid_matchers) > HYBRID_MATCHERS_MAX:
+            _hybrid_matchers.popitem(last=False)
+    return matcher.search(query, limit=limit, threshold=threshold)
+
+
+def _field_text(item: Any, field_name: str) -> str:
+    """Значение поля как строка (поддерживаем как dict, так и объекты с атрибутами)"""
+    if isinstance(item, dict):
+        value = item.get(field_name, "")
+    else:
+        value = getattr(item, field_name, "")
+    return str(value) if value else ""
+
+
+def _substring_trigrams(text: str) -> Set[str]:
+    """Все триграммы строки как есть (для поиска по вхождению подстроки)"""
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+@lru_cache(maxsize=65536)
+def _word_trigrams(token: str) -> FrozenSet[str]:
+    """Триграммы слова с пробелами по краям (" пл", "пля", ..., "яж ")"""
+    padded = f" {token} "
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+def _token_trigrams(text: str) -> Set[str]:
+    """Триграммы всех слов текста - для нечеткого поиска"""
+    grams = set()
+    for token in text.split():
+        grams |= _word_trigrams(token)
+    return grams
+
+
+def _build_postings(texts: Sequence[str], trigrams: Callable[[str], Set[str]]) -> Dict[str, np.ndarray]:
+    """Инвертированный индекс: {триграмма: отсортированный массив индексов текстов}"""
+    postings: Dict[str, List[int]] = {}
+    for index, text in enumerate(texts):
+        for gram in trigrams(text):
+            posting = postings.get(gram)
+            if posting is None:
+                postings[gram] = [index]
+            else:
+                posting.append(index)
+    return {gram: np.array(indices, dtype=np.int32) for gram, indices in postings.items()}
+
+
+class FuzzyMatcher:
+    """
+    Гибридный поиск по заранее подготовленному списку объектов
+
+    Поисковые ключи полей (search_key: нормализация, транслитерация кириллицы,
+    ключи синонимов) строятся один раз при создании; запрос нормализуется
+    одним шагом (normalize_text + normalize_query). Ключи всех полей
+    оцениваются одним пакетным вызовом rapidfuzz.process.cdist
+    (многопоточно, без Python-цикла по объектам и полям).
+
+    Для больших списков при создании строятся триграммные инвертированные индексы:
+    поиск подстроки проверяет только объекты, содержащие все триграммы запроса,
+    а нечеткая оценка - только объекты с общими триграммами (не больше
+    MAX_CANDIDATES лучших по числу совпадений). Время запроса перестаёт
+    расти линейно с размером каталога.
+
+    Создавать один раз на версию данных (см. SearchIndex), а не на каждый запрос.
+    """
+
+    # С какого размера списка строить триграммные индексы (на малых полный перебор быстрее)
+    PREFILTER_MIN_ITEMS = 1000
+    # Максимум кандидатов на нечеткую оценку по одному полю
+    MAX_CANDIDATES = 5000
+
+    def __init__(
+        self,
+        items: Sequence[Any],
+        field_name: str = "name",
+        extra_fields: Sequence[str] = ("description",),
+        prefilter: bool = True
     ):
-        desc_results = fuzzy_search(expanded_query, items, "description", limit * 2, threshold - 10)
-        for item, score in desc_results:
-            item_id = id(item)
-            if item_id not in seen_ids:
-                seen_ids.add(item_id)
-                # Понижаем score для совпадений по описанию
-                combined.append((item, score * 0.8))
-
-    # Сортируем по релевантности и ограничиваем
-    combined.sort(key=lambda x: x[1], reverse=True)
-    return combined[:limit]
+        """
+        Args:
+            items: объекты для поиска
+            field_name: основное поле
+            extra_fields: дополнительные поля (совпадения по ним с пониженным score)
+            prefilter: строить триграммные индексы (не нужно для одноразового поиска)
+        """
+        self.items = list(items)
+        self.field_name = field_name
+        # Дополнительные поля берём, только если они вообще есть у объектов
+        self.fields = [field_name] + [
+            field for field in extra_fields
+            if any(_field_text(item, field) for item in self.items)
+        ]
+
+        raw_names = [_field_text(item, field_name) for item in self.items]
+        # Для поиска по вхождению подстроки (нормализованные имена без синонимов)
+        self._names_normalized = [normalize_text(name) for name in raw_names]
+        # Поисковые ключи по полям: {поле: [ключ × N]}; дополнительные поля -
+        # при первом запросе (или сразу, если строятся триграммные индексы)
+        self._choices = {field_name: [search_key(name) for name in raw_names]}
+
+        # Триграммные индексы: по именам для подстроки, по полям для нечеткого поиска
+        self._substring_postings: Optional[Dict[str, np.ndarray]] = None
+        self._field_postings: Dict[str, Dict[str, np.ndarray]] = {}
+        if prefilter and len(self.items) >= self.PREFILTER_MIN_ITEMS:
+            self._substring_postings = _build_postings(self._names_normalized, _substring_trigrams)
+            for field in self.fields:
+                self._field_postings[field] = _build_postings(self._field_choices(field), _token_trigrams)
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def _field_choices(self, field: str) -> List[str]:
+        """Поисковые ключи поля (строятся при первом обращении)"""
+        choices = self._choices.get(field)
+        if choices is None:
+            choices = [search_key(_field_text(item, field)) for item in self.items]
+            self._choices[field] = choices
+        return choices
+
+    def _substring_candidates(self, normalized: str) -> Iterable[int]:
+        """Индексы объектов, в имени которых может быть подстрока запроса (по возрастанию)"""
+        if self._substring_postings is None or len(normalized) < 3:
+            return range(len(self.items))
+
+        # Пересекаем списки, начиная с самого короткого
+        postings = []
+        for gram in _substring_trigrams(normalized):
+            posting = self._substring_postings.get(gram)
+            if posting is None:
+                return []
+            postings.append(posting)
+        postings.sort(key=len)
+
+        candidates = postings[0]
+        for posting in postings[1:]:
+            candidates = np.intersect1d(candidates, posting, assume_unique=True)
+            if not len(candidates):
+                break
+        return candidates.tolist()
+
+    def _fuzzy_candidates(self, query_key: str, field: str) -> Optional[np.ndarray]:
+        """
+        Индексы объектов с общими триграммами запроса в поле
+
+        Returns:
+            массив индексов или None, если индекса нет (оценивать все объекты)
+        """
+        postings = self._field_postings.get(field)
+        if postings is None:
+            return None
+
+        hits = [postings[gram] for gram in _token_trigrams(query_key) if gram in postings]
+        if not hits:
+            return np.empty(0, dtype=np.int32)
+
+        # Сколько общих триграмм у каждого объекта с запросом
+        counts = np.bincount(np.concatenate(hits), minlength=len(self.items))
+        candidates = counts.nonzero()[0]
+        if len(candidates) > self.MAX_CANDIDATES:
+            # Больше общих триграмм - выше; при равенстве - раньше в списке (как при полном переборе)
+            best = np.argsort(-counts[candidates], kind="stable")[:self.MAX_CANDIDATES]
+            candidates = np.sort(candidates[best])
+        return candidates
+
+    def score_fields(self, query_key: str, workers: int = -1) -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
+        """
+        Оценки token_set_ratio запроса по всем полям (только кандидаты префильтра)
+
+        Ключи кандидатов всех полей складываются в один массив и оцениваются
+        одним вызовом cdist, затем результат делится обратно по полям.
+
+        Args:
+            query_key: запрос, приведённый normalize_text + normalize_query
+
+        Returns:
+            {поле: (индексы объектов, оценки)} - numpy-массивы одной длины
+        """
+        spans = []
+        choices = []
+        for field in self.fields:
+            field_choices = self._field_choices(field)
+            candidates = self._fuzzy_candidates(query_key, field)
+            if candidates is None:
+                candidates = np.arange(len(field_choices))
+                choices.extend(field_choices)
+            else:
+                choices.extend(field_choices[index] for index in candidates.tolist())
+            spans.append((field, candidates))
+
+        if choices:
+            scores = process.cdist(
+                [query_key],
+                choices,
+                scorer=fuzz.token_set_ratio,
+                processor=None,
+                workers=workers
+            )[0]
+        else:
+            scores = np.empty(0, dtype=np.float32)
+
+        result = {}
+        offset = 0
+        for field, candidates in spans:
+            result[field] = (candidates, scores[offset:offset + len(candidates)])
+            offset += len(candidates)
+        return result
+
+    def search(
+        self,
+        query: str,
+        limit: int = 10,
+        threshold: int = 60,
+        workers: int = -1
+    ) -> List[Tuple[Any, float]]:
+        """
+        Гибридный поиск: вхождение подстроки (100), затем нечеткий по основному
+        полю с синонимами, затем по дополнительным полям (score * 0.8)
+
+        Returns:
+            список кортежей (объект, процент_совпадения)
+        """
+        return [
+            (self.items[index], score)
+            for index, score in self.search_indices(query, limit=limit, threshold=threshold, workers=workers)
+        ]
+
+    def search_indices(
+        self,
+        query: str,
+        limit: int = 10,
+        threshold: int = 60,
+        workers: int = -1
+    ) -> List[Tuple[int, float]]:
+        """
+        То же, что search, но с позициями объектов в items вместо самих объектов
+
+        Returns:
+            список кортежей (позиция, процент_совпадения)
+        """
+        if not query or not self.items:
+            return []
+        normalized = normalize_text(query)
+        if not normalized:
+            return []
+
+        combined = []
+        seen = set()
+
+        # Точные совпадения по вхождению запроса (в т.ч. кириллицей по латинскому названию)
+        for index in self._substring_candidates(normalized):
+            if normalized in self._names_normalized[index]:
+                seen.add(index)
+                combined.append((index, 100.0))
+                if len(combined) >= limit:
+                    return combined
+
+        query_key = normalize_query(normalized)
+        field_scores = self.score_fields(query_key, workers=workers)
+
+        # Нечеткие совпадения по основному полю
+        indices, scores = field_scores[self.field_name]
+        for position in self._top(scores, threshold, limit * 2):
+            index = int(indices[position])
+            if index not in seen:
+                seen.add(index)
+                combined.append((index, float(scores[position])))
+
+        # Если все еще мало результатов - по дополнительным полям с пониженным score
+        for field in self.fields[1:]:
+            if len(combined) >= limit:
+                break
+            indices, scores = field_scores[field]
+            for position in self._top(scores, threshold - 10, limit * 2):
+                index = int(indices[position])
+                if index not in seen:
+                    seen.add(index)
+                    combined.append((index, float(scores[position]) * 0.8))
+
+        combined.sort(key=lambda x: x[1], reverse=True)
+        return combined[:limit]
+
+    @staticmethod
+    def _top(row, threshold: float, count: int) -> List[int]:
+        """Индексы count лучших оценок не ниже порога (по убыванию)"""
+        candidates = (row >= threshold).nonzero()[0]
+        if len(candidates) > count:
+            # Частичная сортировка: берём count лучших без полной сортировки
+            best = row[candidates].argpartition(-count)[-count:]
+            candidates = candidates[best]
+        return sorted(candidates.tolist(), key=lambda index: (-row[index], index))
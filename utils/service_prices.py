@@ -0,0 +1,141 @@
+"""Общий кэш цен услуг (export-services-prices)
+
+Цены ежедневных экскурсий, трансферов и пакетных туров берутся из одного
+endpoint'а. Раньше каждый загрузчик запрашивал его сам и без кэша - на
+каждый экран заново. Здесь ценники разбираются один раз в PriceTable
+и хранятся в Redis (service:prices:{id}), общем для всех загрузчиков
+и процессов.
+"""
+import asyncio
+import logging
+from typing import Dict, Iterable, List, Optional
+
+from services.pelagos_api import PelagosAPI
+from utils.cache_manager import CacheManager, Uncached
+from utils.price_table import PriceTable
+
+logger = logging.getLogger(__name__)
+
+
+class ServicePrices:
+    """Кэш таблиц цен услуг с пакетной загрузкой"""
+
+    # TTL таблицы цен (3 часа, как у списков трансферов и туров)
+    CACHE_TTL = 10800
+    # Сколько ещё после CACHE_TTL отдаётся устаревшая таблица (пока обновляется в фоне)
+    CACHE_STALE_TTL = 3600
+    # Сколько запросов цен к API выполняется одновременно
+    CONCURRENCY = 8
+
+    def __init__(self, api: Optional[PelagosAPI], cache: CacheManager):
+        self.api = api
+        self.cache = cache
+
+    @staticmethod
+    def parse_price_table(prices: List[dict]) -> PriceTable:
+        """
+        Собрать таблицу цен из ценников API
+
+        Args:
+            prices: ценники [{plst: [{grp: 1, price: 50}, {grp: 2, price: 25}, ...]}, ...]
+
+        Returns:
+            PriceTable; более поздние ценники перезаписывают цены более ранних
+        """
+        return PriceTable(
+            (item['grp'], item['price'])
+            for price_entry in prices
+            for item in price_entry.get('plst', [])
+            if item.get('grp') and item.get('price') is not None
+        )
+
+    async def get(self, service_id: int) -> PriceTable:
+        """
+        Таблица цен услуги
+
+        Returns:
+            PriceTable (пустая, если цен нет)
+        """
+        return (await self.get_many([service_id])).get(int(service_id), PriceTable())
+
+    async def get_many(
+        self,
+        service_ids: Iterable[int],
+        load_missing: bool = True,
+        revalidate: bool = False
+    ) -> Dict[int, PriceTable]:
+        """
+        Таблицы цен нескольких услуг
+
+        Закэшированные читаются одним MGET, недостающие загружаются параллельно
+        (не больше CONCURRENCY запросов одновременно).
+
+        Args:
+            service_ids: ID услуг
+            load_missing: загружать отсутствующие в кэше (False - только кэш)
+            revalidate: проверять свежесть каждой таблицы (stale-while-revalidate:
+                устаревшие отдаются сразу и обновляются в фоне) - для фоновой
+                предзагрузки; MGET устаревание не замечает
+
+        Returns:
+            {service_id: PriceTable} (без ID, цен которых нет в кэше, если load_missing=False)
+        """
+        ids = list(dict.fromkeys(int(service_id) for service_id in service_ids))
+        if not ids:
+            return {}
+
+        tables = {}
+        if not revalidate:
+            cached = await self.cache.mget([self._key(service_id) for service_id in ids])
+            tables = {
+                service_id: self._decode(record)
+                for service_id, record in zip(ids, cached) if record
+            }
+
+        missing = [service_id for service_id in ids if service_id not in tables]
+        if missing and load_missing and self.api:
+            semaphore = asyncio.Semaphore(self.CONCURRENCY)
+
+            async def fetch(service_id: int):
+                async with semaphore:
+                    record = await self.cache.get_or_load(
+                        self._key(service_id),
+                        lambda: self._load(service_id),
+                        ttl=self.CACHE_TTL,
+                        stale_ttl=self.CACHE_STALE_TTL
+                    )
+                    return service_id, self._decode(record)
+
+            tables.update(await asyncio.gather(*[fetch(service_id) for service_id in missing]))
+            if revalidate:
+                logger.info(f"💰 Цены услуг: проверено {len(missing)}")
+            else:
+                logger.info(f"💰 Цены услуг: {len(ids) - len(missing)} из кэша, {len(missing)} загружено")
+
+        return tables
+
+    async def _load(self, service_id: int):
+        """Загрузить и разобрать ценники услуги (без кэша); при сбое API - Uncached"""
+        with self.api.track_failures() as failures:
+            try:
+                prices = await self.api.get_service_prices(service_id)
+            except Exception as e:
+                logger.warning(f"⚠️ Не удалось загрузить цены для услуги {service_id}: {e}")
+                return Uncached(None)
+
+        # Пустая таблица тоже кэшируется: у услуги действительно нет цен
+        record = {'price_table': self.parse_price_table(prices).to_cache()}
+        if failures.failed:
+            return Uncached(record)
+        return record
+
+    @staticmethod
+    def _key(service_id: int) -> str:
+        return f"service:prices:{service_id}"
+
+    @staticmethod
+    def _decode(record: Optional[dict]) -> PriceTable:
+        """Таблица цен из записи кэша"""
+        if not record:
+            return PriceTable()
+        return PriceTable.from_record(record)
@@ -10,7 +10,8 @@ from .common import (
     MY_ORDERS_TEXT,
     MY_ORDERS_EMPTY,
     SUPPORT_TEXT,
-    SEARCH_TEXT
+    SEARCH_TEXT,
+    UPSTREAM_UNAVAILABLE_TEXT
 )
 
 from .hotels import (
@@ -77,6 +78,7 @@ __all__ = [
     'MY_ORDERS_EMPTY',
     'SUPPORT_TEXT',
     'SEARCH_TEXT',
+    'UPSTREAM_UNAVAILABLE_TEXT',
     # Hotels
     'get_hotels_intro_text',
     'HOTELS_SELECT_CRITERIA',
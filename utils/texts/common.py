@@ -42,6 +42,13 @@ SUPPORT_TEXT = """💬 Поддержка
 Наши менеджеры готовы ответить на все ваши вопросы."""
 
 
+# ========== ОШИБКИ ==========
+
+UPSTREAM_UNAVAILABLE_TEXT = """⚠️ Сервис бронирования временно недоступен.
+
+Пожалуйста, попробуйте ещё раз через минуту."""
+
+
 # ========== ПОИСК ==========
 
 SEARCH_TEXT = """🔍 Поиск
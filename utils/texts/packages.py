@@ -1,5 +1,8 @@
 """Тексты для флоу пакетных туров"""
-from utils.helpers import convert_price
+from typing import Optional
+
+from utils.helpers import convert_prices
+from utils.price_table import PriceTable
 
 
 def get_packages_intro_text(name: str) -> str:
@@ -9,8 +12,14 @@ def get_packages_intro_text(name: str) -> str:
 Посмотрите доступные туры:"""
 
 
-def get_package_card_text(package: dict, people_count: int = 1) -> str:
-    """Форматирование карточки пакетного тура"""
+def get_package_card_text(package: dict, people_count: int = 1, price_per_person: Optional[float] = None) -> str:
+    """
+    Форматирование карточки пакетного тура
+
+    Args:
+        price_per_person: цена за человека, уже посчитанная для страницы
+            (prices_for_records); None - посчитать по записи
+    """
     text = f"<b>{package['name']}</b>\n"
 
     # Включённые услуги
@@ -28,29 +37,20 @@ def get_package_card_text(package: dict, people_count: int = 1) -> str:
         text += "\n" + "\n".join(includes) + "\n"
 
     # Цена для выбранного количества людей
-    price_list = package.get('price_list', {})
-    if price_list:
-        # Ищем цену для нужного grp
-        price_per_person = price_list.get(people_count)
-        if price_per_person is None:
-            available = sorted(price_list.keys())
-            for grp in available:
-                if grp >= people_count:
-                    price_per_person = price_list[grp]
-                    break
-            if price_per_person is None and available:
-                price_per_person = price_list[max(available)]
-
-        if price_per_person:
-            total = price_per_person * people_count
-            total_rub = int(convert_price(total, "usd", "rub"))
-            total_peso = int(convert_price(total, "usd", "peso"))
-            per_person_rub = int(convert_price(price_per_person, "usd", "rub"))
-            per_person_peso = int(convert_price(price_per_person, "usd", "peso"))
-
-            text += f"\n👥 {people_count} чел. × ${price_per_person} / {per_person_rub} руб. / {per_person_peso} песо"
-            text += f"\n💰 <b>Итого: ${total} / {total_rub} руб. / {total_peso} песо</b>\n"
-    elif not package.get('prices_loaded'):
+    if price_per_person is None:
+        price_per_person = PriceTable.from_record(package).price_for(people_count)
+
+    if price_per_person:
+        total = price_per_person * people_count
+        total_converted, per_person_converted = convert_prices([total, price_per_person])
+        total_rub = int(total_converted["rub"])
+        total_peso = int(total_converted["peso"])
+        per_person_rub = int(per_person_converted["rub"])
+        per_person_peso = int(per_person_converted["peso"])
+
+        text += f"\n👥 {people_count} чел. × ${price_per_person} / {per_person_rub} руб. / {per_person_peso} песо"
+        text += f"\n💰 <b>Итого: ${total} / {total_rub} руб. / {total_peso} песо</b>\n"
+    elif price_per_person is None and not package.get('prices_loaded'):
         text += "\n💵 Цена по запросу\n"
 
     return text
@@ -59,10 +59,11 @@ def get_package_card_text(package: dict, people_count: int = 1) -> str:
 def get_package_summary_text(package_name: str, date: str, people_count: int, price_per_person: float) -> str:
     """Итоговый текст перед бронированием"""
     total_price = price_per_person * people_count
-    total_rub = int(convert_price(total_price, "usd", "rub"))
-    total_peso = int(convert_price(total_price, "usd", "peso"))
-    per_person_rub = int(convert_price(price_per_person, "usd", "rub"))
-    per_person_peso = int(convert_price(price_per_person, "usd", "peso"))
+    total_converted, per_person_converted = convert_prices([total_price, price_per_person])
+    total_rub = int(total_converted["rub"])
+    total_peso = int(total_converted["peso"])
+    per_person_rub = int(per_person_converted["rub"])
+    per_person_peso = int(per_person_converted["peso"])
 
     text = f"""<b>{package_name}</b>
 
@@ -1,4 +1,7 @@
 """Тексты для флоу трансферов"""
+from typing import Optional
+
+from utils.price_table import PriceTable
 
 
 def get_transfers_intro_text(name: str) -> str:
@@ -12,34 +15,25 @@ def _get_price_for_people(transfer: dict, people_count: int) -> float:
 
     Логика: ищём цену для grp >= people_count (чем больше группа, тем дешевле)
     """
-    price_list = transfer.get('price_list', {})
-
-    if not price_list:
-        # Если нет списка цен, используем базовую цену
+    price = PriceTable.from_record(transfer).price_for(people_count)
+    if price is None:
+        # Если нет таблицы цен, используем базовую цену
         base_price = transfer.get('price_per_person_usd')
         return base_price if base_price else 0
+    return price
 
-    # Ищем точное совпадение
-    if people_count in price_list:
-        return price_list[people_count]
-
-    # Ищем ближайшее большее значение grp
-    available_grps = sorted(price_list.keys())
-    for grp in available_grps:
-        if grp >= people_count:
-            return price_list[grp]
-
-    # Если people_count больше всех grp, берём максимальный grp
-    if available_grps:
-        return price_list[max(available_grps)]
-
-    return 0
 
+def get_transfer_card_text(transfer: dict, people_count: int, price_per_person: Optional[float] = None) -> str:
+    """
+    Форматирование карточки трансфера
 
-def get_transfer_card_text(transfer: dict, people_count: int) -> str:
-    """Форматирование карточки трансфера"""
+    Args:
+        price_per_person: цена за человека, уже посчитанная для страницы
+            (prices_for_records); None - посчитать по записи
+    """
     # Получаем цену за человека для данного количества людей
-    price_per_person = _get_price_for_people(transfer, people_count)
+    if price_per_person is None:
+        price_per_person = _get_price_for_people(transfer, people_count)
 
     # Если цена не загружена
     if price_per_person is None or price_per_person == 0: